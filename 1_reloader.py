@@ -67,21 +67,24 @@ mods_load_order = [
 
     '.sys_path',
     '.text',
-    '.cache',
+    '.replace_file',
     '.file_not_found_error',
     '.open_compat',
-    '.http_cache',
     '.console_write',
+    '.cache',
+    '.http_cache',
     '.unicode',
     '.clear_directory',
     '.show_error',
     '.cmd',
     '.processes',
     '.settings',
+    '.setting_watcher',
     '.show_quick_panel',
     '.thread_progress',
     '.package_io',
     '.semver',
+    '.catalog',
     '.versions',
 
     '.deps.asn1crypto._errors',
@@ -179,6 +182,8 @@ mods_load_order = [
     '.http.validating_https_handler',
 
     '.ca_certs',
+    '.timing',
+    '.worker_pool',
 
     '.downloaders.downloader_exception',
     '.downloaders.rate_limit_exception',
@@ -203,6 +208,7 @@ mods_load_order = [
 
     '.clients',
     '.clients.client_exception',
+    '.clients.commit_date_cache',
     '.clients.json_api_client',
     '.clients.bitbucket_client',
     '.clients.github_client',
@@ -223,9 +229,17 @@ mods_load_order = [
 
     '.upgraders',
     '.upgraders.vcs_upgrader',
+    '.upgraders.vcs_status',
     '.upgraders.git_upgrader',
     '.upgraders.hg_upgrader',
 
+    '.zip_transcoder',
+    '.package_inventory',
+    '.available_snapshot',
+    '.archive_store',
+    '.backup_store',
+    '.package_prefetcher',
+    '.usage_queue',
     '.package_manager',
     '.package_creator',
     '.package_disabler',
@@ -238,6 +252,9 @@ mods_load_order = [
     '.tests',
     '.tests.clients',
     '.tests.providers',
+    '.tests.setting_watcher',
+    '.tests.backup_store',
+    '.tests.versions',
 
     '.commands.add_channel_command',
     '.commands.add_repository_command',
@@ -253,11 +270,14 @@ mods_load_order = [
     '.commands.remove_channel_command',
     '.commands.remove_package_command',
     '.commands.remove_repository_command',
+    '.commands.restore_package_backup_command',
+    '.commands.rollback_package_command',
     '.commands.upgrade_all_packages_command',
     '.commands.upgrade_package_command',
     '.commands.packages_manager_insert_command',
     '.commands.satisfy_dependencies_command',
     '.commands.packages_manager_tests_command',
+    '.commands.package_control_timing_summary_command',
     '.commands.packagesmanager_edit_settings_command',
     '.commands.packagesmanager_open_default_settings_command',
     '.commands.packagesmanager_disable_debug_mode_command',
@@ -0,0 +1,95 @@
+# coding: utf-8
+from __future__ import unicode_literals, division, absolute_import, print_function
+
+import os
+import random
+import sys
+import timeit
+
+
+PACKAGE_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, PACKAGE_ROOT)
+
+from package_control import versions  # noqa
+from package_control.semver import SemVer  # noqa
+
+
+def _channel(packages, releases):
+    """
+    Creates release lists shaped like the ones in the default channel
+
+    :param packages:
+        The number of packages
+
+    :param releases:
+        The number of releases per package
+
+    :return:
+        A list of lists of release dicts
+    """
+
+    rand = random.Random(0)
+    output = []
+    for _ in range(packages):
+        package_releases = []
+        for _ in range(releases):
+            kind = rand.random()
+            if kind < 0.6:
+                version = '%d.%d.%d' % (rand.randint(0, 3), rand.randint(0, 20), rand.randint(0, 30))
+            elif kind < 0.7:
+                version = '%d.%d.%d-beta.%d' % (rand.randint(0, 3), rand.randint(0, 20), 0, rand.randint(1, 9))
+            else:
+                version = '20%02d.%02d.%02d.%02d.%02d.%02d' % tuple(rand.randint(10, 28) for _ in range(6))
+            package_releases.append({'version': version, 'platforms': ['*'], 'sublime_text': '>3000'})
+        output.append(package_releases)
+    return output
+
+
+def _semver_refresh(channel):
+    """
+    Sorts and filters the releases the way versions.py did before the
+    version keys, building a SemVer for every release in each pass
+    """
+
+    for releases in channel:
+        releases = sorted(
+            releases,
+            key=lambda r: (SemVer(versions.semver_compat(r)), r['platforms']),
+            reverse=True
+        )
+        [r for r in releases if SemVer(versions.semver_compat(r)).prerelease is None]
+
+
+def _key_refresh(channel):
+    for releases in channel:
+        releases = versions.version_sort(releases, 'platforms', reverse=True)
+        versions.version_exclude_prerelease(releases)
+
+
+def run(packages=5000, releases=20, repeat=3):
+    """
+    Times one channel refresh worth of release sorting and prerelease
+    filtering, with SemVer objects and with the cached version keys
+    """
+
+    channel = _channel(packages, releases)
+    print('%d packages with %d releases each, best of %d' % (packages, releases, repeat))
+
+    semver_time = min(timeit.repeat(lambda: _semver_refresh(channel), number=1, repeat=repeat))
+    print('SemVer objects:      %.3fs' % semver_time)
+
+    def cold():
+        versions._version_keys.clear()
+        _key_refresh(channel)
+    cold_time = min(timeit.repeat(cold, number=1, repeat=repeat))
+    print('Version keys, cold:  %.3fs (%.1fx)' % (cold_time, semver_time / cold_time))
+
+    warm_time = min(timeit.repeat(lambda: _key_refresh(channel), number=1, repeat=repeat))
+    print('Version keys, warm:  %.3fs (%.1fx)' % (warm_time, semver_time / warm_time))
+
+    return True
+
+
+if __name__ == "__main__":
+    result = run()
+    sys.exit(int(not result))
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+from .console_write import console_write
+from .file_not_found_error import FileNotFoundError
+from .open_compat import open_compat, read_compat
+from .sys_path import pc_cache_dir
+from .replace_file import replace_file
+
+
+INDEX_VERSION = 1
+
+# The release fields kept so a stored archive can be installed again even
+# once the release is no longer listed by its repository
+RELEASE_FIELDS = ('url', 'version', 'sublime_text', 'platforms', 'dependencies', 'sha256')
+
+# Guards the index file, which is shared by every ArchiveStore object
+_lock = threading.Lock()
+
+
+class ArchiveStore(object):
+
+    """
+    A size-capped store of the package archives that were downloaded, so a
+    reinstall, or a rollback to a previous version, does not need to download
+    the archive again.
+
+    Each archive is stored once, under its SHA-256 hash, and the index maps
+    each package to the (URL, version, hash) of the releases that were stored
+    for it. When the store grows past its size cap, the least recently used
+    archives are removed.
+
+    :param max_size:
+        The number of bytes the stored archives may use
+    """
+
+    def __init__(self, max_size):
+        self.base_path = os.path.join(pc_cache_dir(), 'archives')
+        self.index_path = os.path.join(self.base_path, 'index.json')
+        self.max_size = max_size
+
+    def archive_path(self, sha256):
+        """
+        :param sha256:
+            The hex SHA-256 hash of an archive
+
+        :return:
+            The filesystem path the archive is stored at
+        """
+
+        return os.path.join(self.base_path, sha256[0:2], sha256 + '.sublime-package')
+
+    def find(self, package_name, release, verify=False):
+        """
+        Looks for the archive of a release. The size and modification time of
+        the archive are compared with the index, and it is only hashed again
+        if they differ, or if verify is True.
+
+        :param package_name:
+            The name of the package
+
+        :param release:
+            A release dict with the keys "url" and "version", and optionally
+            "sha256"
+
+        :param verify:
+            If the archive should be hashed, such as right before installing it
+
+        :return:
+            The filesystem path to the stored archive, or None
+        """
+
+        with _lock:
+            index = self._load()
+            sha256 = None
+            for record in index['packages'].get(package_name, []):
+                if record['url'] != release['url'] or record['version'] != release['version']:
+                    continue
+                if release.get('sha256') and release['sha256'].lower() != record['sha256']:
+                    continue
+                sha256 = record['sha256']
+                break
+
+            if sha256 is None:
+                return None
+
+            path = self.archive_path(sha256)
+            info = index['archives'].get(sha256, {})
+            stat = _stat(path)
+            if stat is None:
+                self._discard(index, sha256)
+                self._save(index)
+                return None
+            changed = [info.get('size'), info.get('mtime')] != stat
+
+        # Hashing is done without the lock, so lookups by other threads, such
+        # as the ones prefetching archives, are not held up
+        if (changed or verify) and _hash_file(path) != sha256:
+            with _lock:
+                index = self._load()
+                self._discard(index, sha256)
+                self._save(index)
+            return None
+
+        with _lock:
+            index = self._load()
+            info = index['archives'].get(sha256)
+            # Removed by another thread in the meantime
+            if info is None:
+                return None
+            info['used'] = time.time()
+            if changed:
+                info['size'], info['mtime'] = stat
+            self._save(index)
+
+        return path
+
+    def find_release(self, package_name, version):
+        """
+        Looks for a stored release of a package by version
+
+        :param package_name:
+            The name of the package
+
+        :param version:
+            The version string of the release
+
+        :return:
+            The release dict, or None
+        """
+
+        for release in self.releases(package_name):
+            if release['version'] == version:
+                return release
+        return None
+
+    def releases(self, package_name):
+        """
+        :param package_name:
+            The name of the package
+
+        :return:
+            A list of the release dicts stored for the package, the most
+            recently stored first
+        """
+
+        with _lock:
+            records = self._load()['packages'].get(package_name, [])
+        records = sorted(records, key=lambda record: record['stored'], reverse=True)
+        return [dict(record['release']) for record in records]
+
+    def add(self, package_name, release, path):
+        """
+        Copies an archive that was downloaded for a release into the store
+
+        :param package_name:
+            The name of the package
+
+        :param release:
+            The release dict the archive was downloaded for
+
+        :param path:
+            The filesystem path to the downloaded archive
+
+        :return:
+            The hex SHA-256 hash of the archive, or None if it was not stored
+        """
+
+        try:
+            sha256 = _hash_file(path)
+            size = os.path.getsize(path)
+        except (IOError, OSError):
+            return None
+
+        if release.get('sha256') and release['sha256'].lower() != sha256:
+            return None
+        if size > self.max_size:
+            return None
+
+        with _lock:
+            index = self._load()
+            stored_path = self.archive_path(sha256)
+            try:
+                if not os.path.exists(stored_path):
+                    stored_dir = os.path.dirname(stored_path)
+                    if not os.path.exists(stored_dir):
+                        os.makedirs(stored_dir)
+                    tmp_path = stored_path + '-new'
+                    shutil.copyfile(path, tmp_path)
+                    os.rename(tmp_path, stored_path)
+            except (IOError, OSError) as e:
+                console_write(
+                    u'''
+                    Unable to store the archive for %s in %s: %s
+                    ''',
+                    (package_name, self.base_path, e)
+                )
+                return None
+
+            stat = _stat(stored_path)
+            if stat is None:
+                return None
+
+            now = time.time()
+            index['archives'][sha256] = {'size': stat[0], 'mtime': stat[1], 'used': now}
+
+            records = [
+                record for record in index['packages'].get(package_name, [])
+                if record['url'] != release['url'] or record['version'] != release['version']
+            ]
+            stored_release = dict((key, release[key]) for key in RELEASE_FIELDS if key in release)
+            stored_release['sha256'] = sha256
+            records.append({
+                'url': release['url'],
+                'version': release['version'],
+                'sha256': sha256,
+                'stored': now,
+                'release': stored_release
+            })
+            index['packages'][package_name] = records
+
+            self._evict(index, sha256)
+            self._save(index)
+
+        return sha256
+
+    def _evict(self, index, keep):
+        """
+        Removes the least recently used archives until the store fits its
+        size cap
+
+        :param index:
+            The index dict
+
+        :param keep:
+            The hash of the archive that was just added
+        """
+
+        archives = index['archives']
+        total = sum(info['size'] for info in archives.values())
+        for sha256 in sorted(archives, key=lambda sha256: archives[sha256]['used']):
+            if total <= self.max_size:
+                break
+            if sha256 == keep:
+                continue
+            total -= archives[sha256]['size']
+            self._discard(index, sha256)
+
+    def _discard(self, index, sha256):
+        """
+        Removes an archive, and every release record that points to it
+
+        :param index:
+            The index dict
+
+        :param sha256:
+            The hash of the archive to remove
+        """
+
+        index['archives'].pop(sha256, None)
+        for package_name in list(index['packages'].keys()):
+            records = [
+                record for record in index['packages'][package_name]
+                if record['sha256'] != sha256
+            ]
+            if records:
+                index['packages'][package_name] = records
+            else:
+                del index['packages'][package_name]
+
+        try:
+            os.remove(self.archive_path(sha256))
+        except (OSError):
+            pass
+
+    def _load(self):
+        try:
+            with open_compat(self.index_path, 'r') as f:
+                index = json.loads(read_compat(f))
+            if isinstance(index, dict) and index.get('version') == INDEX_VERSION:
+                return index
+        except (FileNotFoundError, ValueError, IOError, OSError):
+            pass
+        return {'version': INDEX_VERSION, 'archives': {}, 'packages': {}}
+
+    def _save(self, index):
+        tmp_path = self.index_path + '-new'
+        try:
+            if not os.path.exists(self.base_path):
+                os.makedirs(self.base_path)
+            with open_compat(tmp_path, 'w') as f:
+                f.write(json.dumps(index))
+            replace_file(tmp_path, self.index_path)
+        except (IOError, OSError) as e:
+            console_write(
+                u'''
+                Unable to write the archive store index to %s: %s
+                ''',
+                (self.index_path, e)
+            )
+
+
+def _stat(path):
+    """
+    :param path:
+        The filesystem path to a file
+
+    :return:
+        A 2-element list of the size and modification time of the file, or
+        None if it does not exist
+    """
+
+    try:
+        stat = os.stat(path)
+    except (OSError):
+        return None
+    return [stat.st_size, stat.st_mtime]
+
+
+def _hash_file(path):
+    """
+    :param path:
+        The filesystem path to a file
+
+    :return:
+        The hex SHA-256 hash of the file contents, or None if it can not be read
+    """
+
+    sha256 = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                sha256.update(chunk)
+    except (IOError, OSError):
+        return None
+    return sha256.hexdigest()
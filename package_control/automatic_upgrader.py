@@ -9,6 +9,7 @@ import functools
 
 import sublime
 
+from . import timing
 from .sys_path import pc_cache_dir
 from .show_error import show_error
 from .console_write import console_write
@@ -143,21 +144,22 @@ class AutomaticUpgrader(threading.Thread):
         self.should_install_missing = self.settings.get('install_missing')
 
     def run(self):
-        self.install_missing()
+        with timing.operation('auto_upgrade'):
+            self.install_missing()
 
-        if self.next_run > int(time.time()) and \
-                self.last_version == self.current_version:
-            self.print_skip()
-            return
+            if self.next_run > int(time.time()) and \
+                    self.last_version == self.current_version:
+                self.print_skip()
+                return
 
-        if self.last_version != self.current_version and self.last_version != 0:
-            console_write(
-                u'''
-                Detected Sublime Text update, looking for package updates
-                '''
-            )
+            if self.last_version != self.current_version and self.last_version != 0:
+                console_write(
+                    u'''
+                    Detected Sublime Text update, looking for package updates
+                    '''
+                )
 
-        self.upgrade_packages()
+            self.upgrade_packages()
 
     def install_missing(self):
         """
@@ -316,12 +318,19 @@ class AutomaticUpgrader(threading.Thread):
             (len(package_list), package_list)
         )
 
-        for package_name in IgnoredPackagesBugFixer(package_list, "upgrade"):
-            if self.manager.install_package(package_name):
-                version = self.manager.get_version(package_name)
-                console_write(
-                    u'''
-                    Upgraded %s to %s
-                    ''',
-                    (package_name, version)
-                )
+        # Download the packages while the previous ones are being installed
+        self.manager.prefetch_packages(package_list)
+
+        try:
+            for package_name in IgnoredPackagesBugFixer(package_list, "upgrade"):
+                if self.manager.install_package(package_name):
+                    version = self.manager.get_version(package_name)
+                    console_write(
+                        u'''
+                        Upgraded %s to %s
+                        ''',
+                        (package_name, version)
+                    )
+
+        finally:
+            self.manager.finish_prefetch()
@@ -0,0 +1,42 @@
+import time
+
+from .cache import cache_generation
+
+
+class AvailableSnapshot(object):
+
+    """
+    The merged index of every available package and dependency, as built by
+    PackageManager._list_available(). A single snapshot is shared by all of
+    the steps of a batch operation so the index is only built once.
+
+    A snapshot becomes stale once the channel and repository cache changes,
+    or once the cache TTL it was built with has passed.
+    """
+
+    def __init__(self, packages, dependencies, ttl):
+        """
+        :param packages:
+            A dict of package name to package info
+
+        :param dependencies:
+            A dict of dependency name to dependency info
+
+        :param ttl:
+            The number of seconds the snapshot may be used for
+        """
+
+        self.packages = packages
+        self.dependencies = dependencies
+        self.generation = cache_generation()
+        self.expires = time.time() + (ttl if ttl else 300)
+
+    def is_valid(self):
+        """
+        :return:
+            If the snapshot still reflects the channel and repository cache
+        """
+
+        if self.generation != cache_generation():
+            return False
+        return self.expires > time.time()
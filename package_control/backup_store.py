@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import shutil
+import datetime
+import threading
+
+from .console_write import console_write
+from .file_not_found_error import FileNotFoundError
+from .open_compat import open_compat, read_compat
+from .clear_directory import unlink_or_delete_directory
+from .replace_file import replace_file
+
+
+INDEX_VERSION = 1
+
+# Guards the index file, which is shared by every BackupStore object
+_lock = threading.Lock()
+
+
+class BackupStore(object):
+
+    """
+    Incremental snapshots of the Packages/{package}/ dirs that are replaced
+    by upgrades. Each snapshot is a full copy of the package dir, however the
+    files that did not change since the previous snapshot of the package are
+    hard links to it, so only the changed files take up more space.
+
+    The index records the size and modification time of every file in each
+    snapshot. The snapshots over the count or size caps are removed, oldest
+    first.
+
+    :param backup_path:
+        The Backup/ folder next to the Packages/ folder
+
+    :param max_count:
+        The number of snapshots to keep for each package
+
+    :param max_size:
+        The number of bytes all snapshots may use
+    """
+
+    def __init__(self, backup_path, max_count, max_size):
+        self.base_path = os.path.join(backup_path, 'snapshots')
+        self.index_path = os.path.join(self.base_path, 'index.json')
+        self.max_count = max(1, int(max_count))
+        self.max_size = max_size
+
+    def snapshot_path(self, snapshot):
+        """
+        :param snapshot:
+            A snapshot dict from snapshots()
+
+        :return:
+            The filesystem path of the snapshot dir
+        """
+
+        return os.path.join(self.base_path, snapshot['package'], snapshot['id'])
+
+    def snapshots(self, package_name=None):
+        """
+        :param package_name:
+            The name of the package to list the snapshots of, or None for all
+
+        :return:
+            A list of snapshot dicts with the keys "package", "id", "created"
+            and "files", the most recent first
+        """
+
+        with _lock:
+            snapshots = self._load()['snapshots']
+        if package_name is not None:
+            snapshots = [s for s in snapshots if s['package'] == package_name]
+        return sorted(snapshots, key=lambda s: s['created'], reverse=True)
+
+    def add(self, package_name, package_dir, keep=None):
+        """
+        Takes a snapshot of a package dir
+
+        :param package_name:
+            The name of the package
+
+        :param package_dir:
+            The filesystem path to the Packages/{package}/ dir
+
+        :param keep:
+            A list of snapshot dicts that must not be pruned, such as one
+            that is about to be restored
+
+        :raises:
+            IOError or OSError if the snapshot could not be written
+
+        :return:
+            The snapshot dict, or None if nothing changed since the previous
+            snapshot of the package
+        """
+
+        files = _scan(package_dir)
+
+        with _lock:
+            index = self._load()
+
+            previous = None
+            for snapshot in index['snapshots']:
+                if snapshot['package'] != package_name:
+                    continue
+                if previous is None or snapshot['created'] > previous['created']:
+                    previous = snapshot
+
+            previous_files = {}
+            if previous:
+                previous_files = previous['files']
+                if previous_files == files and os.path.exists(self.snapshot_path(previous)):
+                    return None
+
+            snapshot_id = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+            existing_ids = set(s['id'] for s in index['snapshots'] if s['package'] == package_name)
+            suffix = 1
+            while snapshot_id in existing_ids:
+                suffix += 1
+                snapshot_id = '%s-%d' % (datetime.datetime.now().strftime('%Y%m%d%H%M%S'), suffix)
+
+            snapshot = {
+                'package': package_name,
+                'id': snapshot_id,
+                'created': time.time(),
+                'files': files
+            }
+            snapshot_dir = self.snapshot_path(snapshot)
+
+            linked = 0
+            try:
+                for rel_path in files:
+                    dest = os.path.join(snapshot_dir, rel_path)
+                    dest_dir = os.path.dirname(dest)
+                    if not os.path.exists(dest_dir):
+                        os.makedirs(dest_dir)
+
+                    if previous_files.get(rel_path) == files[rel_path] and _link(
+                            os.path.join(self.snapshot_path(previous), rel_path), dest):
+                        linked += 1
+                        continue
+                    shutil.copy2(os.path.join(package_dir, rel_path), dest)
+
+                if not os.path.exists(snapshot_dir):
+                    os.makedirs(snapshot_dir)
+
+            except (IOError, OSError):
+                if os.path.exists(snapshot_dir):
+                    unlink_or_delete_directory(snapshot_dir)
+                raise
+
+            index['snapshots'].append(snapshot)
+            self._prune(index, [snapshot] + list(keep or []))
+            self._save(index)
+
+        console_write(
+            u'''
+            Backed up %s to %s, linking %d of %d files to the previous snapshot
+            ''',
+            (package_name, snapshot_dir, linked, len(files))
+        )
+        return snapshot
+
+    def restore(self, snapshot, package_dir):
+        """
+        Replaces the contents of a package dir with a snapshot. The files are
+        copied, not linked, so editing them does not change the snapshot.
+
+        :param snapshot:
+            A snapshot dict from snapshots()
+
+        :param package_dir:
+            The filesystem path to the Packages/{package}/ dir
+
+        :raises:
+            IOError or OSError if the snapshot could not be copied
+        """
+
+        snapshot_dir = self.snapshot_path(snapshot)
+        if not os.path.isdir(snapshot_dir):
+            raise OSError('The snapshot %s does not exist' % snapshot_dir)
+
+        if os.path.exists(package_dir):
+            unlink_or_delete_directory(package_dir)
+        shutil.copytree(snapshot_dir, package_dir)
+
+    def _prune(self, index, keep):
+        """
+        Removes the snapshots over the count and size caps, oldest first
+
+        :param index:
+            The index dict
+
+        :param keep:
+            A list of snapshot dicts that must not be removed, starting with
+            the one that was just added
+        """
+
+        snapshots = sorted(index['snapshots'], key=lambda s: s['created'], reverse=True)
+        keep_keys = set((s['package'], s['id']) for s in keep)
+
+        counts = {}
+        kept = []
+        for snapshot in snapshots:
+            key = (snapshot['package'], snapshot['id'])
+            counts[snapshot['package']] = counts.get(snapshot['package'], 0) + 1
+            if counts[snapshot['package']] > self.max_count and key not in keep_keys:
+                self._discard(snapshot)
+            else:
+                kept.append(snapshot)
+
+        # Remove the oldest snapshots that are not protected until under the cap
+        for snapshot in reversed(list(kept)):
+            if _unique_size(kept) <= self.max_size:
+                break
+            if (snapshot['package'], snapshot['id']) in keep_keys:
+                continue
+            kept.remove(snapshot)
+            self._discard(snapshot)
+
+        index['snapshots'] = kept
+
+    def _discard(self, snapshot):
+        snapshot_dir = self.snapshot_path(snapshot)
+        if os.path.exists(snapshot_dir):
+            unlink_or_delete_directory(snapshot_dir)
+
+    def _load(self):
+        try:
+            with open_compat(self.index_path, 'r') as f:
+                index = json.loads(read_compat(f))
+            if isinstance(index, dict) and index.get('version') == INDEX_VERSION:
+                return index
+        except (FileNotFoundError, ValueError, IOError, OSError):
+            pass
+        return {'version': INDEX_VERSION, 'snapshots': []}
+
+    def _save(self, index):
+        tmp_path = self.index_path + '-new'
+        try:
+            if not os.path.exists(self.base_path):
+                os.makedirs(self.base_path)
+            with open_compat(tmp_path, 'w') as f:
+                f.write(json.dumps(index))
+            replace_file(tmp_path, self.index_path)
+        except (IOError, OSError) as e:
+            console_write(
+                u'''
+                Unable to write the backup index to %s: %s
+                ''',
+                (self.index_path, e)
+            )
+
+
+def _scan(package_dir):
+    """
+    :param package_dir:
+        The filesystem path to a package dir
+
+    :return:
+        A dict of the relative path of each file to a 2-element list of the
+        size and modification time
+    """
+
+    files = {}
+    for root, dirs, filenames in os.walk(package_dir, followlinks=True):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            stat = os.stat(path)
+            rel_path = os.path.relpath(path, package_dir).replace(os.sep, '/')
+            files[rel_path] = [stat.st_size, stat.st_mtime]
+    return files
+
+
+def _link(source, dest):
+    """
+    Hard links a file of the previous snapshot into a new one
+
+    :param source:
+        The filesystem path to the file in the previous snapshot
+
+    :param dest:
+        The filesystem path to create the link at
+
+    :return:
+        If the link was created, otherwise the file needs to be copied
+    """
+
+    if not hasattr(os, 'link'):
+        return False
+    try:
+        os.link(source, dest)
+        return True
+    except (OSError):
+        return False
+
+
+def _unique_size(snapshots):
+    """
+    :param snapshots:
+        A list of snapshot dicts
+
+    :return:
+        The number of bytes the snapshots use on disk. Files that are linked
+        between snapshots of a package have the same size and modification
+        time, so they are only counted once.
+    """
+
+    seen = set()
+    total = 0
+    for snapshot in snapshots:
+        for rel_path, info in snapshot['files'].items():
+            key = (snapshot['package'], rel_path, info[0], info[1])
+            if key not in seen:
+                seen.add(key)
+                total += info[0]
+    return total
@@ -1,4 +1,14 @@
+import os
 import time
+import json
+import hashlib
+from threading import Lock
+
+from .console_write import console_write
+from .open_compat import open_compat, read_compat
+from .file_not_found_error import FileNotFoundError
+from .sys_path import pc_cache_dir
+from .replace_file import replace_file
 
 
 # A cache of channel and repository info to allow users to install multiple
@@ -6,12 +16,225 @@ import time
 # than once. The keys are managed locally by the utilizing code.
 _channel_repository_cache = {}
 
+# Bump this whenever the structure of the persisted data changes so that
+# files written by older versions are ignored instead of misinterpreted
+PERSISTENT_CACHE_VERSION = 1
+
+# Only the channel and repository info is written to disk, everything else
+# (rate limits, etc) is only valid for this session. VCS incoming info is
+# persisted separately by upgraders/vcs_status.py.
+_persistent_suffixes = (
+    '.repositories',
+    '.packages',
+    '.dependencies',
+    '.package_name_map',
+    '.renamed_packages',
+    '.unavailable_packages',
+    '.unavailable_dependencies',
+    '.repository_digests',
+)
+
+# Persisted keys that are kept however long ago they expired, since the
+# reader decides if they are still usable, such as by comparing digests
+_unexpiring_suffixes = (
+    '.repository_digests',
+)
+
+# If the on-disk cache was already read by this plugin_host session
+_persistent_loaded = False
+
+# If a persistable key was set since the on-disk cache was last written
+_persistent_dirty = False
+
+_persistent_lock = Lock()
+
+# Incremented whenever channel or repository info is cleared or replaced, so
+# that values derived from the cache can tell when they are out of date
+_generation = 0
+
+
+def cache_generation():
+    """
+    :return:
+        An integer that changes every time channel or repository info in the
+        cache is cleared or replaced
+    """
+
+    return _generation
+
 
 def clear_cache():
+    global _persistent_dirty, _generation
+
     _channel_repository_cache.clear()
+    _generation += 1
+
+    with _persistent_lock:
+        _persistent_dirty = False
+        try:
+            os.remove(_persistent_cache_path())
+        except (OSError):
+            pass
+
+
+def settings_fingerprint(settings):
+    """
+    Creates a short hash of a settings dict so it can be stored on disk
+    without leaking values such as proxy credentials
+
+    :param settings:
+        A JSON-serializable dict of settings
+
+    :return:
+        A unicode string hex digest
+    """
+
+    encoded = json.dumps(settings, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def _persistent_cache_path():
+    return os.path.join(pc_cache_dir(), 'channel_repository_cache.json')
+
+
+def _is_persistent_key(key):
+    return key.endswith(_persistent_suffixes)
+
+
+def _is_expired(key, entry, max_stale, now):
+    if key.endswith(_unexpiring_suffixes):
+        return False
+    expires = entry.get('expires')
+    return not expires or expires + max_stale <= now
+
+
+def load_persistent_cache(fingerprint, max_stale=0):
+    """
+    Populates the in-memory cache from the on-disk copy written by a previous
+    session. Only runs once per session, and only when the settings used to
+    write the file match the current settings.
+
+    :param fingerprint:
+        The value returned from settings_fingerprint() for the current settings
+
+    :param max_stale:
+        The number of seconds past their expiration entries are still loaded
+        for, so they can be served while being revalidated
+    """
+
+    global _persistent_loaded
+
+    with _persistent_lock:
+        if _persistent_loaded:
+            return
+        _persistent_loaded = True
+
+        cache_path = _persistent_cache_path()
+        try:
+            with open_compat(cache_path, 'r') as f:
+                struct = json.loads(read_compat(f))
+        except (FileNotFoundError):
+            return
+        except (ValueError, IOError, OSError):
+            console_write(
+                u'''
+                Discarding the unreadable channel and repository cache at %s
+                ''',
+                cache_path
+            )
+            return
+
+        if not isinstance(struct, dict):
+            return
+        if struct.get('version') != PERSISTENT_CACHE_VERSION:
+            return
+        if struct.get('fingerprint') != fingerprint:
+            return
+
+        now = time.time()
+        for key, entry in struct.get('entries', {}).items():
+            # Anything set during this session is newer than the disk copy
+            if key in _channel_repository_cache:
+                continue
+            if _is_expired(key, entry, max_stale, now):
+                continue
+            _channel_repository_cache[key] = entry
+
+
+def save_persistent_cache(fingerprint, max_stale=0):
+    """
+    Writes all unexpired channel and repository info, and the repository
+    digests, to disk so the next session can use it without downloading the
+    channel again
+
+    :param fingerprint:
+        The value returned from settings_fingerprint() for the current settings
+
+    :param max_stale:
+        The number of seconds past their expiration entries are still written
+        for, so the next session can serve them while revalidating
+    """
+
+    global _persistent_dirty
+
+    with _persistent_lock:
+        if not _persistent_dirty:
+            return
+        _persistent_dirty = False
+
+        now = time.time()
+        entries = {}
+        for key, entry in list(_channel_repository_cache.items()):
+            if not _is_persistent_key(key):
+                continue
+            if _is_expired(key, entry, max_stale, now):
+                continue
+            entries[key] = entry
+
+        struct = {
+            'version': PERSISTENT_CACHE_VERSION,
+            'fingerprint': fingerprint,
+            'entries': entries
+        }
+
+        cache_path = _persistent_cache_path()
+        tmp_path = cache_path + '-new'
+        try:
+            cache_dir = os.path.dirname(cache_path)
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            with open_compat(tmp_path, 'w') as f:
+                f.write(json.dumps(struct, default=_to_json))
+            replace_file(tmp_path, cache_path)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            console_write(
+                u'''
+                Unable to write the channel and repository cache to %s: %s
+                ''',
+                (cache_path, e)
+            )
+
+
+def _to_json(value):
+    """
+    Converts values json.dumps() can not handle, such as catalog records
+
+    :param value:
+        The value to convert
 
+    :raises:
+        TypeError: when the value can not be converted
 
-def get_cache(key, default=None):
+    :return:
+        A JSON-serializable value
+    """
+
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError('%r is not JSON serializable' % value)
+
+
+def get_cache(key, default=None, max_stale=0):
     """
     Gets an in-memory cache value
 
@@ -21,13 +244,16 @@ def get_cache(key, default=None):
     :param default:
         The value to return if the key has not been set, or the ttl expired
 
+    :param max_stale:
+        The number of seconds past the ttl the value may still be returned for
+
     :return:
         The cached value, or default
     """
 
     struct = _channel_repository_cache.get(key, {})
     expires = struct.get('expires')
-    if expires and expires > time.time():
+    if expires and expires + max_stale > time.time():
         return struct.get('data')
     return default
 
@@ -55,7 +281,7 @@ def merge_cache_over_settings(destination, setting, key_prefix):
         destination.settings[setting] = existing
 
 
-def merge_cache_under_settings(destination, setting, key_prefix, list_=False):
+def merge_cache_under_settings(destination, setting, key_prefix, list_=False, max_stale=0):
     """
     Take the cached value of `key` and put it into the key `setting` of
     the destination.settings dict. Merge the values by overlaying the
@@ -72,9 +298,12 @@ def merge_cache_under_settings(destination, setting, key_prefix, list_=False):
 
     :param list_:
         If a list should be used instead of a dict
+
+    :param max_stale:
+        The number of seconds past the ttl the cached value may still be used
     """
 
-    value = get_cache(key_prefix + '.' + setting)
+    value = get_cache(key_prefix + '.' + setting, max_stale=max_stale)
     if value:
         existing = destination.settings.get(setting)
         if existing:
@@ -104,11 +333,44 @@ def set_cache(key, data, ttl=300):
         The integer number of second to cache the data for
     """
 
+    global _persistent_dirty, _generation
+
     _channel_repository_cache[key] = {
         'data': data,
         'expires': time.time() + (ttl if ttl else 300)
     }
 
+    if _is_persistent_key(key):
+        _persistent_dirty = True
+        _generation += 1
+
+
+def refresh_cache(key, ttl=300):
+    """
+    Extends the expiration of an in-memory cache value, including one that
+    already expired, without changing the value
+
+    :param key:
+        The string key
+
+    :param ttl:
+        The integer number of second to cache the data for
+
+    :return:
+        If the key was set
+    """
+
+    global _persistent_dirty
+
+    struct = _channel_repository_cache.get(key)
+    if not struct:
+        return False
+
+    struct['expires'] = time.time() + (ttl if ttl else 300)
+    if _is_persistent_key(key):
+        _persistent_dirty = True
+    return True
+
 
 def set_cache_over_settings(destination, setting, key_prefix, value, ttl):
     """
@@ -0,0 +1,410 @@
+import sys
+import json
+
+try:
+    # Python 3
+    _intern = sys.intern
+    str_cls = str
+except (AttributeError):
+    # Python 2
+    _intern = intern  # noqa
+    str_cls = unicode  # noqa
+
+
+# Tuples of interned strings, such as lists of platforms, shared by every
+# record that uses the same values
+_interned_tuples = {}
+
+# Frozensets of the rare field names a PackageRecord has, shared by every
+# record with the same fields
+_rare_key_sets = {}
+
+
+def intern_string(value):
+    """
+    :param value:
+        A string, or any other value
+
+    :return:
+        The shared copy of the string, or the value if it is not a string
+    """
+
+    if isinstance(value, str):
+        return _intern(value)
+    return value
+
+
+def intern_list(value):
+    """
+    :param value:
+        A list of strings, or any other value
+
+    :return:
+        A shared tuple of the interned strings, or the value if it is not a list
+    """
+
+    if not isinstance(value, (list, tuple)):
+        return intern_string(value)
+    try:
+        key = tuple(intern_string(item) for item in value)
+        return _interned_tuples.setdefault(key, key)
+    except (TypeError):
+        # Lists of unhashable values are kept as-is
+        return value
+
+
+class Record(object):
+
+    """
+    A dict-compatible record that stores its common fields in __slots__ and
+    any other fields in a small dict, so the many package and release entries
+    of a channel do not each need a full dict
+    """
+
+    __slots__ = ('_extra',)
+
+    # The fields stored in slots
+    _fields = ()
+
+    def __init__(self, values=None):
+        self._extra = None
+        if values:
+            for key in values:
+                self[key] = values[key]
+
+    def _get(self, key):
+        return getattr(self, key)
+
+    def _set(self, key, value):
+        setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            try:
+                return self._get(key)
+            except (AttributeError):
+                raise KeyError(key)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._fields:
+            self._set(key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[intern_string(key)] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in self._fields:
+            delattr(self, key)
+        else:
+            del self._extra[key]
+
+    def _has(self, key):
+        try:
+            self._get(key)
+            return True
+        except (AttributeError):
+            return False
+
+    def __contains__(self, key):
+        if key in self._fields:
+            return self._has(key)
+        return bool(self._extra) and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (Record, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, self.to_dict())
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError):
+            return default
+
+    def keys(self):
+        output = [key for key in self._fields if key in self]
+        if self._extra:
+            output.extend(self._extra.keys())
+        return output
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, values):
+        for key in values.keys():
+            self[key] = values[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def copy(self):
+        return self.__class__(self)
+
+    def to_dict(self):
+        """
+        :return:
+            A plain dict of the fields, with any nested records converted too
+        """
+
+        output = {}
+        for key, value in self.items():
+            if isinstance(value, tuple):
+                value = list(value)
+            elif isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, Record) else item for item in value]
+            output[key] = value
+        return output
+
+
+class ReleaseRecord(Record):
+
+    """
+    A release of a package or dependency. The platforms, Sublime Text version
+    selector and dependency names are interned, and the URL is split so the
+    part before the last / is shared by all releases of the package.
+    """
+
+    __slots__ = (
+        'version',
+        'date',
+        'sha256',
+        'platforms',
+        'sublime_text',
+        'dependencies',
+        '_url_prefix',
+        '_url_tail',
+    )
+
+    _fields = ('version', 'url', 'date', 'sha256', 'platforms', 'sublime_text', 'dependencies')
+
+    def _get(self, key):
+        if key == 'url':
+            return self._url_prefix + self._url_tail
+        return getattr(self, key)
+
+    def _set(self, key, value):
+        if key == 'url':
+            if isinstance(value, str_cls):
+                slash = value.rfind('/') + 1
+                self._url_prefix = intern_string(value[0:slash])
+                self._url_tail = value[slash:]
+            else:
+                self._url_prefix = ''
+                self._url_tail = value
+        elif key in ('platforms', 'dependencies'):
+            setattr(self, key, intern_list(value))
+        elif key == 'sublime_text':
+            setattr(self, key, intern_string(value))
+        else:
+            setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key == 'url':
+            if key not in self:
+                raise KeyError(key)
+            del self._url_prefix
+            del self._url_tail
+            return
+        Record.__delitem__(self, key)
+
+
+class PackageRecord(Record):
+
+    """
+    A package or dependency. The fields that are only shown in a package's
+    details, such as the readme and labels, are kept as a single JSON string
+    and only decoded when accessed. The names of the rare fields present are
+    kept separately, so listing the keys does not decode the string.
+    """
+
+    __slots__ = (
+        'name',
+        'description',
+        'homepage',
+        'issues',
+        'load_order',
+        'last_modified',
+        '_releases',
+        '_rare',
+        '_rare_keys',
+    )
+
+    _fields = (
+        'name',
+        'description',
+        'homepage',
+        'issues',
+        'load_order',
+        'last_modified',
+        'releases',
+        'author',
+        'buy',
+        'donate',
+        'labels',
+        'previous_names',
+        'readme',
+        'sources',
+    )
+
+    RARE_FIELDS = frozenset(['author', 'buy', 'donate', 'labels', 'previous_names', 'readme', 'sources'])
+
+    def __init__(self, values=None):
+        self._rare_keys = frozenset()
+        if not values:
+            Record.__init__(self)
+            return
+
+        # The rare fields are collected so they are encoded a single time
+        rare = {}
+        other = {}
+        for key, value in values.items():
+            if key in self.RARE_FIELDS:
+                rare[key] = value
+            else:
+                other[key] = value
+        Record.__init__(self, other)
+        if rare:
+            self._store_rare(rare)
+
+    def _load_rare(self):
+        if not self._rare_keys:
+            return {}
+        return json.loads(self._rare)
+
+    def _store_rare(self, rare):
+        if not rare:
+            self._rare_keys = frozenset()
+            if hasattr(self, '_rare'):
+                del self._rare
+            return
+        keys = frozenset(rare.keys())
+        self._rare_keys = _rare_key_sets.setdefault(keys, keys)
+        self._rare = json.dumps(rare)
+
+    def _has(self, key):
+        if key in self.RARE_FIELDS:
+            return key in self._rare_keys
+        return Record._has(self, key)
+
+    def _get(self, key):
+        if key == 'releases':
+            return self._releases
+        if key in self.RARE_FIELDS:
+            if key not in self._rare_keys:
+                raise AttributeError(key)
+            return self._load_rare()[key]
+        return getattr(self, key)
+
+    def _set(self, key, value):
+        if key == 'releases':
+            # The release list is copied so the records can replace the dicts
+            if isinstance(value, list):
+                value = [compact_release(release) for release in value]
+            self._releases = value
+        elif key in self.RARE_FIELDS:
+            rare = self._load_rare()
+            rare[key] = value
+            self._store_rare(rare)
+        elif key in ('homepage', 'issues', 'load_order'):
+            setattr(self, key, intern_string(value))
+        else:
+            setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key == 'releases':
+            if key not in self:
+                raise KeyError(key)
+            del self._releases
+            return
+        if key in self.RARE_FIELDS:
+            if key not in self._rare_keys:
+                raise KeyError(key)
+            rare = self._load_rare()
+            del rare[key]
+            self._store_rare(rare)
+            return
+        Record.__delitem__(self, key)
+
+    def values(self):
+        return [value for key, value in self.items()]
+
+    def items(self):
+        # The rare fields are decoded once, rather than once per key
+        rare = self._load_rare()
+        return [
+            (key, rare[key] if key in self._rare_keys else self[key])
+            for key in self.keys()
+        ]
+
+
+def compact_release(release):
+    """
+    :param release:
+        A release dict or ReleaseRecord
+
+    :return:
+        A ReleaseRecord
+    """
+
+    if isinstance(release, ReleaseRecord) or not isinstance(release, dict):
+        return release
+    return ReleaseRecord(release)
+
+
+def compact_catalog(packages):
+    """
+    Replaces the package dicts of a catalog with PackageRecord objects, in
+    place. Values that already are records are left alone, so it is cheap to
+    call on catalogs that were already compacted.
+
+    :param packages:
+        A dict of package or dependency name to info dict
+
+    :return:
+        The same dict
+    """
+
+    if not packages:
+        return packages
+    for name in list(packages.keys()):
+        info = packages[name]
+        if isinstance(info, dict):
+            packages[name] = PackageRecord(info)
+    return packages
@@ -0,0 +1,135 @@
+import os
+import json
+from threading import Lock, Timer
+
+from ..console_write import console_write
+from ..file_not_found_error import FileNotFoundError
+from ..open_compat import open_compat, read_compat
+from ..sys_path import pc_cache_dir
+from ..replace_file import replace_file
+from ..deps.asn1crypto.util import OrderedDict
+
+
+# Commit dates never change for a given SHA, so they are kept on disk
+# indefinitely, only bounded by this number of entries
+MAX_ENTRIES = 50000
+
+# When full, the oldest entries are removed until this many are left
+EVICT_TO = 37500
+
+# How many seconds to wait after a change before writing the file, so a
+# channel refresh that adds dates for many packages results in one write
+SAVE_DELAY = 2.0
+
+# An OrderedDict of SHA to timestamp, in the order the dates were recorded.
+# The file stores a list of [SHA, timestamp] pairs to keep that order.
+_dates = None
+_dirty = False
+_save_timer = None
+_lock = Lock()
+
+
+def _cache_path():
+    return os.path.join(pc_cache_dir(), 'commit_dates.json')
+
+
+def _load():
+    global _dates
+
+    if _dates is not None:
+        return
+
+    _dates = OrderedDict()
+    try:
+        with open_compat(_cache_path(), 'r') as f:
+            data = json.loads(read_compat(f))
+        if isinstance(data, list):
+            _dates = OrderedDict(tuple(pair) for pair in data if len(pair) == 2)
+        # The original format, without an order
+        elif isinstance(data, dict):
+            _dates = OrderedDict(sorted(data.items()))
+    except (FileNotFoundError, ValueError, IOError, OSError):
+        pass
+
+
+def get_commit_dates(shas):
+    """
+    Looks up the commit timestamps that are already known
+
+    :param shas:
+        A list of commit SHA strings
+
+    :return:
+        A dict of SHA to "YYYY-MM-DD HH:MM:SS" timestamp string, for the SHAs
+        that were found
+    """
+
+    with _lock:
+        _load()
+        output = {}
+        for sha in shas:
+            if sha in _dates:
+                output[sha] = _dates[sha]
+        return output
+
+
+def set_commit_dates(dates):
+    """
+    Records commit timestamps for later lookups
+
+    :param dates:
+        A dict of SHA to "YYYY-MM-DD HH:MM:SS" timestamp string
+    """
+
+    global _dirty, _save_timer
+
+    if not dates:
+        return
+
+    with _lock:
+        _load()
+        if len(_dates) + len(dates) > MAX_ENTRIES:
+            # The dates recorded longest ago go first
+            for sha in list(_dates.keys())[0:len(_dates) + len(dates) - EVICT_TO]:
+                del _dates[sha]
+        _dates.update(dates)
+        _dirty = True
+
+        if _save_timer is None:
+            _save_timer = Timer(SAVE_DELAY, save_commit_dates)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+def save_commit_dates():
+    """
+    Writes the known commit timestamps to disk, if any were added. This is
+    done automatically SAVE_DELAY seconds after set_commit_dates().
+    """
+
+    global _dirty, _save_timer
+
+    with _lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        if not _dirty:
+            return
+        _dirty = False
+
+        cache_path = _cache_path()
+        tmp_path = cache_path + '-new'
+        try:
+            cache_dir = os.path.dirname(cache_path)
+            if not os.path.exists(cache_dir):
+                os.makedirs(cache_dir)
+            with open_compat(tmp_path, 'w') as f:
+                f.write(json.dumps(list(_dates.items())))
+            replace_file(tmp_path, cache_path)
+        except (IOError, OSError) as e:
+            console_write(
+                u'''
+                Unable to write the commit date cache to %s: %s
+                ''',
+                (cache_path, e)
+            )
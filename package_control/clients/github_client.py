@@ -11,6 +11,7 @@ except (ImportError):
 
 from ..versions import version_sort, version_process
 from .json_api_client import JSONApiClient
+from .commit_date_cache import get_commit_dates, set_commit_dates
 from ..downloaders.downloader_exception import DownloaderException
 
 
@@ -93,6 +94,10 @@ class GitHubClient(JSONApiClient):
             tags_url = self._make_api_url(user_repo, '/tags?per_page=100')
             tags_list = self.fetch_json(tags_url)
             tags = [tag['name'] for tag in tags_list]
+            tag_shas = {}
+            for tag in tags_list:
+                if tag.get('commit'):
+                    tag_shas[tag['name']] = tag['commit']['sha']
             tag_info = version_process(tags, tag_prefix)
             tag_info = version_sort(tag_info, reverse=True)
             if not tag_info:
@@ -107,10 +112,13 @@ class GitHubClient(JSONApiClient):
                 output.append({
                     'url': url_pattern % (user_repo, tag),
                     'commit': tag,
+                    'sha': tag_shas.get(tag),
                     'version': version
                 })
                 used_versions[version] = True
 
+            self._fill_tag_dates(user_repo, output)
+
         else:
             user_repo, branch = self._user_repo_branch(url)
             if not user_repo:
@@ -126,20 +134,72 @@ class GitHubClient(JSONApiClient):
             })
 
         for release in output:
-            query_string = urlencode({'sha': release['commit'], 'per_page': 1})
-            commit_url = self._make_api_url(user_repo, '/commits?%s' % query_string)
-            commit_info = self.fetch_json(commit_url)
+            sha = release.pop('sha', None)
+            if 'date' not in release:
+                query_string = urlencode({'sha': release['commit'], 'per_page': 1})
+                commit_url = self._make_api_url(user_repo, '/commits?%s' % query_string)
+                commit_info = self.fetch_json(commit_url)
 
-            timestamp = commit_info[0]['commit']['committer']['date'][0:19].replace('T', ' ')
+                timestamp = self._commit_timestamp(commit_info[0])
+                release['date'] = timestamp
+                if sha:
+                    set_commit_dates({sha: timestamp})
 
             if 'version' not in release:
-                release['version'] = re.sub(r'[\-: ]', '.', timestamp)
-            release['date'] = timestamp
+                release['version'] = re.sub(r'[\-: ]', '.', release['date'])
 
             del release['commit']
 
         return output
 
+    def _fill_tag_dates(self, user_repo, releases):
+        """
+        Sets the "date" key of tag releases without making a request per tag.
+        Dates are looked up by the immutable commit SHA of each tag, and any
+        that are not known yet are read from a single page of the commit
+        history of the newest tag, since older tags are usually ancestors.
+
+        :param user_repo:
+            The user/repo of the repository
+
+        :param releases:
+            A list of release dicts with the "sha" key, newest first
+        """
+
+        shas = [release['sha'] for release in releases if release.get('sha')]
+        if not shas:
+            return
+
+        dates = get_commit_dates(shas)
+        missing = set(shas) - set(dates.keys())
+
+        if missing:
+            query_string = urlencode({'sha': shas[0], 'per_page': 100})
+            commits_url = self._make_api_url(user_repo, '/commits?%s' % query_string)
+            found = {}
+            for commit_info in self.fetch_json(commits_url):
+                if commit_info.get('sha') in missing:
+                    found[commit_info['sha']] = self._commit_timestamp(commit_info)
+            set_commit_dates(found)
+            dates.update(found)
+
+        for release in releases:
+            if release.get('sha') in dates:
+                release['date'] = dates[release['sha']]
+
+    def _commit_timestamp(self, commit_info):
+        """
+        Extracts the commit timestamp from a commit returned by the API
+
+        :param commit_info:
+            A dict of a commit from the GitHub API
+
+        :return:
+            A "YYYY-MM-DD HH:MM:SS" timestamp string
+        """
+
+        return commit_info['commit']['committer']['date'][0:19].replace('T', ' ')
+
     def repo_info(self, url):
         """
         Retrieve general information about a repository
@@ -3,6 +3,7 @@ import re
 from ..downloaders.downloader_exception import DownloaderException
 from ..versions import version_process, version_sort
 from .json_api_client import JSONApiClient
+from .commit_date_cache import get_commit_dates, set_commit_dates
 
 try:
     # Python 3
@@ -109,6 +110,14 @@ class GitLabClient(JSONApiClient):
             )
             tags_list = self.fetch_json(tags_url)
             tags = [tag['name'] for tag in tags_list]
+
+            # The tags API includes the commit of each tag, so the dates can
+            # be taken from it instead of requesting every commit separately
+            tag_commits = {}
+            for tag in tags_list:
+                if tag.get('commit'):
+                    tag_commits[tag['name']] = tag['commit']
+
             tag_info = version_process(tags, tag_prefix)
             tag_info = version_sort(tag_info, reverse=True)
             if not tag_info:
@@ -121,11 +130,17 @@ class GitLabClient(JSONApiClient):
                     continue
                 tag = info['prefix'] + version
                 repo_name = user_repo.split('/')[1]
-                output.append({
+                release = {
                     'url': url_pattern % (user_repo, tag, repo_name, tag),
                     'commit': tag,
                     'version': version,
-                })
+                }
+                commit = tag_commits.get(tag)
+                if commit:
+                    release['sha'] = commit.get('id')
+                    if commit.get('committed_date'):
+                        release['date'] = commit['committed_date'][0:19].replace('T', ' ')
+                output.append(release)
                 used_versions[version] = True
 
         else:
@@ -152,24 +167,35 @@ class GitLabClient(JSONApiClient):
                 'commit': commit
             })
 
+        shas = [release['sha'] for release in output if release.get('sha')]
+        known_dates = get_commit_dates(shas)
+
         for release in output:
-            query_string = urlencode({
-                'ref_name': release['commit'],
-                'per_page': 1
-            })
-            commit_url = self._make_api_url(
-                repo_id,
-                '/repository/commits?%s' % query_string
-            )
-            commit_info = self.fetch_json(commit_url)
-            if not commit_info[0].get('commit'):
-                timestamp = commit_info[0]['committed_date'][0:19].replace('T', ' ')
-            else:
-                timestamp = commit_info[0]['commit']['committed_date'][0:19].replace('T', ' ')
+            sha = release.pop('sha', None)
+            if 'date' not in release and sha in known_dates:
+                release['date'] = known_dates[sha]
+
+            if 'date' not in release:
+                query_string = urlencode({
+                    'ref_name': release['commit'],
+                    'per_page': 1
+                })
+                commit_url = self._make_api_url(
+                    repo_id,
+                    '/repository/commits?%s' % query_string
+                )
+                commit_info = self.fetch_json(commit_url)
+                if not commit_info[0].get('commit'):
+                    timestamp = commit_info[0]['committed_date'][0:19].replace('T', ' ')
+                else:
+                    timestamp = commit_info[0]['commit']['committed_date'][0:19].replace('T', ' ')
+                release['date'] = timestamp
+
+            if sha and sha not in known_dates:
+                set_commit_dates({sha: release['date']})
 
             if 'version' not in release:
-                release['version'] = re.sub(r'[\-: ]', '.', timestamp)
-            release['date'] = timestamp
+                release['version'] = re.sub(r'[\-: ]', '.', release['date'])
 
             del release['commit']
 
@@ -19,10 +19,13 @@ from .package_control_edit_settings_command import PackageControlEditSettingsCom
 from .package_control_enable_debug_mode_command import PackageControlEnableDebugModeCommand
 from .package_control_insert_command import PackageControlInsertCommand
 from .package_control_tests_command import PackageControlTestsCommand
+from .package_control_timing_summary_command import PackageControlTimingSummaryCommand
 from .package_control_open_default_settings_command import PackageControlOpenDefaultSettingsCommand
 from .package_control_open_user_settings_command import PackageControlOpenUserSettingsCommand
 from .remove_channel_command import RemoveChannelCommand
 from .remove_repository_command import RemoveRepositoryCommand
+from .restore_package_backup_command import RestorePackageBackupCommand
+from .rollback_package_command import RollbackPackageCommand
 from .satisfy_dependencies_command import SatisfyDependenciesCommand
 
 
@@ -48,9 +51,12 @@ __all__ = [
     'PackageControlEnableDebugModeCommand',
     'PackageControlInsertCommand',
     'PackageControlTestsCommand',
+    'PackageControlTimingSummaryCommand',
     'PackageControlOpenDefaultSettingsCommand',
     'PackageControlOpenUserSettingsCommand',
     'RemoveChannelCommand',
     'RemoveRepositoryCommand',
+    'RestorePackageBackupCommand',
+    'RollbackPackageCommand',
     'SatisfyDependenciesCommand'
 ]
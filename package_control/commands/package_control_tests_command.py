@@ -2,6 +2,7 @@ import sublime
 import sublime_plugin
 
 from ..tests import runner
+from ..tests.backup_store import BackupStoreTests
 from ..tests.clients import GitHubClientTests, BitBucketClientTests
 from ..tests.providers import (
     BitBucketRepositoryProviderTests,
@@ -12,6 +13,8 @@ from ..tests.providers import (
     GitLabUserProviderTests,
     RepositoryProviderTests,
 )
+from ..tests.setting_watcher import SettingWatcherTests
+from ..tests.versions import VersionKeyTests
 
 
 class PackageControlTestsCommand(sublime_plugin.WindowCommand):
@@ -31,7 +34,10 @@ class PackageControlTestsCommand(sublime_plugin.WindowCommand):
                 GitLabRepositoryProviderTests,
                 GitLabUserProviderTests,
                 RepositoryProviderTests,
-                ChannelProviderTests
+                ChannelProviderTests,
+                SettingWatcherTests,
+                BackupStoreTests,
+                VersionKeyTests
             ]
         )
 
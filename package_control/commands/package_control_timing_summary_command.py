@@ -0,0 +1,32 @@
+import sublime
+import sublime_plugin
+
+from .. import text
+from .. import timing
+
+
+class PackageControlTimingSummaryCommand(sublime_plugin.WindowCommand):
+
+    """
+    A command that shows where the time of the last install, upgrade and
+    refresh operations went, from the timing log
+    """
+
+    def run(self, count=10):
+        records = timing.read_operations(count)
+        if not records:
+            sublime.message_dialog(text.format(
+                u'''
+                PackagesManager
+
+                There are no timed operations. Set "timing_log" to true to
+                record the phases of installs, upgrades and refreshes.
+                '''
+            ))
+            return
+
+        view = self.window.new_file()
+        view.set_name('PackagesManager Timing')
+        view.set_scratch(True)
+        view.run_command('package_control_insert', {'string': timing.summarize(records)})
+        view.set_read_only(True)
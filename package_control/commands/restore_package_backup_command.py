@@ -0,0 +1,132 @@
+import os
+import time
+import threading
+
+import sublime
+import sublime_plugin
+
+from .. import text
+from ..show_error import show_error
+from ..show_quick_panel import show_quick_panel
+from ..thread_progress import ThreadProgress
+from ..package_installer import PackageInstaller
+from ..unicode import unicode_from_os
+
+USE_QUICK_PANEL_ITEM = hasattr(sublime, 'QuickPanelItem')
+
+
+class RestorePackageBackupCommand(sublime_plugin.WindowCommand):
+
+    """
+    A command that presents the snapshots taken of unpacked packages before
+    they were upgraded, and puts the selected one back in place
+    """
+
+    def run(self):
+        thread = RestorePackageBackupThread(self.window)
+        thread.start()
+        ThreadProgress(thread, 'Loading package backups', '')
+
+
+class RestorePackageBackupThread(threading.Thread, PackageInstaller):
+
+    """
+    A thread to run the action of retrieving the package snapshots in
+    """
+
+    def __init__(self, window):
+        """
+        :param window:
+            An instance of :class:`sublime.Window` that represents the Sublime
+            Text window to show the list of snapshots in.
+        """
+        self.window = window
+        threading.Thread.__init__(self)
+        PackageInstaller.__init__(self)
+
+    def run(self):
+        self.store = self.manager.backup_store()
+        if not self.store:
+            sublime.message_dialog(text.format(
+                u'''
+                PackagesManager
+
+                Package snapshots are disabled. Set "backup_mode" to
+                "snapshot" to back up packages incrementally before upgrades.
+                '''
+            ))
+            return
+
+        self.snapshots = self.store.snapshots()
+        self.snapshot_list = []
+        for snapshot in self.snapshots:
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snapshot['created']))
+            description = '%d files' % len(snapshot['files'])
+            action = 'Restore backup from %s' % created
+            if USE_QUICK_PANEL_ITEM:
+                self.snapshot_list.append(sublime.QuickPanelItem(snapshot['package'], [description, action]))
+            else:
+                self.snapshot_list.append([snapshot['package'], description, action])
+
+        def show_panel():
+            if not self.snapshot_list:
+                sublime.message_dialog(text.format(
+                    u'''
+                    PackagesManager
+
+                    There are no package backups to restore
+                    '''
+                ))
+                return
+            show_quick_panel(self.window, self.snapshot_list, self.on_done)
+        sublime.set_timeout(show_panel, 10)
+
+    def on_done(self, picked):
+        """
+        Quick panel user selection handler - disables the package, puts the
+        snapshot in place, then re-enables the package
+
+        :param picked:
+            An integer of the 0-based snapshot index from the presented list.
+            -1 means the user cancelled.
+        """
+
+        if picked == -1:
+            return
+
+        snapshot = self.snapshots[picked]
+        package_name = snapshot['package']
+        package_dir = os.path.join(self.manager.settings['packages_path'], package_name)
+
+        disabled = package_name in self.disable_packages(package_name, 'upgrade')
+
+        def restore():
+            result = False
+            try:
+                # The current files are backed up too, so the restore can be
+                # undone, without pruning the snapshot being restored
+                if os.path.exists(package_dir):
+                    self.store.add(package_name, package_dir, keep=[snapshot])
+                self.store.restore(snapshot, package_dir)
+                self.manager.invalidate_inventory()
+                result = True
+            except (OSError, IOError) as e:
+                show_error(
+                    u'''
+                    An error occurred while trying to restore the backup of %s.
+
+                    %s
+                    ''',
+                    (package_name, unicode_from_os(e))
+                )
+            if disabled:
+                sublime.set_timeout(lambda: self.reenable_package(package_name), 700)
+            thread.result = result
+
+        thread = threading.Thread(target=restore)
+        thread.start()
+        ThreadProgress(
+            thread,
+            'Restoring the backup of %s' % package_name,
+            'Package %s successfully restored' % package_name
+        )
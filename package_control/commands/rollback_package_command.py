@@ -0,0 +1,113 @@
+import threading
+
+import sublime
+import sublime_plugin
+
+from .. import text
+from ..show_quick_panel import show_quick_panel
+from ..thread_progress import ThreadProgress
+from ..package_installer import PackageInstaller, PackageInstallerThread
+
+USE_QUICK_PANEL_ITEM = hasattr(sublime, 'QuickPanelItem')
+
+
+class RollbackPackageCommand(sublime_plugin.WindowCommand):
+
+    """
+    A command that presents the installed packages that have another version
+    in the archive store, and installs the selected version without
+    downloading it
+    """
+
+    def run(self):
+        thread = RollbackPackageThread(self.window)
+        thread.start()
+        ThreadProgress(thread, 'Loading stored archives', '')
+
+
+class RollbackPackageThread(threading.Thread, PackageInstaller):
+
+    """
+    A thread to run the action of retrieving the stored package versions in
+    """
+
+    def __init__(self, window):
+        """
+        :param window:
+            An instance of :class:`sublime.Window` that represents the Sublime
+            Text window to show the list of stored versions in.
+        """
+        self.window = window
+        self.completion_type = 'rolled back'
+        threading.Thread.__init__(self)
+        PackageInstaller.__init__(self)
+
+    def run(self):
+        store = self.manager.archive_store()
+        if not store:
+            sublime.message_dialog(text.format(
+                u'''
+                PackagesManager
+
+                The archive cache is disabled. Set "archive_cache" to true to
+                keep the downloaded package archives for rollbacks.
+                '''
+            ))
+            return
+
+        self.versions = []
+        self.package_list = []
+        for package_name in sorted(self.manager.list_packages(), key=lambda s: s.lower()):
+            installed_version = self.manager.get_metadata(package_name).get('version')
+            for release in store.releases(package_name):
+                if release['version'] == installed_version:
+                    continue
+                self.versions.append((package_name, release['version']))
+                description = 'Installed: %s' % (installed_version or 'unknown')
+                action = 'Roll back to %s' % release['version']
+                if USE_QUICK_PANEL_ITEM:
+                    self.package_list.append(sublime.QuickPanelItem(package_name, [description, action]))
+                else:
+                    self.package_list.append([package_name, description, action])
+
+        def show_panel():
+            if not self.package_list:
+                sublime.message_dialog(text.format(
+                    u'''
+                    PackagesManager
+
+                    There are no stored package versions to roll back to
+                    '''
+                ))
+                return
+            show_quick_panel(self.window, self.package_list, self.on_done)
+        sublime.set_timeout(show_panel, 10)
+
+    def on_done(self, picked):
+        """
+        Quick panel user selection handler - disables a package, installs the
+        stored version, then re-enables the package
+
+        :param picked:
+            An integer of the 0-based package version index from the presented
+            list. -1 means the user cancelled.
+        """
+
+        if picked == -1:
+            return
+
+        package_name, version = self.versions[picked]
+
+        if package_name in self.disable_packages(package_name, 'upgrade'):
+            def on_complete():
+                self.reenable_package(package_name)
+        else:
+            on_complete = None
+
+        thread = PackageInstallerThread(self.manager, package_name, on_complete, pause=True, version=version)
+        thread.start()
+        ThreadProgress(
+            thread,
+            'Rolling back package %s to %s' % (package_name, version),
+            'Package %s successfully %s to %s' % (package_name, self.completion_type, version)
+        )
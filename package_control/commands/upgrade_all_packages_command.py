@@ -5,7 +5,7 @@ import functools
 import sublime
 import sublime_plugin
 
-from .. import text
+from .. import text, timing
 from ..console_write import console_write
 from ..show_quick_panel import show_quick_panel
 from ..thread_progress import ThreadProgress
@@ -46,36 +46,44 @@ class UpgradeAllPackagesThread(threading.Thread, PackageInstaller):
         PackageInstaller.__init__(self)
 
     def run(self):
-        package_names = []
-        package_list = self.make_package_list(['install', 'reinstall', 'none'])
-        self.package_renamer.rename_packages(self.manager)
+        with timing.operation('upgrade_all'):
+            package_names = []
+            package_list = self.make_package_list(['install', 'reinstall', 'none'])
+            self.package_renamer.rename_packages(self.manager)
 
-        if not package_list:
-            sublime.message_dialog(text.format(
-                u'''
-                PackagesManager
+            if not package_list:
+                sublime.message_dialog(text.format(
+                    u'''
+                    PackagesManager
 
-                There are no packages ready for upgrade
-                '''
-            ))
-            return
+                    There are no packages ready for upgrade
+                    '''
+                ))
+                return
 
-        console_write( 'Upgrading packages %s' % package_list )
+            console_write( 'Upgrading packages %s' % package_list )
 
-        for info in package_list:
-            if USE_QUICK_PANEL_ITEM:
-                package_name = info.trigger
-            else:
-                package_name = info[0]
-            package_names.append(package_name)
+            for info in package_list:
+                if USE_QUICK_PANEL_ITEM:
+                    package_name = info.trigger
+                else:
+                    package_name = info[0]
+                package_names.append(package_name)
 
-        iterable = IgnoredPackagesBugFixer(package_names, 'upgrade')
+            # Download the packages while the previous ones are being installed
+            self.manager.prefetch_packages(package_names)
 
-        for package in iterable:
-            console_write( 'Upgrading package %s' % package )
+            try:
+                iterable = IgnoredPackagesBugFixer(package_names, 'upgrade')
 
-            # Do not reenable if installation deferred until next restart
-            if self.manager.install_package(package) is None:
-                iterable.skip_reenable(package)
+                for package in iterable:
+                    console_write( 'Upgrading package %s' % package )
 
-            console_write( 'Package %s successfully %s' % (package, self.completion_type) )
+                    # Do not reenable if installation deferred until next restart
+                    if self.manager.install_package(package) is None:
+                        iterable.skip_reenable(package)
+
+                    console_write( 'Package %s successfully %s' % (package, self.completion_type) )
+
+            finally:
+                self.manager.finish_prefetch()
@@ -1,6 +1,8 @@
+import os
 import re
+import time
 import socket
-from threading import Lock, Timer
+from threading import Condition, Lock, Timer, local
 from contextlib import contextmanager
 import sys
 
@@ -19,7 +21,8 @@ from .show_error import show_error
 from .console_write import console_write
 from .cache import set_cache, get_cache
 from .unicode import unicode_from_os
-from . import text
+from .open_compat import open_compat
+from . import text, timing
 
 from .downloaders import DOWNLOADERS
 from .downloaders.urllib_downloader import UrlLibDownloader
@@ -31,18 +34,30 @@ from .downloaders.oscrypto_downloader_exception import OscryptoDownloaderExcepti
 from .http_cache import HttpCache
 
 
-# A dict of domains - each points to a list of downloaders
+# A dict of hostnames - each points to a list of (DownloadManager, release time)
+# tuples for the idle managers, the most recently released one last
 _managers = {}
 
-# How many managers are currently checked out
-_in_use = 0
+# A dict of hostnames - each points to the number of managers checked out
+_in_use = {}
 
 # Make sure connection management doesn't run into threading issues
 _lock = Lock()
+_released = Condition(_lock)
 
-# A timer used to disconnect all managers after a period of no usage
+# The hostnames each thread currently has a manager checked out for
+_held = local()
+
+# A timer used to disconnect idle managers
 _timer = None
 
+# How many seconds an idle manager keeps its connection open
+IDLE_TIMEOUT = 5.0
+
+# How often a checkout re-used an idle manager, created a new one, or had to
+# wait for another thread to release one, and how many idle managers timed out
+_stats = {'hits': 0, 'misses': 0, 'waits': 0, 'evictions': 0}
+
 
 @contextmanager
 def downloader(url, settings):
@@ -56,77 +71,140 @@ def downloader(url, settings):
             _release(url, manager)
 
 
-def _grab(url, settings):
-    global _managers, _lock, _in_use, _timer
+def _hostname(url):
+    parsed = urlparse(url)
+    if not parsed or not parsed.hostname:
+        raise DownloaderException(u'The URL "%s" is malformed' % url)
+    return parsed.hostname.lower()
 
-    _lock.acquire()
-    try:
-        if _timer:
-            _timer.cancel()
-            _timer = None
 
-        parsed = urlparse(url)
-        if not parsed or not parsed.hostname:
-            raise DownloaderException(u'The URL "%s" is malformed' % url)
-        hostname = parsed.hostname.lower()
-        if hostname not in _managers:
-            _managers[hostname] = []
+def _held_hosts():
+    if not hasattr(_held, 'hosts'):
+        _held.hosts = {}
+    return _held.hosts
 
-        if not _managers[hostname]:
-            _managers[hostname].append(DownloadManager(settings))
 
-        _in_use += 1
+def _grab(url, settings):
+    hostname = _hostname(url)
+    limit = max(1, int(settings.get('max_concurrent_requests_per_host', 4)))
+    held = _held_hosts()
+
+    with _released:
+        # A thread that already has a manager for the host never waits, since
+        # it could be waiting for itself
+        waited = False
+        while _in_use.get(hostname, 0) >= limit and not held.get(hostname):
+            waited = True
+            _released.wait()
+        if waited:
+            _stats['waits'] += 1
+
+        if _managers.get(hostname):
+            manager = _managers[hostname].pop()[0]
+            _stats['hits'] += 1
+            timing.count('connection_pool_hits')
+        else:
+            manager = DownloadManager(settings)
+            _stats['misses'] += 1
+            timing.count('connection_pool_misses')
 
-        return _managers[hostname].pop()
+        _in_use[hostname] = _in_use.get(hostname, 0) + 1
+        held[hostname] = held.get(hostname, 0) + 1
 
-    finally:
-        _lock.release()
+        return manager
 
 
 def _release(url, manager):
-    global _managers, _lock, _in_use, _timer
+    hostname = _hostname(url)
+    held = _held_hosts()
 
-    _lock.acquire()
-    try:
-        hostname = urlparse(url).hostname.lower()
+    with _released:
+        if held.get(hostname):
+            held[hostname] -= 1
 
-        # This means the package was reloaded between _grab and _release,
-        # so the downloader is using old code and we want to discard it
-        if hostname not in _managers:
+        # This means the package was reloaded, or all connections were closed,
+        # between _grab and _release, so the manager is discarded
+        if hostname not in _in_use:
+            manager.close()
             return
 
-        _managers[hostname].insert(0, manager)
+        _in_use[hostname] -= 1
+        _managers.setdefault(hostname, []).append((manager, time.time()))
+        _released.notify_all()
 
-        _in_use -= 1
+        _schedule_eviction(IDLE_TIMEOUT)
 
-        if _timer:
-            _timer.cancel()
-            _timer = None
 
-        if _in_use == 0:
-            _timer = Timer(5.0, close_all_connections)
-            _timer.start()
+def _schedule_eviction(delay):
+    global _timer
 
-    finally:
-        _lock.release()
+    if _timer:
+        return
+    _timer = Timer(delay, _evict_idle)
+    _timer.daemon = True
+    _timer.start()
+
+
+def _evict_idle():
+    """
+    Closes the managers that have been idle for IDLE_TIMEOUT seconds, and
+    schedules another run for the ones that have not
+    """
+
+    global _timer
+
+    with _released:
+        _timer = None
+
+        now = time.time()
+        next_expiration = None
+        for hostname in list(_managers.keys()):
+            idle = []
+            for manager, released in _managers[hostname]:
+                if now - released >= IDLE_TIMEOUT:
+                    manager.close()
+                    _stats['evictions'] += 1
+                    continue
+                idle.append((manager, released))
+                expiration = released + IDLE_TIMEOUT
+                if next_expiration is None or expiration < next_expiration:
+                    next_expiration = expiration
+            _managers[hostname] = idle
+
+        if next_expiration is not None:
+            _schedule_eviction(max(next_expiration - now, 0.1))
 
 
 def close_all_connections():
-    global _managers, _lock, _in_use, _timer
+    global _managers, _in_use, _timer
 
-    _lock.acquire()
-    try:
+    with _released:
         if _timer:
             _timer.cancel()
             _timer = None
 
         for domain, managers in _managers.items():
-            for manager in managers:
+            for manager, released in managers:
                 manager.close()
         _managers = {}
+        _in_use = {}
+        _released.notify_all()
 
-    finally:
-        _lock.release()
+
+def connection_stats():
+    """
+    Returns counters about the re-use of connections
+
+    :return:
+        A dict with the keys "hits", "misses", "waits", "evictions", "idle"
+        and "in_use"
+    """
+
+    with _released:
+        output = dict(_stats)
+        output['idle'] = sum(len(managers) for managers in _managers.values())
+        output['in_use'] = sum(_in_use.values())
+        return output
 
 
 def update_url(url, debug):
@@ -181,7 +259,8 @@ class DownloadManager(object):
         self.settings = settings
         if settings.get('http_cache'):
             cache_length = settings.get('http_cache_length', 604800)
-            self.settings['cache'] = HttpCache(cache_length)
+            cache_max_size = settings.get('http_cache_max_size', 50)
+            self.settings['cache'] = HttpCache(cache_length, int(cache_max_size * 1024 * 1024))
 
     def close(self):
         if self.downloader:
@@ -208,6 +287,48 @@ class DownloadManager(object):
             The string contents of the URL
         """
 
+        return self._fetch(url, error_message, prefer_cached)
+
+    def fetch_to_file(self, url, path, error_message, progress=None):
+        """
+        Downloads a URL and writes the contents to a file. Downloaders that
+        support it stream the response to disk chunk by chunk, so large
+        package files are never held in memory all at once.
+
+        :param url:
+            The string URL to download
+
+        :param path:
+            The filesystem path to write the contents to
+
+        :param error_message:
+            The error message to include if the download fails
+
+        :param progress:
+            An optional callable that accepts the number of bytes downloaded
+            so far and the total number of bytes (or None if not known)
+
+        :raises:
+            DownloaderException: if there was an error downloading the URL
+
+        :return:
+            The path the contents were written to
+        """
+
+        return self._fetch(url, error_message, False, path, progress)
+
+    def _fetch(self, url, error_message, prefer_cached, path=None, progress=None):
+        """
+        Performs the download for fetch() and fetch_to_file()
+
+        :param path:
+            If not None, the contents are written to this filesystem path
+            and the path is returned instead of the contents
+
+        :param progress:
+            A progress callable for when the contents are written to path
+        """
+
         is_ssl = re.search('^https://', url) is not None
 
         url = update_url(url, self.settings.get('debug'))
@@ -347,8 +468,26 @@ class DownloadManager(object):
                 )
             raise DownloaderException(error_string)
 
+        span = timing.span('http_request')
         try:
-            return self.downloader.download(url, error_message, timeout, 3, prefer_cached)
+            if path is None:
+                content = self.downloader.download(url, error_message, timeout, 3, prefer_cached)
+                timing.count('bytes_downloaded', len(content))
+                return content
+
+            if hasattr(self.downloader, 'download_to_file'):
+                path = self.downloader.download_to_file(url, path, error_message, timeout, 3, progress)
+                timing.count('bytes_downloaded', os.path.getsize(path))
+                return path
+
+            # Downloaders without streaming support still buffer the response
+            content = self.downloader.download(url, error_message, timeout, 3)
+            with open_compat(path, 'wb') as f:
+                f.write(content)
+            timing.count('bytes_downloaded', len(content))
+            if progress:
+                progress(len(content), len(content))
+            return path
 
         except (RateLimitException) as e:
 
@@ -374,7 +513,8 @@ class DownloadManager(object):
 
             self.downloader = UrlLibDownloader(self.settings)
             # Try again with the new downloader!
-            return self.fetch(url, error_message, prefer_cached)
+            span.end()
+            return self._fetch(url, error_message, prefer_cached, path, progress)
 
         except (WinDownloaderException) as e:
 
@@ -412,4 +552,8 @@ class DownloadManager(object):
 
             self.downloader = UrlLibDownloader(settings)
             # Try again with the new downloader!
-            return self.fetch(url, error_message, prefer_cached)
+            span.end()
+            return self._fetch(url, error_message, prefer_cached, path, progress)
+
+        finally:
+            span.end()
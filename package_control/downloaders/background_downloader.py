@@ -1,5 +1,7 @@
 import threading
 
+from .. import timing
+
 
 class BackgroundDownloader(threading.Thread):
 
@@ -27,6 +29,7 @@ class BackgroundDownloader(threading.Thread):
         self.urls = []
         self.providers = providers
         self.used_providers = {}
+        self.operation = timing.current()
         threading.Thread.__init__(self)
 
     def add_url(self, url):
@@ -53,11 +56,12 @@ class BackgroundDownloader(threading.Thread):
         return self.used_providers.get(url)
 
     def run(self):
-        for url in self.urls:
-            for provider_class in self.providers:
-                if provider_class.match_url(url):
-                    provider = provider_class(url, self.settings)
-                    break
-
-            provider.prefetch()
-            self.used_providers[url] = provider
+        with timing.bind(self.operation):
+            for url in self.urls:
+                for provider_class in self.providers:
+                    if provider_class.match_url(url):
+                        provider = provider_class(url, self.settings)
+                        break
+
+                provider.prefetch()
+                self.used_providers[url] = provider
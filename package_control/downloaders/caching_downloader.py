@@ -1,8 +1,8 @@
 import re
-import json
 import hashlib
 
 from ..console_write import console_write
+from .. import timing
 
 try:
     # Python 2
@@ -34,19 +34,10 @@ class CachingDownloader(object):
         if not cache:
             return headers
 
-        info_key = self.generate_key(url, '.info')
-        info_json = cache.get(info_key)
-        if not info_json:
-            return headers
-
         # Make sure we have the cached content to use if we get a 304
         key = self.generate_key(url)
-        if not cache.has(key):
-            return headers
-
-        try:
-            info = json.loads(info_json.decode('utf-8'))
-        except ValueError:
+        info = cache.info(key)
+        if not info:
             return headers
 
         etag = info.get('etag')
@@ -121,6 +112,7 @@ class CachingDownloader(object):
         if status == 304:
             cached_content = cache.get(key)
             if cached_content:
+                timing.count('http_cache_hits')
                 if debug:
                     console_write(
                         u'''
@@ -135,6 +127,7 @@ class CachingDownloader(object):
             return content
 
         # If we got here, the status is 200
+        timing.count('http_cache_misses')
 
         # Respect some basic cache control headers
         cache_control = headers.get('cache-control', '')
@@ -160,10 +153,6 @@ class CachingDownloader(object):
         if not etag and not last_modified:
             return content
 
-        struct = {'etag': etag, 'last-modified': last_modified}
-        struct_json = json.dumps(struct, indent=4)
-
-        info_key = self.generate_key(url, '.info')
         if debug:
             console_write(
                 u'''
@@ -172,8 +161,7 @@ class CachingDownloader(object):
                 (url, cache.path(key))
             )
 
-        cache.set(info_key, struct_json.encode('utf-8'))
-        cache.set(key, content)
+        cache.set(key, content, {'etag': etag, 'last-modified': last_modified})
 
         return content
 
@@ -223,6 +211,8 @@ class CachingDownloader(object):
         key = self.generate_key(url)
 
         cached_content = cache.get(key)
+        if cached_content:
+            timing.count('http_cache_hits')
         if cached_content and debug:
             console_write(
                 u'''
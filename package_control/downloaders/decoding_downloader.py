@@ -1,6 +1,8 @@
 import gzip
 import zlib
 
+from ..open_compat import open_compat
+
 try:
     # Python 3
     from io import BytesIO as StringIO
@@ -16,6 +18,40 @@ except (ImportError):
 from .downloader_exception import DownloaderException
 
 
+# The number of bytes to read from the network at a time when streaming
+CHUNK_SIZE = 65536
+
+
+class PassthroughDecoder(object):
+
+    """
+    An incremental decoder for responses without a Content-Encoding
+    """
+
+    def decompress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+class Bz2Decoder(object):
+
+    """
+    Wraps bz2.BZ2Decompressor to provide the same interface as zlib's
+    decompression objects
+    """
+
+    def __init__(self):
+        self.decompressor = bz2.BZ2Decompressor()
+
+    def decompress(self, data):
+        return self.decompressor.decompress(data)
+
+    def flush(self):
+        return b''
+
+
 class DecodingDownloader(object):
 
     """
@@ -62,3 +98,72 @@ class DecodingDownloader(object):
             decompresser = zlib.decompressobj(-zlib.MAX_WBITS)
             return decompresser.decompress(response) + decompresser.flush()
         return response
+
+    def incremental_decoder(self, encoding):
+        """
+        Creates an object that can decode a response one chunk at a time,
+        based on the Content-Encoding HTTP header
+
+        :param encoding:
+            The value of the Content-Encoding HTTP header
+
+        :return:
+            An object with the methods decompress(data) and flush()
+        """
+
+        if encoding == 'bzip2':
+            if bz2:
+                return Bz2Decoder()
+            else:
+                raise DownloaderException(u'Received bzip2 file contents, but was unable to import the bz2 module')
+        elif encoding == 'gzip':
+            # Adding 16 to wbits makes zlib expect a gzip header and trailer
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            return zlib.decompressobj(-zlib.MAX_WBITS)
+        return PassthroughDecoder()
+
+    def decode_to_file(self, encoding, read, path, size=None, progress=None):
+        """
+        Reads a raw response in chunks, decoding and writing each one to a
+        file as it arrives, so the full response is never held in memory
+
+        :param encoding:
+            The value of the Content-Encoding HTTP header
+
+        :param read:
+            A callable that accepts a number of bytes and returns up to that
+            many bytes of the raw response, or an empty byte string at the end
+
+        :param path:
+            The filesystem path to write the decoded response to
+
+        :param size:
+            The value of the Content-Length HTTP header, if known
+
+        :param progress:
+            An optional callable that accepts the number of raw bytes read so
+            far and the total number of bytes (or None if not known)
+
+        :return:
+            The number of raw bytes read
+        """
+
+        try:
+            total = int(size) if size else None
+        except (ValueError):
+            total = None
+
+        decoder = self.incremental_decoder(encoding)
+        received = 0
+        with open_compat(path, 'wb') as f:
+            while True:
+                chunk = read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+                f.write(decoder.decompress(chunk))
+                if progress:
+                    progress(received, total)
+            f.write(decoder.flush())
+        return received
@@ -15,7 +15,7 @@ from ..open_compat import open_compat, read_compat
 from .downloader_exception import DownloaderException
 from .oscrypto_downloader_exception import OscryptoDownloaderException
 from ..ca_certs import get_user_ca_bundle_path
-from .decoding_downloader import DecodingDownloader
+from .decoding_downloader import DecodingDownloader, CHUNK_SIZE
 from .limiting_downloader import LimitingDownloader
 from .caching_downloader import CachingDownloader
 from .. import text
@@ -126,6 +126,57 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
             if cached:
                 return cached
 
+        return self._download(url, error_message, timeout, tries)
+
+    def download_to_file(self, url, path, error_message, timeout, tries, progress=None):
+        """
+        Downloads a URL and writes the contents to a file as they arrive,
+        without holding the whole response in memory. Responses written to
+        a file are never cached.
+
+        :param url:
+            The URL to download
+
+        :param path:
+            The filesystem path to write the contents to
+
+        :param error_message:
+            A string to include in the console error that is printed
+            when an error occurs
+
+        :param timeout:
+            The int number of seconds to set the timeout to
+
+        :param tries:
+            The int number of times to try and download the URL in the case of
+            a timeout or HTTP 503 error
+
+        :param progress:
+            An optional callable that accepts the number of bytes downloaded
+            so far and the total number of bytes (or None if not known)
+
+        :raises:
+            RateLimitException: when a rate limit is hit
+            DownloaderException: when any other download error occurs
+
+        :return:
+            The path the contents were written to
+        """
+
+        return self._download(url, error_message, timeout, tries, path, progress)
+
+    def _download(self, url, error_message, timeout, tries, path=None, progress=None):
+        """
+        Performs the request for download() and download_to_file()
+
+        :param path:
+            If not None, the contents are streamed to this filesystem path
+            and the path is returned instead of the contents
+
+        :param progress:
+            A progress callable for when the contents are written to path
+        """
+
         reused = None
 
         debug = self.debug
@@ -148,17 +199,19 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
                 user_agent = self.settings.get('user_agent')
                 if user_agent:
                     req_headers["User-Agent"] = user_agent
-                req_headers = self.add_conditional_headers(url, req_headers)
+                # A 304 response can't be served when streaming to a file
+                if path is None:
+                    req_headers = self.add_conditional_headers(url, req_headers)
 
                 request = 'GET '
                 url_info = urlparse(url)
                 if self.using_proxy:
                     request += url + ' HTTP/1.1'
                 else:
-                    path = '/' if not url_info.path else url_info.path
+                    request_path = '/' if not url_info.path else url_info.path
                     if url_info.query:
-                        path += '?' + url_info.query
-                    request += path + ' HTTP/1.1'
+                        request_path += '?' + url_info.query
+                    request += request_path + ' HTTP/1.1'
                 self.write_request(request, req_headers)
 
                 response = self.read_headers()
@@ -171,6 +224,11 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
                     continue
                 version, code, message, resp_headers = response
 
+                if path is not None and code == 200:
+                    self.read_body_to_file(code, resp_headers, timeout, path, progress)
+                    self.handle_rate_limit(resp_headers, url)
+                    return path
+
                 # Read the body to get any remaining data off the socket
                 data = self.read_body(code, resp_headers, timeout)
 
@@ -186,7 +244,7 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
                         if not location.startswith('/'):
                             location = os.path.dirname(url_info.path) + location
                         location = url_info.scheme + '://' + url_info.netloc + location
-                    return self.download(location, error_message, timeout, tried, prefer_cached)
+                    return self._download(location, error_message, timeout, tried, path, progress)
 
                 # Make sure we obey Github's rate limiting headers
                 self.handle_rate_limit(resp_headers, url)
@@ -536,9 +594,67 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
             A byte string of the decompressed plain text body
         """
 
+        data = b''.join(self.iter_body(code, resp_headers, timeout))
+
+        encoding = resp_headers.get('content-encoding')
+        return self.decode_response(encoding, data)
+
+    def read_body_to_file(self, code, resp_headers, timeout, path, progress=None):
+        """
+        Reads the body of the request and writes it to a file, decompressing
+        it one chunk at a time so memory use does not depend on its size
+
+        :param code:
+            The integer HTTP response code
+
+        :param resp_headers:
+            A dict of the response headers
+
+        :param timeout:
+            An integer number of seconds to timeout a read
+
+        :param path:
+            The filesystem path to write the decompressed plain text body to
+
+        :param progress:
+            An optional callable that accepts the number of bytes read so far
+            and the total number of bytes (or None if not known)
+        """
+
+        chunks = self.iter_body(code, resp_headers, timeout)
+
+        # Each call returns the next chunk from the socket, which is at most
+        # CHUNK_SIZE bytes, or b'' once the body is complete
+        def read(size):
+            return next(chunks, b'')
+
+        self.decode_to_file(
+            resp_headers.get('content-encoding'),
+            read,
+            path,
+            resp_headers.get('content-length'),
+            progress
+        )
+
+    def iter_body(self, code, resp_headers, timeout):
+        """
+        Reads the raw body of the request from the socket
+
+        :param code:
+            The integer HTTP response code
+
+        :param resp_headers:
+            A dict of the response headers
+
+        :param timeout:
+            An integer number of seconds to timeout a read
+
+        :return:
+            A generator of byte strings of at most CHUNK_SIZE bytes each
+        """
+
         # Should adhere to https://tools.ietf.org/html/rfc7230#section-3.3.3
 
-        data = b''
         transfer_encoding = resp_headers.get('transfer-encoding')
         if transfer_encoding and transfer_encoding.lower() == 'chunked':
             while True:
@@ -547,7 +663,10 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
                     chunk_length = int(line, 16)
                     if chunk_length == 0:
                         break
-                    data += self.socket.read_exactly(chunk_length)
+                    while chunk_length > 0:
+                        size = min(chunk_length, CHUNK_SIZE)
+                        yield self.socket.read_exactly(size)
+                        chunk_length -= size
                     if self.socket.read_exactly(2) != b'\r\n':
                         raise OscryptoDownloaderException('Unable to parse chunk newline')
                 else:
@@ -556,8 +675,10 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
         else:
             content_length = self.parse_content_length(resp_headers)
             if content_length is not None:
-                if content_length > 0:
-                    data = self.socket.read_exactly(content_length)
+                while content_length > 0:
+                    size = min(content_length, CHUNK_SIZE)
+                    yield self.socket.read_exactly(size)
+                    content_length -= size
             elif code == 204 or code == 304 or (code >= 100 and code < 200):
                 # These HTTP codes are defined to not have a body
                 pass
@@ -568,15 +689,12 @@ class OscryptoDownloader(DecodingDownloader, LimitingDownloader, CachingDownload
             else:
                 # This should only happen if the server is going to close the connection
                 while self.socket.select_read(timeout=timeout):
-                    data += self.socket.read(8192)
+                    yield self.socket.read(CHUNK_SIZE)
                 self.close()
 
         if resp_headers.get('connection', '').lower() == 'close':
             self.close()
 
-        encoding = resp_headers.get('content-encoding')
-        return self.decode_response(encoding, data)
-
     def dump_certificate(self, cert):
         """
         If debugging is enabled, dumps info about the certificate
@@ -114,6 +114,57 @@ class UrlLibDownloader(DecodingDownloader, LimitingDownloader, CachingDownloader
             if cached:
                 return cached
 
+        return self._download(url, error_message, timeout, tries)
+
+    def download_to_file(self, url, path, error_message, timeout, tries, progress=None):
+        """
+        Downloads a URL and writes the contents to a file as they arrive,
+        without holding the whole response in memory. Responses written to
+        a file are never cached.
+
+        :param url:
+            The URL to download
+
+        :param path:
+            The filesystem path to write the contents to
+
+        :param error_message:
+            A string to include in the console error that is printed
+            when an error occurs
+
+        :param timeout:
+            The int number of seconds to set the timeout to
+
+        :param tries:
+            The int number of times to try and download the URL in the case of
+            a timeout or HTTP 503 error
+
+        :param progress:
+            An optional callable that accepts the number of bytes downloaded
+            so far and the total number of bytes (or None if not known)
+
+        :raises:
+            RateLimitException: when a rate limit is hit
+            DownloaderException: when any other download error occurs
+
+        :return:
+            The path the contents were written to
+        """
+
+        return self._download(url, error_message, timeout, tries, path, progress)
+
+    def _download(self, url, error_message, timeout, tries, path=None, progress=None):
+        """
+        Performs the request for download() and download_to_file()
+
+        :param path:
+            If not None, the contents are streamed to this filesystem path
+            and the path is returned instead of the contents
+
+        :param progress:
+            A progress callable for when the contents are written to path
+        """
+
         self.setup_opener(url, timeout)
 
         debug = self.settings.get('debug')
@@ -134,11 +185,25 @@ class UrlLibDownloader(DecodingDownloader, LimitingDownloader, CachingDownloader
                 if user_agent:
                     request_headers["User-Agent"] = user_agent
 
-                request_headers = self.add_conditional_headers(url, request_headers)
+                # A 304 response can't be served when streaming to a file
+                if path is None:
+                    request_headers = self.add_conditional_headers(url, request_headers)
                 request = Request(url, headers=request_headers)
                 http_file = self.opener.open(request, timeout=timeout)
                 self.handle_rate_limit(http_file.headers, url)
 
+                if path is not None:
+                    self.decode_to_file(
+                        http_file.headers.get('content-encoding'),
+                        http_file.read,
+                        path,
+                        http_file.headers.get('content-length'),
+                        progress
+                    )
+                    # Make sure the response is closed so we can re-use the connection
+                    http_file.close()
+                    return path
+
                 result = http_file.read()
                 # Make sure the response is closed so we can re-use the connection
                 http_file.close()
@@ -4,6 +4,7 @@ import base64
 import hashlib
 import os
 import sys
+import threading
 
 try:
     # Python 3
@@ -28,6 +29,53 @@ from .invalid_certificate_exception import InvalidCertificateException
 try:
     import ssl
 
+    # SSLContext objects are shared so the CA certs are only loaded once, and
+    # so TLS sessions can be resumed, which only works with the same context
+    _contexts = {}
+
+    # (hostname, port) -> ssl.SSLSession of the last connection - Python 3.6+
+    _sessions = {}
+
+    _context_lock = threading.Lock()
+
+    def _get_context(ca_certs, cert_reqs):
+        """
+        Returns a shared ssl.SSLContext for client connections
+
+        :param ca_certs:
+            The filesystem path to the CA certs file
+
+        :param cert_reqs:
+            The ssl.CERT_* constant for certificate verification
+
+        :return:
+            An ssl.SSLContext object
+        """
+
+        try:
+            ca_mtime = os.path.getmtime(ca_certs)
+        except (OSError, TypeError):
+            ca_mtime = None
+        key = (ca_certs, ca_mtime, cert_reqs)
+
+        with _context_lock:
+            if key not in _contexts:
+                proto = ssl.PROTOCOL_SSLv23
+                if sys.version_info >= (3, 6):
+                    proto = ssl.PROTOCOL_TLS
+                ctx = ssl.SSLContext(proto)
+                if sys.version_info < (3, 7):
+                    ctx.options = ssl.OP_ALL | ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3
+                else:
+                    ctx.minimum_version = ssl.TLSVersion.TLSv1
+                ctx.verify_mode = cert_reqs
+                ctx.load_verify_locations(ca_certs)
+                # Sessions can not be resumed with a different context
+                _contexts.clear()
+                _sessions.clear()
+                _contexts[key] = ctx
+            return _contexts[key]
+
     class ValidatingHTTPSConnection(DebuggableHTTPConnection):
 
         """
@@ -62,6 +110,23 @@ try:
             else:
                 self.cert_reqs = ssl.CERT_NONE
 
+        def _save_session(self):
+            """
+            Remembers the TLS session of the connection so the next connection
+            to the same host can skip the full handshake. With TLS 1.3 the
+            session is only sent after the handshake, so this is also called
+            when closing the connection.
+            """
+
+            session = getattr(self.sock, 'session', None)
+            if session is not None:
+                _sessions[(self.host.split(':', 0)[0], self.port)] = session
+
+        def close(self):
+            if self.sock is not None:
+                self._save_session()
+            DebuggableHTTPConnection.close(self)
+
         def get_valid_hosts_for_cert(self, cert):
             """
             Returns a list of valid hostnames for an SSL certificate
@@ -307,16 +372,7 @@ try:
 
             # Python 3 supports SNI when using an SSLContext
             if sys.version_info >= (3,):
-                proto = ssl.PROTOCOL_SSLv23
-                if sys.version_info >= (3, 6):
-                    proto = ssl.PROTOCOL_TLS
-                self.ctx = ssl.SSLContext(proto)
-                if sys.version_info < (3, 7):
-                    self.ctx.options = ssl.OP_ALL | ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3
-                else:
-                    self.ctx.minimum_version = ssl.TLSVersion.TLSv1
-                self.ctx.verify_mode = self.cert_reqs
-                self.ctx.load_verify_locations(self.ca_certs)
+                self.ctx = _get_context(self.ca_certs, self.cert_reqs)
                 # We don't call load_cert_chain() with self.key_file and self.cert_file
                 # since that is for servers, and this code only supports client mode
                 if self.debuglevel == -1:
@@ -328,10 +384,12 @@ try:
                         indent='  ',
                         prefix=False
                     )
-                self.sock = self.ctx.wrap_socket(
-                    self.sock,
-                    server_hostname=hostname
-                )
+                wrap_args = {'server_hostname': hostname}
+                session = _sessions.get((hostname, self.port))
+                if session is not None:
+                    wrap_args['session'] = session
+                self.sock = self.ctx.wrap_socket(self.sock, **wrap_args)
+                self._save_session()
 
             else:
                 self.sock = ssl.wrap_socket(
@@ -354,6 +412,14 @@ try:
                     indent='  ',
                     prefix=False
                 )
+                if getattr(self.sock, 'session_reused', False):
+                    console_write(
+                        u'''
+                          Resumed the previous TLS session
+                        ''',
+                        indent='  ',
+                        prefix=False
+                    )
 
             # This debugs and validates the SSL certificate
             if self.cert_reqs & ssl.CERT_REQUIRED:
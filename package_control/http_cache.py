@@ -1,22 +1,71 @@
 import os
+import json
 import time
+import threading
 
+from .console_write import console_write
 from .file_not_found_error import FileNotFoundError
 from .open_compat import open_compat, read_compat
 from .sys_path import pc_cache_dir
+from .replace_file import replace_file
+
+
+INDEX_VERSION = 1
+
+# The default number of bytes the cached responses may use on disk
+DEFAULT_MAX_SIZE = 50 * 1024 * 1024
+
+# How often expired entries are removed in the background, in seconds
+EXPIRE_INTERVAL = 300
+
+# How many entries are checked before the index lock is released again
+EXPIRE_BATCH = 200
+
+# How many seconds to wait after a change before writing the index
+SAVE_DELAY = 2.0
+
+# Some filesystems only store modification times to the nearest one or two
+# seconds, so files this close to the index being loaded are not removed
+MTIME_RESOLUTION = 2.0
+
+# Base path -> _CacheIndex, shared by all HttpCache objects of a process
+_indexes = {}
+_indexes_lock = threading.Lock()
 
 
 class HttpCache(object):
 
     """
     A data store for caching HTTP response data.
+
+    Every entry is a file in a subdirectory named after the first two
+    characters of its key. A single index file records the size, write time,
+    last access time and HTTP validators of every entry, so lookups do not
+    touch the filesystem. The total size is kept under a byte budget by
+    removing the least recently used entries, and expired entries are
+    removed by a background thread.
+
+    :param ttl:
+        The number of seconds a cache entry should be valid for
+
+    :param max_size:
+        The number of bytes the cache may use, defaults to DEFAULT_MAX_SIZE
     """
 
-    def __init__(self, ttl):
+    def __init__(self, ttl, max_size=None):
         self.base_path = os.path.join(pc_cache_dir(), 'http_cache')
-        if not os.path.exists(self.base_path):
-            os.mkdir(self.base_path)
-        self.clear(int(ttl))
+        self.ttl = int(ttl)
+
+        with _indexes_lock:
+            index = _indexes.get(self.base_path)
+            if index is None:
+                index = _CacheIndex(self.base_path)
+                _indexes[self.base_path] = index
+        self.index = index
+
+        if max_size is not None:
+            index.max_size = int(max_size)
+        index.schedule_expiry(self.ttl)
 
     def clear(self, ttl):
         """
@@ -26,17 +75,7 @@ class HttpCache(object):
             The number of seconds a cache entry should be valid for
         """
 
-        ttl = int(ttl)
-
-        for filename in os.listdir(self.base_path):
-            path = os.path.join(self.base_path, filename)
-            # There should not be any folders in the cache dir, but we
-            # ignore to prevent an exception
-            if os.path.isdir(path):
-                continue
-            mtime = os.stat(path).st_mtime
-            if mtime < time.time() - ttl:
-                os.unlink(path)
+        self.index.expire(int(ttl))
 
     def get(self, key):
         """
@@ -48,16 +87,31 @@ class HttpCache(object):
         :return:
             The (binary) cached value, or False
         """
+
+        if not self.index.touch(key):
+            return False
         try:
-            cache_file = os.path.join(self.base_path, key)
-            with open_compat(cache_file, 'rb') as f:
+            with open_compat(self.path(key), 'rb') as f:
                 return read_compat(f)
-        except FileNotFoundError:
+        except (FileNotFoundError, IOError, OSError):
+            self.index.forget(key)
             return False
 
     def has(self, key):
-        cache_file = os.path.join(self.base_path, key)
-        return os.path.exists(cache_file)
+        return self.index.contains(key)
+
+    def info(self, key):
+        """
+        Returns the HTTP validators stored with a cached value
+
+        :param key:
+            The key to fetch the info for
+
+        :return:
+            A dict with the keys "etag" and "last-modified", or None
+        """
+
+        return self.index.info(key)
 
     def path(self, key):
         """
@@ -70,9 +124,9 @@ class HttpCache(object):
             The absolute filesystem path to the cache file
         """
 
-        return os.path.join(self.base_path, key)
+        return self.index.path(key)
 
-    def set(self, key, content):
+    def set(self, key, content, info=None):
         """
         Saves a value in the cache
 
@@ -81,8 +135,236 @@ class HttpCache(object):
 
         :param content:
             The (binary) content to cache
+
+        :param info:
+            An optional dict with the keys "etag" and "last-modified"
         """
 
-        cache_file = os.path.join(self.base_path, key)
-        with open_compat(cache_file, 'wb') as f:
+        cache_file = self.path(key)
+        cache_dir = os.path.dirname(cache_file)
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # Write to a temporary file and rename it, so readers never see a
+        # partially written entry
+        tmp_file = '%s-%s.tmp' % (cache_file, threading.current_thread().ident)
+        with open_compat(tmp_file, 'wb') as f:
             f.write(content)
+        replace_file(tmp_file, cache_file)
+
+        self.index.add(key, len(content), info)
+
+
+class _CacheIndex(object):
+
+    """
+    The in-memory index of an HTTP cache folder, written to index.json
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.index_path = os.path.join(base_path, 'index.json')
+        self.max_size = DEFAULT_MAX_SIZE
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.total_size = 0
+        self.dirty = False
+        self.save_timer = None
+        self.next_expiry = 0
+        self.loaded_at = time.time()
+
+        if not os.path.exists(base_path):
+            os.makedirs(base_path)
+
+        loaded = False
+        try:
+            with open_compat(self.index_path, 'r') as f:
+                data = json.loads(read_compat(f))
+            if isinstance(data, dict) and data.get('version') == INDEX_VERSION:
+                self.entries = data.get('entries', {})
+                loaded = True
+        except (FileNotFoundError, ValueError, IOError, OSError):
+            pass
+
+        self.total_size = sum(entry['size'] for entry in self.entries.values())
+
+        # Files from before the index existed, or written by a process that
+        # was stopped before it saved the index, are unknown and removed
+        if not loaded:
+            self.next_expiry = time.time() + EXPIRE_INTERVAL
+            self._start(self._remove_unindexed)
+
+    def path(self, key):
+        return os.path.join(self.base_path, key[0:2], key)
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def info(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            return {'etag': entry.get('etag'), 'last-modified': entry.get('last-modified')}
+
+    def touch(self, key):
+        """
+        Marks an entry as used
+
+        :return:
+            If the entry exists
+        """
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return False
+            entry['accessed'] = int(time.time())
+            self._changed()
+            return True
+
+    def add(self, key, size, info=None):
+        now = int(time.time())
+        with self.lock:
+            old = self.entries.get(key)
+            if old:
+                self.total_size -= old['size']
+            entry = {'size': size, 'written': now, 'accessed': now}
+            if info:
+                entry['etag'] = info.get('etag')
+                entry['last-modified'] = info.get('last-modified')
+            self.entries[key] = entry
+            self.total_size += size
+
+            if self.total_size > self.max_size:
+                self._evict()
+            self._changed()
+
+    def forget(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry:
+                self.total_size -= entry['size']
+                self._changed()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache uses 90% of
+        its budget, so the next few writes do not each trigger an eviction
+        """
+
+        target = self.max_size * 0.9
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['accessed']):
+            if self.total_size <= target:
+                break
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_size -= entry['size']
+        try:
+            os.unlink(self.path(key))
+        except (OSError):
+            pass
+
+    def schedule_expiry(self, ttl):
+        """
+        Starts removing expired entries in the background, at most once
+        every EXPIRE_INTERVAL seconds
+        """
+
+        with self.lock:
+            now = time.time()
+            if now < self.next_expiry:
+                return
+            self.next_expiry = now + EXPIRE_INTERVAL
+        self._start(lambda: self.expire(ttl))
+
+    def expire(self, ttl):
+        """
+        Removes the entries written more than ttl seconds ago, releasing the
+        lock every EXPIRE_BATCH entries so requests are not held up
+        """
+
+        cutoff = time.time() - ttl
+        with self.lock:
+            keys = list(self.entries.keys())
+
+        for offset in range(0, len(keys), EXPIRE_BATCH):
+            with self.lock:
+                for key in keys[offset:offset + EXPIRE_BATCH]:
+                    entry = self.entries.get(key)
+                    if entry and entry['written'] < cutoff:
+                        self._remove(key)
+                        self.dirty = True
+
+        self.save()
+
+    def _remove_unindexed(self):
+        """
+        Removes the files that are not in the index. Only files from before
+        the index was loaded are removed, since the temporary files of a
+        concurrent set(), and the entries it renames into place before adding
+        them to the index, are newer.
+        """
+
+        for filename in os.listdir(self.base_path):
+            path = os.path.join(self.base_path, filename)
+            if os.path.isdir(path):
+                for shard_filename in os.listdir(path):
+                    with self.lock:
+                        if shard_filename in self.entries:
+                            continue
+                    self._remove_old_file(os.path.join(path, shard_filename))
+            elif filename != 'index.json':
+                self._remove_old_file(path)
+
+        with self.lock:
+            self.dirty = True
+        self.save()
+
+    def _remove_old_file(self, path):
+        try:
+            if os.stat(path).st_mtime < self.loaded_at - MTIME_RESOLUTION:
+                os.unlink(path)
+        except (OSError):
+            pass
+
+    def _changed(self):
+        """
+        Marks the index as changed and writes it after SAVE_DELAY seconds,
+        so a burst of requests results in a single write
+        """
+
+        self.dirty = True
+        if self.save_timer is None:
+            self.save_timer = threading.Timer(SAVE_DELAY, self.save)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def save(self):
+        with self.lock:
+            self.save_timer = None
+            if not self.dirty:
+                return
+            self.dirty = False
+            data = json.dumps({'version': INDEX_VERSION, 'entries': self.entries})
+
+        tmp_path = '%s-%s.tmp' % (self.index_path, threading.current_thread().ident)
+        try:
+            with open_compat(tmp_path, 'w') as f:
+                f.write(data)
+            replace_file(tmp_path, self.index_path)
+        except (IOError, OSError) as e:
+            console_write(
+                u'''
+                Unable to write the HTTP cache index to %s: %s
+                ''',
+                (self.index_path, e)
+            )
+
+    def _start(self, target):
+        thread = threading.Thread(target=target)
+        thread.daemon = True
+        thread.start()
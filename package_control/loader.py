@@ -8,7 +8,7 @@ import zipimport
 import shutil
 import time
 from textwrap import dedent
-from threading import Event, Lock
+from threading import Event, Lock, local
 
 try:
     str_cls = unicode
@@ -17,7 +17,7 @@ except (NameError):
 
 import sublime
 
-from . import sys_path
+from . import sys_path, timing
 from .console_write import console_write
 from .package_disabler import PackageDisabler
 from .settings import pc_settings_filename, load_list_setting, save_list_setting
@@ -62,6 +62,121 @@ else:
 new_loader_package_path = loader_package_path + u'-new'
 intermediate_loader_package_path = loader_package_path + u'-intermediate'
 
+# The open LoaderTransaction of each thread, see transaction()
+_transactions = local()
+
+
+class LoaderTransaction():
+
+    """
+    Queues loader adds and removes so they are all written to the loader
+    package with a single rewrite of the archive, and at most one swap.
+    Obtained from transaction(), and used as a context manager:
+
+        with loader.transaction():
+            loader.add_or_update('01', 'dep_one')
+            loader.remove('dep_two')
+
+    While it is open, add(), add_or_update() and remove() called on the same
+    thread are queued into it. The changes are committed when the outermost
+    with block exits.
+    """
+
+    def __init__(self):
+        # Dependency name -> (priority, code) to add, or None to remove
+        self.changes = {}
+        self.depth = 0
+
+    def add(self, priority, name, code=None):
+        """
+        Queues adding or replacing the loader of a dependency
+
+        :param priority:
+            A two-digit string of the load order
+
+        :param name:
+            The name of the dependency as a unicode string
+
+        :param code:
+            Any special loader code, otherwise the default will be used
+        """
+
+        if not code:
+            code = _default_loader(name)
+        self.changes[name] = (priority, code)
+
+    def remove(self, name):
+        """
+        Queues removing the loader of a dependency
+
+        :param name:
+            The name of the dependency
+        """
+
+        self.changes[name] = None
+
+    def __enter__(self):
+        self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.depth -= 1
+        if self.depth == 0:
+            _transactions.current = None
+            # The dependencies that were installed or removed before an error
+            # still need their loaders to be updated
+            self.commit()
+        return False
+
+    def commit(self):
+        """
+        Writes all of the queued changes to the loader package
+        """
+
+        changes = self.changes
+        self.changes = {}
+        if not changes:
+            return
+
+        if sys.version_info < (3,):
+            for name, change in changes.items():
+                if change is None:
+                    _remove(name)
+                else:
+                    _remove(name)
+                    _add(change[0], name, change[1])
+            return
+
+        _commit(changes)
+
+
+def transaction():
+    """
+    Returns the loader transaction of the current thread, starting one if
+    none is open. Nested with blocks join the outer transaction.
+
+    :return:
+        A LoaderTransaction object
+    """
+
+    current = getattr(_transactions, 'current', None)
+    if current is None:
+        current = LoaderTransaction()
+        _transactions.current = current
+    return current
+
+
+def _current_transaction():
+    """
+    :return:
+        The LoaderTransaction open on the current thread, or None
+    """
+
+    current = getattr(_transactions, 'current', None)
+    if current is not None and current.depth > 0:
+        return current
+    return None
+
 
 def __update_loaders(z):
     """
@@ -194,6 +309,11 @@ def add_or_update(priority, name, code=None):
         Any special loader code, otherwise the default will be used
     """
 
+    current = _current_transaction()
+    if current:
+        current.add(priority, name, code)
+        return
+
     load_order, existing_code = _existing_info(name, True)
 
     if load_order is not None:
@@ -226,12 +346,19 @@ def add(priority, name, code=None):
         Any special loader code, otherwise the default will be used
     """
 
-    if not code:
-        code = _default_loader(name)
+    current = _current_transaction()
+    if current:
+        current.add(priority, name, code)
+        return
 
-    loader_filename = '%s-%s.py' % (priority, name)
+    _add(priority, name, code)
 
-    just_created_loader = False
+
+def _loader_metadata():
+    """
+    :return:
+        A byte string of the dependency-metadata.json for the loader package
+    """
 
     loader_metadata = {
         "version": "1.0.0",
@@ -242,7 +369,51 @@ def add(priority, name, code=None):
         "url": "https://github.com/wbond/package_control/issues",
         "description": "Packages_Manager dependency loader"
     }
-    loader_metadata_enc = json.dumps(loader_metadata).encode('utf-8')
+    return json.dumps(loader_metadata).encode('utf-8')
+
+
+def _is_valid_loader(z):
+    """
+    A cheap integrity check of the loader package. Opening the zip already
+    parsed the central directory, so this only makes sure the metadata entry
+    is there instead of decompressing every entry like ZipFile.testzip().
+
+    :param z:
+        The zipfile.ZipFile object of the loader package
+
+    :return:
+        A bool if the loader package can be appended to
+    """
+
+    try:
+        z.getinfo('dependency-metadata.json')
+        return True
+    except (KeyError):
+        return False
+
+
+def _add(priority, name, code=None):
+    """
+    Adds a dependency to the loader, without checking for a transaction
+
+    :param priority:
+        A two-digit string of the load order
+
+    :param name:
+        The name of the dependency as a unicode string
+
+    :param code:
+        Any special loader code, otherwise the default will be used
+    """
+
+    if not code:
+        code = _default_loader(name)
+
+    loader_filename = '%s-%s.py' % (priority, name)
+
+    just_created_loader = False
+
+    loader_metadata_enc = _loader_metadata()
 
     if sys.version_info < (3,):
         if not path.exists(loader_package_path):
@@ -284,9 +455,8 @@ def add(priority, name, code=None):
                 try:
                     with zipfile.ZipFile(package_to_update, 'r') as rz:
                         # Make sure the zip file can be read
-                        res = rz.testzip()
-                        if res is not None:
-                            raise zipfile.BadZipfile('zip test failed')
+                        if not _is_valid_loader(rz):
+                            raise zipfile.BadZipfile('dependency-metadata.json missing')
                         mode = 'a'
                 except (zipfile.BadZipfile, OSError):
                     os.unlink(package_to_update)
@@ -308,53 +478,61 @@ def add(priority, name, code=None):
 
     # Clean things up for people who were tracking the master branch
     if just_created_loader:
-        old_loader_sp = path.join(sys_path.installed_packages_path, '0-packages_manager_loader.sublime-package')
-        old_loader_dir = path.join(sys_path.packages_path, '0-packages_manager_loader')
+        _cleanup_old_loaders()
 
-        removed_old_loader = False
 
-        if path.exists(old_loader_sp):
-            removed_old_loader = True
-            os.remove(old_loader_sp)
+def _cleanup_old_loaders():
+    """
+    Removes the loader and dependencies used by old versions
+    """
 
-        if path.exists(old_loader_dir):
-            removed_old_loader = True
-            try:
-                shutil.rmtree(old_loader_dir)
-            except (OSError):
-                open(os.path.join(old_loader_dir, 'package-control.cleanup'), 'w').close()
-
-        if removed_old_loader:
-            console_write(
-                u'''
-                Cleaning up remenants of old loaders
-                '''
-            )
-
-            pc_settings = sublime.load_settings(pc_settings_filename())
-            orig_installed_packages = load_list_setting(pc_settings, 'installed_packages')
-            installed_packages = list(orig_installed_packages)
-
-            if '0-packages_manager_loader' in installed_packages:
-                installed_packages.remove('0-packages_manager_loader')
-
-            for name in ['bz2', 'ssl-linux', 'ssl-windows']:
-                dep_dir = path.join(sys_path.packages_path, name)
-                if path.exists(dep_dir):
-                    try:
-                        shutil.rmtree(dep_dir)
-                    except (OSError):
-                        open(os.path.join(dep_dir, 'package-control.cleanup'), 'w').close()
-                if name in installed_packages:
-                    installed_packages.remove(name)
+    old_loader_sp = path.join(sys_path.installed_packages_path, '0-packages_manager_loader.sublime-package')
+    old_loader_dir = path.join(sys_path.packages_path, '0-packages_manager_loader')
+
+    removed_old_loader = False
+
+    if path.exists(old_loader_sp):
+        removed_old_loader = True
+        os.remove(old_loader_sp)
 
-            save_list_setting(
-                pc_settings,
-                pc_settings_filename(),
-                'installed_packages',
-                installed_packages,
-                orig_installed_packages
-            )
+    if path.exists(old_loader_dir):
+        removed_old_loader = True
+        try:
+            shutil.rmtree(old_loader_dir)
+        except (OSError):
+            open(os.path.join(old_loader_dir, 'package-control.cleanup'), 'w').close()
+
+    if removed_old_loader:
+        console_write(
+            u'''
+            Cleaning up remenants of old loaders
+            '''
+        )
+
+        pc_settings = sublime.load_settings(pc_settings_filename())
+        orig_installed_packages = load_list_setting(pc_settings, 'installed_packages')
+        installed_packages = list(orig_installed_packages)
+
+        if '0-packages_manager_loader' in installed_packages:
+            installed_packages.remove('0-packages_manager_loader')
+
+        for name in ['bz2', 'ssl-linux', 'ssl-windows']:
+            dep_dir = path.join(sys_path.packages_path, name)
+            if path.exists(dep_dir):
+                try:
+                    shutil.rmtree(dep_dir)
+                except (OSError):
+                    open(os.path.join(dep_dir, 'package-control.cleanup'), 'w').close()
+            if name in installed_packages:
+                installed_packages.remove(name)
+
+        save_list_setting(
+            pc_settings,
+            pc_settings_filename(),
+            'installed_packages',
+            installed_packages,
+            orig_installed_packages
+        )
 
 
 def remove(name):
@@ -365,6 +543,22 @@ def remove(name):
         The name of the dependency
     """
 
+    current = _current_transaction()
+    if current:
+        current.remove(name)
+        return
+
+    _remove(name)
+
+
+def _remove(name):
+    """
+    Removes a loader by name, without checking for a transaction
+
+    :param name:
+        The name of the dependency
+    """
+
     if not path.exists(loader_package_path):
         return
 
@@ -423,6 +617,16 @@ def remove(name):
         loader_lock.release()
         return
 
+    _queue_swap()
+    loader_lock.release()
+
+
+def _queue_swap():
+    """
+    Disables the loader package and queues swapping in the new loader
+    package. The loader_lock MUST be held when calling this function.
+    """
+
     def _do_disable():
         disabler = PackageDisabler()
         disabler.disable_packages(loader_package_name, 'loader')
@@ -441,11 +645,139 @@ def remove(name):
     # hitting a race condition where files are overwritten and rename operations
     # fail because the source file doesn't exist.
     if not swap_event.in_process():
+        timing.count('loader_swaps')
         swap_event.start()
         sublime.set_timeout(_do_swap, 1000)
 
     non_local['last_action'] = time.time()
-    loader_lock.release()
+
+
+def _commit(changes):
+    """
+    Applies the changes of a LoaderTransaction to the loader package. New
+    loaders are appended to the archive when nothing has to be removed,
+    otherwise the archive is rewritten once and a single swap is queued.
+
+    :param changes:
+        A dict of dependency name to a 2-element tuple (priority, code) of
+        the loader to add, or None to remove the loader
+    """
+
+    # Make sure Python doesn't use the old file listing for the loader
+    # when trying to import modules
+    if loader_package_path in zipimport._zip_directory_cache:
+        del zipimport._zip_directory_cache[loader_package_path]
+
+    name_regex = re.compile(u'^\\d\\d-(.+)\\.pyc?$')
+
+    just_created_loader = False
+    appended = []
+    old_loader_z = None
+
+    span = timing.span('loader_commit')
+    loader_lock.acquire()
+
+    try:
+        # If a swap is queued, the changes go into the loader that will be
+        # swapped into place shortly
+        if swap_event.in_process() and os.path.exists(new_loader_package_path):
+            source_path = new_loader_package_path
+        else:
+            source_path = loader_package_path
+
+        if os.path.exists(source_path):
+            try:
+                old_loader_z = zipfile.ZipFile(source_path, 'r')
+                if not _is_valid_loader(old_loader_z):
+                    raise zipfile.BadZipfile('dependency-metadata.json missing')
+            except (zipfile.BadZipfile, OSError):
+                if old_loader_z:
+                    old_loader_z.close()
+                    old_loader_z = None
+                os.unlink(source_path)
+
+        # Work out which existing entries need to go, skipping the loaders
+        # that are already up-to-date
+        to_drop = set()
+        to_write = dict(changes)
+        if old_loader_z:
+            for enc_filename in old_loader_z.namelist():
+                filename = enc_filename
+                if not isinstance(filename, str_cls):
+                    filename = filename.decode('utf-8')
+                match = name_regex.match(filename)
+                if not match or match.group(1) not in changes:
+                    continue
+                change = changes[match.group(1)]
+                if change is not None and filename == '%s-%s.py' % (change[0], match.group(1)):
+                    existing_code = old_loader_z.read(enc_filename).decode('utf-8')
+                    if existing_code.strip() == change[1].strip():
+                        to_write.pop(match.group(1), None)
+                        continue
+                to_drop.add(enc_filename)
+
+        to_write = sorted(
+            ('%s-%s.py' % (change[0], name), change[1])
+            for name, change in to_write.items()
+            if change is not None
+        )
+
+        if not to_drop and not to_write:
+            return
+
+        if old_loader_z is None:
+            just_created_loader = True
+            with zipfile.ZipFile(source_path, 'w') as z:
+                z.writestr('dependency-metadata.json', _loader_metadata())
+                for loader_filename, code in to_write:
+                    z.writestr(loader_filename, code.encode('utf-8'))
+                __update_loaders(z)
+
+        elif not to_drop:
+            old_loader_z.close()
+            old_loader_z = None
+            with zipfile.ZipFile(source_path, 'a') as z:
+                for loader_filename, code in to_write:
+                    z.writestr(loader_filename, code.encode('utf-8'))
+                __update_loaders(z)
+            appended = [loader_filename for loader_filename, code in to_write]
+
+        else:
+            if source_path == new_loader_package_path:
+                old_loader_z.close()
+                if os.path.exists(intermediate_loader_package_path):
+                    os.remove(intermediate_loader_package_path)
+                os.rename(new_loader_package_path, intermediate_loader_package_path)
+                old_loader_z = zipfile.ZipFile(intermediate_loader_package_path, 'r')
+
+            with zipfile.ZipFile(new_loader_package_path, 'w') as z:
+                for enc_filename in old_loader_z.namelist():
+                    if enc_filename in to_drop:
+                        continue
+                    z.writestr(enc_filename, old_loader_z.read(enc_filename))
+                for loader_filename, code in to_write:
+                    z.writestr(loader_filename, code.encode('utf-8'))
+                __update_loaders(z)
+
+            _queue_swap()
+
+    finally:
+        if old_loader_z:
+            old_loader_z.close()
+        if os.path.exists(intermediate_loader_package_path):
+            os.remove(intermediate_loader_package_path)
+        loader_lock.release()
+        span.end()
+
+    if appended and not swap_event.in_process():
+        # Manually execute the loader code because Sublime Text does not
+        # detect changes to the zip archive, only if the file is new.
+        importer = zipimport.zipimporter(loader_package_path)
+        for loader_filename in appended:
+            importer.load_module(loader_filename[0:-3])
+
+    if just_created_loader:
+        _cleanup_old_loaders()
 
 
 def _do_swap():
@@ -13,10 +13,10 @@ from .automatic_upgrader import AutomaticUpgrader
 from .package_disabler import PackageDisabler
 from .package_manager import PackageManager
 from .open_compat import open_compat
-from .package_io import package_file_exists
+from .package_io import package_file_exists, close_package_archive
 from .settings import preferences_filename, pc_settings_filename, load_list_setting, save_list_setting, increment_dependencies_installed
 from . import cmd
-from . import loader, text, __version__
+from . import loader, text, usage_queue, __version__
 from .providers.release_selector import is_compatible_version
 from .commands.advanced_uninstall_package_command import AdvancedUninstallPackageThread
 
@@ -54,6 +54,11 @@ class PackageCleanup(threading.Thread):
         # itself up, but also get properly marked as installed in the settings
         installed_packages_at_start = list(self.original_installed_packages)
 
+        # Submit the usage events that were still queued when the last
+        # session ended
+        if self.manager.settings.get('submit_usage'):
+            usage_queue.flush(self.manager.settings)
+
         # Ensure we record the installation of PackagesManager itself
         if 'PackagesManager' not in installed_packages_at_start:
             params = {
@@ -88,6 +93,7 @@ class PackageCleanup(threading.Thread):
                     package_name = file.replace('.sublime-package-new', '')
                     package_file = os.path.join(installed_path, package_name + '.sublime-package')
                     try:
+                        close_package_archive(package_name)
                         if os.path.exists(package_file):
                             os.remove(package_file)
                     except Exception as error:
@@ -147,50 +153,50 @@ class PackageCleanup(threading.Thread):
 
         # Clean up unneeded dependencies so that found_dependencies will only
         # end up having required dependencies added to it
-        for dependency in extra_dependencies:
-            dependency_dir = os.path.join(sublime.packages_path(), dependency)
-            if unlink_or_delete_directory(dependency_dir):
-                console_write(
-                    u'''
-                    Removed directory for unneeded dependency %s
-                    ''',
-                    dependency
-                )
-            else:
-                cleanup_file = os.path.join(dependency_dir, 'package-control.cleanup')
-                if not os.path.exists(cleanup_file):
-                    open_compat(cleanup_file, 'w').close()
-                console_write(
-                    u'''
-                    Unable to remove directory for unneeded dependency %s -
-                    deferring until next start
-                    ''',
-                    dependency
-                )
-            # Make sure when cleaning up the dependency files that we remove the loader for it also
-            loader.remove(dependency)
+        with loader.transaction():
+            for dependency in extra_dependencies:
+                dependency_dir = os.path.join(sublime.packages_path(), dependency)
+                if unlink_or_delete_directory(dependency_dir):
+                    console_write(
+                        u'''
+                        Removed directory for unneeded dependency %s
+                        ''',
+                        dependency
+                    )
+                else:
+                    cleanup_file = os.path.join(dependency_dir, 'package-control.cleanup')
+                    if not os.path.exists(cleanup_file):
+                        open_compat(cleanup_file, 'w').close()
+                    console_write(
+                        u'''
+                        Unable to remove directory for unneeded dependency %s -
+                        deferring until next start
+                        ''',
+                        dependency
+                    )
+                # Make sure when cleaning up the dependency files that we remove the loader for it also
+                loader.remove(dependency)
 
         # command_line_interface = cmd.Cli( None, True )
         # command_line_interface.execute( shlex.split( "ls %s" % sublime.packages_path().replace('\\', '/') ),
         #         sublime.packages_path(), live_output=True, short_errors=True )
 
-        for package_name in os.listdir(sublime.packages_path()):
+        inventory = self.manager.inventory()
+        for package_name in sorted(inventory.dirs.keys()):
             # print( "package_cleanup.py, Processing package: " + str( package_name ) )
             found = True
 
             package_dir = os.path.join(sublime.packages_path(), package_name)
-            if not os.path.isdir(package_dir):
-                continue
 
             clean_old_files(package_dir)
 
-            if int(sublime.version()) > 3000 and os.path.exists(package_dir + '/.sublime-package-override'):
-                if not os.path.exists(package_dir + '/.no-sublime-package'):
+            if int(sublime.version()) > 3000 and inventory.has(package_name, '.sublime-package-override'):
+                if not inventory.has(package_name, '.no-sublime-package'):
                     found = False
 
             # Cleanup packages/dependencies that could not be removed due to in-use files
             cleanup_file = os.path.join(package_dir, 'package-control.cleanup')
-            if os.path.exists(cleanup_file):
+            if inventory.has(package_name, 'package-control.cleanup'):
                 if unlink_or_delete_directory(package_dir):
                     console_write(
                         u'''
@@ -213,7 +219,7 @@ class PackageCleanup(threading.Thread):
             # Finish reinstalling packages that could not be upgraded due to
             # in-use files
             reinstall = os.path.join(package_dir, 'package-control.reinstall')
-            if os.path.exists(reinstall):
+            if inventory.has(package_name, 'package-control.reinstall'):
                 metadata_path = os.path.join(package_dir, 'package-metadata.json')
                 # No need to handle symlinks here as that was already handled in earlier step
                 # that has attempted to re-install the package initially.
@@ -312,6 +318,9 @@ class PackageCleanup(threading.Thread):
             if found:
                 found_packages.append(package_name)
 
+        # Directories were removed or reinstalled while cleaning up
+        self.manager.invalidate_inventory()
+
         invalid_packages = []
         invalid_dependencies = []
 
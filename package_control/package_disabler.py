@@ -118,42 +118,37 @@ class PackageDisabler():
                 tracker_type = 'pre_upgrade' if operation == 'upgrade' else operation
                 events.add(tracker_type, package, version)
 
-            global_color_scheme = settings.get('color_scheme')
-            if global_color_scheme is not None and global_color_scheme.find('Packages/' + package + '/') != -1:
-                PackageDisabler.old_color_scheme_package = package
-                PackageDisabler.old_color_scheme = global_color_scheme
-                settings.set('color_scheme', 'Packages/Color Scheme - Default/Monokai.tmTheme')
-
-            for window in sublime.windows():
-                for view in window.views():
-                    view_settings = view.settings()
-                    syntax = view_settings.get('syntax')
-                    if syntax is not None and syntax.find('Packages/' + package + '/') != -1:
-                        if package not in PackageDisabler.old_syntaxes:
-                            PackageDisabler.old_syntaxes[package] = []
-                        PackageDisabler.old_syntaxes[package].append([view, syntax])
-                        view_settings.set('syntax', 'Packages/Text/Plain text.tmLanguage')
-                    # Handle view-specific color_scheme settings not already taken care
-                    # of by resetting the global color_scheme above
-                    scheme = view_settings.get('color_scheme')
-                    if scheme is not None and scheme != global_color_scheme \
-                            and scheme.find('Packages/' + package + '/') != -1:
-                        if package not in PackageDisabler.old_color_schemes:
-                            PackageDisabler.old_color_schemes[package] = []
-                        PackageDisabler.old_color_schemes[package].append([view, scheme])
-                        view_settings.set('color_scheme', 'Packages/Color Scheme - Default/Monokai.tmTheme')
-
-            # Change the theme before disabling the package containing it
-            if package_file_exists(package, settings.get('theme')):
-                PackageDisabler.old_theme_package = package
-                PackageDisabler.old_theme = settings.get('theme')
-                settings.set('theme', 'Default.sublime-theme')
-
             # We don't mark a package as in-process when disabling it, otherwise
             # it automatically gets re-enabled the next time Sublime Text starts
             if operation != 'disable':
                 in_process.append( package )
 
+        batch = set(packages)
+
+        global_color_scheme = settings.get('color_scheme')
+        if resource_package(global_color_scheme) in batch:
+            PackageDisabler.old_color_scheme_package = resource_package(global_color_scheme)
+            PackageDisabler.old_color_scheme = global_color_scheme
+            settings.set('color_scheme', 'Packages/Color Scheme - Default/Monokai.tmTheme')
+
+        # A single pass over all views finds the syntaxes and color schemes of
+        # every package being disabled
+        for package, view, setting_name, value in index_views(batch, global_color_scheme):
+            if setting_name == 'syntax':
+                PackageDisabler.old_syntaxes.setdefault(package, []).append([view, value])
+                view.settings().set('syntax', 'Packages/Text/Plain text.tmLanguage')
+            else:
+                PackageDisabler.old_color_schemes.setdefault(package, []).append([view, value])
+                view.settings().set('color_scheme', 'Packages/Color Scheme - Default/Monokai.tmTheme')
+
+        # Change the theme before disabling the package containing it
+        theme = settings.get('theme')
+        theme_package = find_theme_package(theme, packages)
+        if theme_package:
+            PackageDisabler.old_theme_package = theme_package
+            PackageDisabler.old_theme = theme
+            settings.set('theme', 'Default.sublime-theme')
+
         # Force Sublime Text to understand the package is to be ignored
         self._force_setting( self._force_add, 'in_process_packages', in_process, g_settings.packagesmanager_setting_path() )
 
@@ -230,13 +225,14 @@ class PackageDisabler():
             self._force_setting( self._force_remove, 'ignored_packages', to_enable[:MAXIMUM_TO_REENABLE] )
             to_enable = to_enable[MAXIMUM_TO_REENABLE:]
 
+        corruption_notice = u' You may see some graphical corruption until you restart Sublime Text.'
+        to_restore = []
+
         for package in packages:
             operation = _operation_type( package )
             if self.debug: console_write( u'operation: %s, _operation_type: %s', (operation, _operation_type) )
 
             if package in ignored:
-                corruption_notice = u' You may see some graphical corruption until you restart Sublime Text.'
-
                 if operation == 'remove' and PackageDisabler.old_theme_package == package:
                     message = text.format(u'''
                         PackagesManager
@@ -248,90 +244,113 @@ class PackageDisabler():
                         message += corruption_notice
                     sublime.message_dialog(message)
 
-                # By delaying the restore, we give Sublime Text some time to
-                # re-enable the package, making errors less likely
-                def delayed_settings_restore():
-                    syntax_errors = set()
-                    color_scheme_errors = set()
-
-                    if PackageDisabler.old_syntaxes is None:
-                        PackageDisabler.old_syntaxes = {}
-                    if PackageDisabler.old_color_schemes is None:
-                        PackageDisabler.old_color_schemes = {}
-
-                    if operation == 'upgrade' and package in PackageDisabler.old_syntaxes:
-                        for view_syntax in PackageDisabler.old_syntaxes[package]:
-                            view, syntax = view_syntax
-                            if resource_exists(syntax):
-                                view.settings().set('syntax', syntax)
-                            elif syntax not in syntax_errors:
-                                console_write(u'The syntax "%s" no longer exists' % syntax)
-                                syntax_errors.add(syntax)
-
-                    if self.debug: console_write( "PackageDisabler.old_color_scheme_package: %s, \n"
-                            "PackageDisabler.old_theme_package: %s, \n"
-                            "PackageDisabler.old_color_schemes: %s, \n"
-                            "package: %s",
-                            (PackageDisabler.old_color_scheme_package,
-                             PackageDisabler.old_theme_package,
-                             PackageDisabler.old_color_schemes,
-                             package) )
-
-                    if operation == 'upgrade' and PackageDisabler.old_color_scheme_package == package:
-                        if resource_exists(PackageDisabler.old_color_scheme):
-                            settings.set('color_scheme', PackageDisabler.old_color_scheme)
-                        else:
-                            color_scheme_errors.add(PackageDisabler.old_color_scheme)
-                            sublime.error_message(text.format(
-                                u'''
-                                PackagesManager
-
-                                The package containing your active color scheme was
-                                just upgraded, however the .tmTheme file no longer
-                                exists. Sublime Text has been configured use the
-                                default color scheme instead.
-                                '''
-                            ))
-
-                    if operation == 'upgrade' and package in PackageDisabler.old_color_schemes:
-                        for view_scheme in PackageDisabler.old_color_schemes[package]:
-                            view, scheme = view_scheme
-                            if resource_exists(scheme):
-                                view.settings().set('color_scheme', scheme)
-                            elif scheme not in color_scheme_errors:
-                                console_write(u'The color scheme "%s" no longer exists' % scheme)
-                                color_scheme_errors.add(scheme)
-
-                    if operation == 'upgrade' and PackageDisabler.old_theme_package == package:
-                        if package_file_exists(package, PackageDisabler.old_theme):
-                            settings.set('theme', PackageDisabler.old_theme)
-                            message = text.format(u'''
-                                PackagesManager
-
-                                The package containing your active theme was just
-                                upgraded.
-                            ''')
-                            if int(sublime.version()) < 3106:
-                                message += corruption_notice
-                            sublime.message_dialog(message)
-                        else:
-                            sublime.error_message(text.format(
-                                u'''
-                                PackagesManager
-
-                                The package containing your active theme was just
-                                upgraded, however the .sublime-theme file no longer
-                                exists. Sublime Text has been configured use the
-                                default theme instead.
-                                '''
-                            ))
-
-                    sublime.save_settings(preferences_filename())
-
-                sublime.set_timeout(delayed_settings_restore, 1000)
+                to_restore.append((package, operation))
+
+        # By delaying the restore, we give Sublime Text some time to
+        # re-enable the packages, making errors less likely
+        if to_restore:
+            sublime.set_timeout(lambda: self._restore_settings(settings, to_restore, corruption_notice), 1000)
 
         threading.Thread(target=self._delayed_in_progress_removal, args=(packages,)).start()
 
+    def _restore_settings(self, settings, to_restore, corruption_notice):
+        """
+        Puts back the syntaxes, color schemes and theme that disable_packages()
+        replaced, for all of the re-enabled packages at once
+
+        :param settings:
+            The Preferences.sublime-settings object
+
+        :param to_restore:
+            A list of 2-element tuples (package name, operation type)
+
+        :param corruption_notice:
+            The text to append to theme messages on older builds
+        """
+
+        # Many views share a syntax or color scheme, so each is only checked once
+        exists = {}
+
+        def cached_resource_exists(path):
+            if path not in exists:
+                exists[path] = resource_exists(path)
+            return exists[path]
+
+        syntax_errors = set()
+        color_scheme_errors = set()
+
+        for package, operation in to_restore:
+            old_syntaxes = PackageDisabler.old_syntaxes.pop(package, [])
+            old_color_schemes = PackageDisabler.old_color_schemes.pop(package, [])
+
+            if operation != 'upgrade':
+                continue
+
+            for view, syntax in old_syntaxes:
+                if cached_resource_exists(syntax):
+                    view.settings().set('syntax', syntax)
+                elif syntax not in syntax_errors:
+                    console_write(u'The syntax "%s" no longer exists' % syntax)
+                    syntax_errors.add(syntax)
+
+            if self.debug: console_write( "PackageDisabler.old_color_scheme_package: %s, \n"
+                    "PackageDisabler.old_theme_package: %s, \n"
+                    "old_color_schemes: %s, \n"
+                    "package: %s",
+                    (PackageDisabler.old_color_scheme_package,
+                     PackageDisabler.old_theme_package,
+                     old_color_schemes,
+                     package) )
+
+            if PackageDisabler.old_color_scheme_package == package:
+                if cached_resource_exists(PackageDisabler.old_color_scheme):
+                    settings.set('color_scheme', PackageDisabler.old_color_scheme)
+                else:
+                    color_scheme_errors.add(PackageDisabler.old_color_scheme)
+                    sublime.error_message(text.format(
+                        u'''
+                        PackagesManager
+
+                        The package containing your active color scheme was
+                        just upgraded, however the .tmTheme file no longer
+                        exists. Sublime Text has been configured use the
+                        default color scheme instead.
+                        '''
+                    ))
+
+            for view, scheme in old_color_schemes:
+                if cached_resource_exists(scheme):
+                    view.settings().set('color_scheme', scheme)
+                elif scheme not in color_scheme_errors:
+                    console_write(u'The color scheme "%s" no longer exists' % scheme)
+                    color_scheme_errors.add(scheme)
+
+            if PackageDisabler.old_theme_package == package:
+                if package_file_exists(package, PackageDisabler.old_theme):
+                    settings.set('theme', PackageDisabler.old_theme)
+                    message = text.format(u'''
+                        PackagesManager
+
+                        The package containing your active theme was just
+                        upgraded.
+                    ''')
+                    if int(sublime.version()) < 3106:
+                        message += corruption_notice
+                    sublime.message_dialog(message)
+                else:
+                    sublime.error_message(text.format(
+                        u'''
+                        PackagesManager
+
+                        The package containing your active theme was just
+                        upgraded, however the .sublime-theme file no longer
+                        exists. Sublime Text has been configured use the
+                        default theme instead.
+                        '''
+                    ))
+
+        sublime.save_settings(preferences_filename())
+
     def _delayed_in_progress_removal(self, packages):
         sleep_delay = 5 + random.randint( 0, 10 )
         packages = list( packages )
@@ -414,6 +433,101 @@ class PackageDisabler():
 
         return effectively_added
 
+
+def resource_package(path):
+    """
+    :param path:
+        A unicode string of a resource path, e.g. Packages/Package Name/resource_name.ext,
+        or None
+
+    :return:
+        The name of the package the resource is in, or None
+    """
+
+    if not path:
+        return None
+
+    start = path.find('Packages/')
+    if start == -1:
+        return None
+    start += 9
+
+    end = path.find('/', start)
+    if end == -1:
+        return None
+    return path[start:end]
+
+
+def index_views(packages, global_color_scheme=None):
+    """
+    Reads the syntax and color scheme of every open view a single time, and
+    returns the ones that come from one of the packages
+
+    :param packages:
+        A set of package names
+
+    :param global_color_scheme:
+        The color scheme from Preferences.sublime-settings. Views using it are
+        skipped since the global setting is handled separately.
+
+    :return:
+        A list of 4-element tuples (package name, sublime.View, setting name,
+        setting value) with the setting name being "syntax" or "color_scheme"
+    """
+
+    output = []
+    for window in sublime.windows():
+        for view in window.views():
+            view_settings = view.settings()
+
+            syntax = view_settings.get('syntax')
+            package = resource_package(syntax)
+            if package in packages:
+                output.append((package, view, 'syntax', syntax))
+
+            scheme = view_settings.get('color_scheme')
+            package = resource_package(scheme)
+            if package in packages and scheme != global_color_scheme:
+                output.append((package, view, 'color_scheme', scheme))
+
+    return output
+
+
+def find_theme_package(theme, packages):
+    """
+    Finds which of the packages contains a theme at its root
+
+    :param theme:
+        The filename of the theme, e.g. Default.sublime-theme, or None
+
+    :param packages:
+        A list of package names
+
+    :return:
+        The first of the packages that contains the theme, or None
+    """
+
+    if not theme:
+        return None
+
+    # A single resource lookup instead of opening every package
+    if hasattr(sublime, 'find_resources'):
+        found = set()
+        for path in sublime.find_resources(theme):
+            package = resource_package(path)
+            if package and path == 'Packages/%s/%s' % (package, theme):
+                found.add(package)
+        for package in packages:
+            if package in found:
+                return package
+        return None
+
+    for package in packages:
+        if package_file_exists(package, theme):
+            return package
+    return None
+
+
 def resource_exists(path):
     """
     Checks to see if a file exists
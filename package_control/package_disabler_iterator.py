@@ -1,11 +1,12 @@
 
 import sublime
 
-import time
 import functools
 
+from . import timing
 from .settings import run_on_main_thread
 from .package_disabler import PackageDisabler
+from .setting_watcher import SettingWatcher
 
 # How many packages to ignore and unignore in batch to fix the ignored packages bug error
 PACKAGES_COUNT_TO_IGNORE_AHEAD = 8
@@ -175,43 +176,48 @@ class IgnoredPackagesBugFixer(object):
         unique_list_append( currently_ignored, packages_to_add )
         currently_ignored.sort()
 
-        # This adds them to the `in_process` list on the Package Control.sublime-settings file
-        if len( packages_to_add ):
-            # We use a functools.partial to generate the on-complete callback in
-            # order to bind the current value of the parameters, unlike lambdas.
-            closure = functools.partial( self.package_disabler.disable_packages, list(packages_to_add), self.ignoring_type )
+        def main_callback():
+            sublime_settings().set( "ignored_packages", currently_ignored )
+            save_sublime_settings()
 
-            run_on_main_thread( closure )
-            time.sleep( IGNORE_PACKAGE_MINIMUM_WAIT_TIME )
+        def is_ignored(new_ignored_list):
+            return bool( new_ignored_list ) and all( package_name in new_ignored_list for package_name in packages_to_add )
 
-        # This should remove them from the `in_process` list on the Package Control.sublime-settings file
-        if len( packages_to_remove ):
-            # We use a functools.partial to generate the on-complete callback in
-            # order to bind the current value of the parameters, unlike lambdas.
-            closure = functools.partial( self.package_disabler.reenable_package, list(packages_to_remove), self.ignoring_type )
+        def is_unignored(new_ignored_list):
+            return not any( package_name in ( new_ignored_list or [] ) for package_name in packages_to_remove )
 
-            run_on_main_thread( closure )
-            time.sleep( IGNORE_PACKAGE_MINIMUM_WAIT_TIME )
+        def is_current(new_ignored_list):
+            # Something, somewhere is setting the ignored_packages list back to `["Vintage"]`
+            return bool( new_ignored_list ) and new_ignored_list == currently_ignored
 
-        def main_callback():
-            sublime_settings().set( "ignored_packages", currently_ignored )
-            save_sublime_settings()
+        span = timing.span( "ignored_packages" )
+        with SettingWatcher( sublime_settings(), "ignored_packages",
+                max_wait=IGNORE_PACKAGE_MINIMUM_WAIT_TIME, write_interval=IGNORE_PACKAGE_MINIMUM_WAIT_TIME ) as watcher:
+
+            # This adds them to the `in_process` list on the Package Control.sublime-settings file
+            if len( packages_to_add ):
+                # We use a functools.partial to generate the on-complete callback in
+                # order to bind the current value of the parameters, unlike lambdas.
+                closure = functools.partial( self.package_disabler.disable_packages, list(packages_to_add), self.ignoring_type )
 
-        # Something, somewhere is setting the ignored_packages list back to `["Vintage"]`. Then
-        # ensure we override this.
-        for interval in range( 0, 27 ):
-            run_on_main_thread( main_callback )
-            time.sleep( IGNORE_PACKAGE_MINIMUM_WAIT_TIME )
+                run_on_main_thread( closure )
+                watcher.confirm( is_ignored )
 
-            new_ignored_list = sublime_settings().get( "ignored_packages", [] )
-            print( "PackagesManager: Currently ignored packages: " + str( new_ignored_list ) )
+            # This should remove them from the `in_process` list on the Package Control.sublime-settings file
+            if len( packages_to_remove ):
+                # We use a functools.partial to generate the on-complete callback in
+                # order to bind the current value of the parameters, unlike lambdas.
+                closure = functools.partial( self.package_disabler.reenable_package, list(packages_to_remove), self.ignoring_type )
 
-            if new_ignored_list:
+                run_on_main_thread( closure )
+                watcher.confirm( is_unignored )
 
-                if len( new_ignored_list ) == len( currently_ignored ) \
-                        and new_ignored_list == currently_ignored:
+            # Rewrite the list while anything keeps reverting it, until it sticks
+            watcher.confirm( is_current, main_callback )
 
-                    break
+        span.end()
+        print( "PackagesManager: Currently ignored packages: " + str( sublime_settings().get( "ignored_packages", [] ) ) )
+        print( "PackagesManager: Confirmed the ignored packages after %.1f seconds and %d writes" % ( watcher.elapsed, watcher.writes ) )
 
         run_on_main_thread( save_ignored_packages_callback )
         return currently_ignored
@@ -4,10 +4,12 @@ import time
 
 import sublime
 
+from . import timing
 from .thread_progress import ThreadProgress
 from .package_manager import PackageManager
 from .package_disabler import PackageDisabler
-from .versions import version_comparable
+from .versions import version_key
+from .upgraders import vcs_status
 from .commands.advanced_install_package_command import AdvancedInstallPackageThread
 
 USE_QUICK_PANEL_ITEM = hasattr(sublime, 'QuickPanelItem')
@@ -62,6 +64,28 @@ class PackageInstaller(PackageDisabler):
 
         packages = self.manager.list_available_packages()
         installed_packages = self.manager.list_packages()
+        settings = self.manager.settings
+
+        # Checking a git or hg package for incoming changes fetches from its
+        # remote, so all of them are checked at the same time up front
+        vcs_incoming = {}
+        if not override_action:
+            to_ignore = settings.get('ignore_vcs_packages')
+            upgraders = []
+            for package in packages:
+                if ignore_packages and package in ignore_packages:
+                    continue
+                if to_ignore is True or (isinstance(to_ignore, list) and package in to_ignore):
+                    continue
+                if self.manager.is_vcs_package(package):
+                    upgraders.append((package, self.manager.instantiate_upgrader(package)))
+            with timing.span('vcs_checks'):
+                results = vcs_status.check_incoming(
+                    [upgrader for package, upgrader in upgraders],
+                    settings.get('parallel_vcs_checks', 4)
+                )
+            for (package, upgrader), incoming in zip(upgraders, results):
+                vcs_incoming[package] = (upgrader.cli_name, incoming)
 
         package_list = []
         for package in sorted(iter(packages.keys()), key=lambda s: s.lower()):
@@ -86,7 +110,6 @@ class PackageInstaller(PackageDisabler):
             new_version = 'v' + release['version']
 
             vcs = None
-            settings = self.manager.settings
 
             if override_action:
                 action = override_action
@@ -99,9 +122,7 @@ class PackageInstaller(PackageDisabler):
                         continue
                     if isinstance(to_ignore, list) and package in to_ignore:
                         continue
-                    upgrader = self.manager.instantiate_upgrader(package)
-                    vcs = upgrader.cli_name
-                    incoming = upgrader.incoming()
+                    vcs, incoming = vcs_incoming[package]
 
                 if installed:
                     if vcs:
@@ -115,8 +136,8 @@ class PackageInstaller(PackageDisabler):
                         action = 'overwrite'
                         extra = ' %s with %s' % (installed_version_name, new_version)
                     else:
-                        installed_version = version_comparable(installed_version)
-                        new_version_cmp = version_comparable(release['version'])
+                        installed_version = version_key(installed_version)
+                        new_version_cmp = version_key(release['version'])
                         if new_version_cmp > installed_version:
                             action = 'upgrade'
                             extra = ' to %s from %s' % (new_version, installed_version_name)
@@ -194,7 +215,7 @@ class PackageInstallerThread(threading.Thread):
     Sublime Text thread does not get blocked and freeze the UI
     """
 
-    def __init__(self, manager, package, on_complete, pause=False):
+    def __init__(self, manager, package, on_complete, pause=False, version=None):
         """
         :param manager:
             An instance of :class:`PackageManager`
@@ -208,23 +229,30 @@ class PackageInstallerThread(threading.Thread):
         :param pause:
             If we should pause before upgrading to allow a package to be
             fully disabled.
+
+        :param version:
+            The version to install from the archive store, instead of the
+            latest available release
         """
 
         self.package = package
         self.manager = manager
         self.on_complete = on_complete
         self.pause = pause
+        self.version = version
         threading.Thread.__init__(self)
 
     def run(self):
-        if self.pause:
-            time.sleep(0.7)
-        try:
-            self.result = self.manager.install_package(self.package)
-        except (Exception):
-            self.result = False
-            raise
-        finally:
-            # Do not reenable if deferred until next restart
-            if self.on_complete and self.result is not None:
-                sublime.set_timeout(self.on_complete, 700)
+        with timing.operation('install', package=self.package):
+            if self.pause:
+                with timing.span('disable_pause'):
+                    time.sleep(0.7)
+            try:
+                self.result = self.manager.install_package(self.package, version=self.version)
+            except (Exception):
+                self.result = False
+                raise
+            finally:
+                # Do not reenable if deferred until next restart
+                if self.on_complete and self.result is not None:
+                    sublime.set_timeout(self.on_complete, 700)
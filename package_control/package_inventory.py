@@ -0,0 +1,240 @@
+import os
+import time
+
+try:
+    # Python 3.5+
+    from os import scandir
+except (ImportError):
+    scandir = None
+
+
+# The files and folders inside of a package dir that change how it is handled
+MARKERS = frozenset([
+    '.extracted-sublime-package',
+    '.git',
+    '.hg',
+    '.no-sublime-package',
+    '.sublime-dependency',
+    '.sublime-package-override',
+    'dependency-metadata.json',
+    'package-control.cleanup',
+    'package-control.reinstall',
+    'package-metadata.json',
+])
+
+# The number of seconds between checks of the modification time of every
+# package dir, which change when a marker is added to or removed from it
+DIR_CHECK_INTERVAL = 1.0
+
+# Some filesystems only store modification times to the nearest one or two
+# seconds, so a folder modified this close to the scan may change again
+# without its modification time changing
+MTIME_RESOLUTION = 2.0
+
+
+class PackageInventory(object):
+
+    """
+    A snapshot of the Packages/ and Installed Packages/ folders. Each folder,
+    and each package dir, is listed a single time, and all of the questions
+    about installed packages and dependencies are then answered from memory.
+
+    :param packages_path:
+        The filesystem path to the Packages/ folder
+
+    :param installed_packages_path:
+        The filesystem path to the Installed Packages/ folder, or None with
+        Sublime Text 2
+    """
+
+    def __init__(self, packages_path, installed_packages_path=None):
+        self.packages_path = packages_path
+        self.installed_packages_path = installed_packages_path
+        self.scanned = time.time()
+        self.checked = self.scanned
+        self.key = self._key()
+
+        # Dir name -> frozenset of the MARKERS found inside of it
+        self.dirs = {}
+        # Dir name -> modification time, taken before listing the dir
+        self.dir_mtimes = {}
+        for name, is_dir in _list_entries(packages_path):
+            if is_dir:
+                path = os.path.join(packages_path, name)
+                self.dir_mtimes[name] = _mtime(path)
+                self.dirs[name] = self._scan_dir(path)
+
+        self.archives = set()
+        if installed_packages_path:
+            for name, is_dir in _list_entries(installed_packages_path):
+                if not is_dir and name.endswith('.sublime-package'):
+                    self.archives.add(name[:-16])
+
+    def _key(self):
+        """
+        :return:
+            A tuple of the modification times of the two folders, which change
+            whenever an entry is added, removed or renamed
+        """
+
+        return tuple(
+            _mtime(path) if path else None
+            for path in [self.packages_path, self.installed_packages_path]
+        )
+
+    def _is_racy(self):
+        """
+        :return:
+            If any of the folders was modified so close to the scan that a
+            later change may not alter its modification time
+        """
+
+        limit = self.scanned - MTIME_RESOLUTION
+        for mtime in list(self.key) + list(self.dir_mtimes.values()):
+            if mtime is not None and mtime > limit:
+                return True
+        return False
+
+    def _scan_dir(self, path):
+        names = set(name for name, is_dir in _list_entries(path, False))
+        markers = MARKERS & names
+        if '.hg' in markers and not os.path.isdir(os.path.join(path, '.hg')):
+            markers = markers - set(['.hg'])
+        return frozenset(markers)
+
+    def is_current(self):
+        """
+        Checks the two folders on every call. The package dirs are checked at
+        most once every DIR_CHECK_INTERVAL seconds, since there may be
+        hundreds of them and this is called for each package in some loops.
+
+        :return:
+            If no entries were added to or removed from either folder, or
+            from any of the package dirs, since the snapshot was taken
+        """
+
+        if self._key() != self.key:
+            return False
+
+        now = time.time()
+        if now - self.checked < DIR_CHECK_INTERVAL:
+            return True
+
+        if self._is_racy():
+            return False
+        for name, mtime in self.dir_mtimes.items():
+            if _mtime(os.path.join(self.packages_path, name)) != mtime:
+                return False
+        self.checked = now
+        return True
+
+    def has(self, name, marker):
+        """
+        :param name:
+            The name of a dir in the Packages/ folder
+
+        :param marker:
+            One of the MARKERS
+
+        :return:
+            If the dir exists and contains the marker
+        """
+
+        return marker in self.dirs.get(name, ())
+
+    def visible_dirs(self):
+        """
+        :return:
+            A set of the dirs in the Packages/ folder that are not hidden and
+            are not marked to be removed
+        """
+
+        return set(
+            name for name, markers in self.dirs.items()
+            if name[0] != '.' and 'package-control.cleanup' not in markers
+        )
+
+    def sublime_package_files(self):
+        """
+        :return:
+            A set of the names of the .sublime-package files in the Installed
+            Packages/ folder, without the suffix
+        """
+
+        return set(self.archives)
+
+    def is_dependency(self, name):
+        """
+        :param name:
+            The name of a dir in the Packages/ folder
+
+        :return:
+            If the dir contains a dependency
+        """
+
+        return self.has(name, 'dependency-metadata.json') or self.has(name, '.sublime-dependency')
+
+    def vcs(self, name):
+        """
+        :param name:
+            The name of a dir in the Packages/ folder
+
+        :return:
+            "git" or "hg" if the dir is a repository, otherwise None
+        """
+
+        if self.has(name, '.git'):
+            return 'git'
+        if self.has(name, '.hg'):
+            return 'hg'
+        return None
+
+
+def _mtime(path):
+    """
+    :param path:
+        A filesystem path
+
+    :return:
+        The modification time of the path, or None if it does not exist
+    """
+
+    try:
+        return os.stat(path).st_mtime
+    except (OSError):
+        return None
+
+
+def _list_entries(path, check_dirs=True):
+    """
+    Lists a folder with os.scandir() when available, which gets the type of
+    each entry without an extra stat() call
+
+    :param path:
+        The folder to list
+
+    :param check_dirs:
+        If the type of each entry should be determined with Python versions
+        that lack os.scandir()
+
+    :return:
+        A list of 2-element tuples (unicode string name, bool if a directory),
+        or an empty list if the folder can not be read
+    """
+
+    try:
+        if scandir is not None:
+            iterator = scandir(path)
+            try:
+                return [(entry.name, entry.is_dir()) for entry in iterator]
+            finally:
+                if hasattr(iterator, 'close'):
+                    iterator.close()
+
+        return [
+            (name, check_dirs and os.path.isdir(os.path.join(path, name)))
+            for name in os.listdir(path)
+        ]
+
+    except (OSError):
+        return []
@@ -2,10 +2,21 @@ import sublime
 
 import os
 import zipfile
+import threading
+from collections import OrderedDict
 
 from .console_write import console_write
 from .open_compat import open_compat, read_compat
 
+
+# The number of .sublime-package files kept open with their parsed index
+MAX_OPEN_ARCHIVES = 16
+
+# Package name -> (mtime, size, zipfile.ZipFile), least recently used first
+_open_archives = OrderedDict()
+_archives_lock = threading.Lock()
+
+
 def read_package_file(package, relative_path, binary=False):
     """
     Reads the contents of a file that is part of a package
@@ -84,16 +95,62 @@ def _read_regular_file(package, relative_path, binary=False):
         return read_compat(f)
 
 
-def _read_zip_file(package, relative_path, binary=False):
-    zip_path = os.path.join(sublime.installed_packages_path(), package + '.sublime-package')
+def close_package_archive(package=None):
+    """
+    Closes the cached sublime-package file of a package, which is required
+    on Windows before the file can be replaced or removed
+
+    :param package:
+        The name of the package, or None to close all cached files
+    """
+
+    with _archives_lock:
+        packages = list(_open_archives.keys()) if package is None else [package]
+        for name in packages:
+            entry = _open_archives.pop(name, None)
+            if entry:
+                entry[2].close()
+
+
+def _zip_path(package):
+    return os.path.join(sublime.installed_packages_path(), package + '.sublime-package')
+
+
+def _open_zip_file(package):
+    """
+    Returns the open zipfile.ZipFile of a sublime-package file, parsing its
+    central directory only when the file is not cached, or its mtime or size
+    changed. Must be called while holding _archives_lock.
 
-    if not os.path.exists(zip_path):
+    :param package:
+        The name of the package
+
+    :return:
+        A zipfile.ZipFile object, or False if the file does not exist or is
+        not a valid zip file
+    """
+
+    zip_path = _zip_path(package)
+
+    try:
+        stat = os.stat(zip_path)
+    except (OSError):
+        entry = _open_archives.pop(package, None)
+        if entry:
+            entry[2].close()
         return False
 
+    entry = _open_archives.pop(package, None)
+    if entry:
+        if entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+            _open_archives[package] = entry
+            return entry[2]
+        entry[2].close()
+
     try:
         package_zip = zipfile.ZipFile(zip_path, 'r')
 
-    except (zipfile.BadZipfile):
+    except (zipfile.BadZipfile, IOError):
         console_write(
             u'''
             An error occurred while trying to unzip the sublime-package file
@@ -103,41 +160,54 @@ def _read_zip_file(package, relative_path, binary=False):
         )
         return False
 
-    try:
-        contents = package_zip.read(relative_path)
-        if not binary:
-            contents = contents.decode('utf-8')
-        return contents
-
-    except (KeyError):
-        pass
+    _open_archives[package] = (stat.st_mtime, stat.st_size, package_zip)
+    while len(_open_archives) > MAX_OPEN_ARCHIVES:
+        _open_archives.popitem(last=False)[1][2].close()
 
-    except (zipfile.BadZipfile):
-        console_write(
-            u'''
-            Unable to read file from sublime-package file for %s due to the
-            package file being corrupt
-            ''',
-            package
-        )
+    return package_zip
 
-    except (IOError):
-        console_write(
-            u'''
-            Unable to read file from sublime-package file for %s due to an
-            invalid filename
-            ''',
-            package
-        )
 
-    except (UnicodeDecodeError):
-        console_write(
-            u'''
-            Unable to read file from sublime-package file for %s due to an
-            invalid filename or character encoding issue
-            ''',
-            package
-        )
+def _read_zip_file(package, relative_path, binary=False):
+    with _archives_lock:
+        package_zip = _open_zip_file(package)
+        if not package_zip:
+            return False
+
+        try:
+            contents = package_zip.read(relative_path)
+            if not binary:
+                contents = contents.decode('utf-8')
+            return contents
+
+        except (KeyError):
+            pass
+
+        except (zipfile.BadZipfile):
+            console_write(
+                u'''
+                Unable to read file from sublime-package file for %s due to the
+                package file being corrupt
+                ''',
+                package
+            )
+
+        except (IOError):
+            console_write(
+                u'''
+                Unable to read file from sublime-package file for %s due to an
+                invalid filename
+                ''',
+                package
+            )
+
+        except (UnicodeDecodeError):
+            console_write(
+                u'''
+                Unable to read file from sublime-package file for %s due to an
+                invalid filename or character encoding issue
+                ''',
+                package
+            )
 
     return False
 
@@ -149,28 +219,14 @@ def _regular_file_exists(package, relative_path):
 
 
 def _zip_file_exists(package, relative_path):
-    zip_path = os.path.join(sublime.installed_packages_path(), package + '.sublime-package')
+    with _archives_lock:
+        package_zip = _open_zip_file(package)
+        if not package_zip:
+            return False
 
-    if not os.path.exists(zip_path):
-        return False
-
-    try:
-        package_zip = zipfile.ZipFile(zip_path, 'r')
-
-    except (zipfile.BadZipfile):
-        console_write(
-            u'''
-            An error occurred while trying to unzip the sublime-package file
-            for %s.
-            ''',
-            package
-        )
-        return False
-
-    try:
-        package_zip.getinfo(relative_path)
-        return True
-
-    except (KeyError):
-        return False
+        try:
+            package_zip.getinfo(relative_path)
+            return True
 
+        except (KeyError):
+            return False
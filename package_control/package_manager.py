@@ -8,42 +8,61 @@ from collections import OrderedDict
 from fnmatch import fnmatch
 import datetime
 import tempfile
+import threading
 # To prevent import errors in thread with datetime
 import locale  # noqa
 
 try:
     # Python 3
-    from urllib.parse import urlencode, urlparse
+    from urllib.parse import urlparse
     import compileall
     str_cls = str
 except (ImportError):
     # Python 2
-    from urllib import urlencode
     from urlparse import urlparse
     str_cls = unicode  # noqa
 
 import sublime
 
 from .show_error import show_error
+from .thread_progress import ThreadProgress
 from .console_write import console_write
 from .open_compat import open_compat, read_compat
 from .file_not_found_error import FileNotFoundError
 from .unicode import unicode_from_os
 from .clear_directory import clear_directory, unlink_or_delete_directory, is_directory_symlink
-from .cache import clear_cache, set_cache, get_cache, merge_cache_under_settings, set_cache_under_settings
-from .versions import version_comparable, version_sort
+from .cache import (
+    clear_cache,
+    set_cache,
+    get_cache,
+    merge_cache_under_settings,
+    refresh_cache,
+    set_cache_under_settings,
+    settings_fingerprint,
+    load_persistent_cache,
+    save_persistent_cache
+)
+from .versions import version_comparable, version_key, version_sort
+from .available_snapshot import AvailableSnapshot
+from .catalog import compact_catalog
+from .package_prefetcher import PackagePrefetcher
+from .package_inventory import PackageInventory
+from .archive_store import ArchiveStore
+from .backup_store import BackupStore
+from .zip_transcoder import transcode_zip
 from .downloaders.background_downloader import BackgroundDownloader
 from .downloaders.downloader_exception import DownloaderException
 from .providers.provider_exception import ProviderException, get_package_metadata
 from .clients.client_exception import ClientException
+from .clients.commit_date_cache import save_commit_dates
 from .download_manager import downloader
-from .providers.release_selector import filter_releases, is_compatible_version
+from .providers.release_selector import ReleaseSelector, is_compatible_version
 from .upgraders.git_upgrader import GitUpgrader
 from .upgraders.hg_upgrader import HgUpgrader
-from .package_io import read_package_file, package_file_exists
+from .package_io import read_package_file, package_file_exists, close_package_archive
 from .providers import CHANNEL_PROVIDERS, REPOSITORY_PROVIDERS
 from .settings import pc_settings_filename, load_list_setting, save_list_setting
-from . import loader, text
+from . import loader, text, timing, usage_queue
 from . import __version__
 
 
@@ -56,6 +75,32 @@ OLD_DEFAULT_CHANNELS = set([
 
 DEFAULT_IGNORED_PACKAGES = set(['User', '0_settings_loader', '0_packagesmanager_loader'])
 
+# Settings left out of the settings change detection, since they either
+# make the settings always different, or have no effect on the channel and
+# repository info, so changing them should not clear the cache
+UNCACHED_SETTINGS = set([
+    'archive_cache',
+    'archive_cache_max_size',
+    'backup_max_count',
+    'backup_max_size',
+    'backup_mode',
+    'cache',
+    'cache_max_stale',
+    'channels',
+    'http_cache_max_size',
+    'max_concurrent_requests_per_host',
+    'package_name_map',
+    'parallel_package_downloads',
+    'parallel_vcs_checks',
+    'repositories',
+    'timing_log'
+])
+
+# If a thread is currently downloading the channels and repositories that were
+# served from the cache after they expired
+_revalidating = False
+_revalidating_lock = threading.Lock()
+
 
 class PackageManager():
 
@@ -76,10 +121,16 @@ class PackageManager():
         self.settings = {}
         settings = sublime.load_settings(pc_settings_filename())
         setting_names = [
+            'archive_cache',
+            'archive_cache_max_size',
             'auto_upgrade',
             'auto_upgrade_frequency',
             'auto_upgrade_ignore',
+            'backup_max_count',
+            'backup_max_size',
+            'backup_mode',
             'cache_length',
+            'cache_max_stale',
             'channels',
             'debug',
             'dirs_to_ignore',
@@ -92,13 +143,17 @@ class PackageManager():
             'hg_update_command',
             'http_cache',
             'http_cache_length',
+            'http_cache_max_size',
             'http_proxy',
             'https_proxy',
             'ignore_vcs_packages',
             'install_prereleases',
+            'max_concurrent_requests_per_host',
             'package_destination',
             'package_name_map',
             'package_profiles',
+            'parallel_package_downloads',
+            'parallel_vcs_checks',
             'proxy_password',
             'proxy_username',
             'renamed_packages',
@@ -106,6 +161,7 @@ class PackageManager():
             'submit_url',
             'submit_usage',
             'timeout',
+            'timing_log',
             'user_agent'
         ]
         for setting in setting_names:
@@ -129,6 +185,8 @@ class PackageManager():
         self.settings['packages_path'] = sublime.packages_path()
         self.settings['installed_packages_path'] = sublime.installed_packages_path()
 
+        timing.configure(self.settings)
+
         # Use the cache to see if settings have changed since the last
         # time the package manager was created, and clearing any cached
         # values if they have.
@@ -137,7 +195,7 @@ class PackageManager():
         # Reduce the settings down to exclude channel info since that will
         # make the settings always different
         filtered_settings = self.settings.copy()
-        for key in ['repositories', 'channels', 'package_name_map', 'cache']:
+        for key in UNCACHED_SETTINGS:
             if key in filtered_settings:
                 del filtered_settings[key]
 
@@ -150,6 +208,31 @@ class PackageManager():
             clear_cache()
         set_cache('filtered_settings', filtered_settings)
 
+        # Channel and repository info from a previous session is only reused
+        # if it was filtered using the same settings
+        self.cache_fingerprint = settings_fingerprint(filtered_settings)
+
+        # The number of seconds expired channel and repository info is kept
+        # for, and may be used for while it is downloaded again in the
+        # background. Revalidation sets max_stale to 0 to force the download.
+        self.cache_max_stale = max(0, int(self.settings.get('cache_max_stale', 0) or 0))
+        self.max_stale = self.cache_max_stale
+        load_persistent_cache(self.cache_fingerprint, self.cache_max_stale)
+
+        # The merged package and dependency index, shared by all operations
+        # run through this manager until the underlying cache changes
+        self._available_snapshot = None
+
+        # Read once per manager, since every usage event includes it
+        self._packages_manager_version = None
+        self._available_lock = threading.RLock()
+
+        # Downloads the archives of a batch of packages ahead of install_package()
+        self._prefetcher = None
+
+        # The classified contents of the Packages/ and Installed Packages/ folders
+        self._inventory = None
+
     def get_metadata(self, package, is_dependency=False):
         """
         Returns the package metadata for an installed package
@@ -284,8 +367,7 @@ class PackageManager():
             If the package is installed via git
         """
 
-        git_dir = os.path.join(self.get_package_dir(package), '.git')
-        return os.path.exists(git_dir) and (os.path.isdir(git_dir) or os.path.isfile(git_dir))
+        return self.inventory().vcs(package) == 'git'
 
     def _is_hg_package(self, package):
         """
@@ -296,8 +378,7 @@ class PackageManager():
             If the package is installed via hg
         """
 
-        hg_dir = os.path.join(self.get_package_dir(package), '.hg')
-        return os.path.exists(hg_dir) and os.path.isdir(hg_dir)
+        return self.inventory().vcs(package) == 'hg'
 
     def is_vcs_package(self, package):
         """
@@ -392,7 +473,7 @@ class PackageManager():
 
             # Sorting reverse will give us >, < then *
             for version_selector in sorted(versions, reverse=True):
-                if not is_compatible_version(version_selector):
+                if not is_compatible_version(version_selector, self.settings['version']):
                     continue
                 return platform_dependency[version_selector]
 
@@ -431,21 +512,44 @@ class PackageManager():
                 continue
             updated_channels.append(channel)
 
+        # The channels served from the cache after their info expired
+        stale = []
+
+        # Reads the platform and Sublime Text version once for all releases
+        selector = ReleaseSelector(self.settings)
+
         for channel in updated_channels:
             channel = channel.strip()
 
             # Caches various info from channels for performance
             cache_key = channel + '.repositories'
             channel_repositories = get_cache(cache_key)
-
-            merge_cache_under_settings(self, 'package_name_map', channel)
-            merge_cache_under_settings(self, 'renamed_packages', channel)
-            merge_cache_under_settings(self, 'unavailable_packages', channel, list_=True)
-            merge_cache_under_settings(self, 'unavailable_dependencies', channel, list_=True)
+            if channel_repositories is None and self.max_stale:
+                channel_repositories = get_cache(cache_key, max_stale=self.max_stale)
+                if channel_repositories is not None:
+                    stale.append(channel)
+
+            merge_cache_under_settings(self, 'package_name_map', channel, max_stale=self.max_stale)
+            merge_cache_under_settings(self, 'renamed_packages', channel, max_stale=self.max_stale)
+            merge_cache_under_settings(
+                self,
+                'unavailable_packages',
+                channel,
+                list_=True,
+                max_stale=self.max_stale
+            )
+            merge_cache_under_settings(
+                self,
+                'unavailable_dependencies',
+                channel,
+                list_=True,
+                max_stale=self.max_stale
+            )
 
             # If any of the info was not retrieved from the cache, we need to
             # grab the channel to get it
             if channel_repositories is None:
+                timing.count('channel_cache_misses')
 
                 for provider_class in CHANNEL_PROVIDERS:
                     if provider_class.match_url(channel):
@@ -453,42 +557,82 @@ class PackageManager():
                         break
 
                 try:
-                    channel_repositories = provider.get_repositories()
+                    with timing.span('channel_fetch'):
+                        channel_repositories = provider.get_repositories()
                     set_cache(cache_key, channel_repositories, cache_ttl)
 
+                    # The digest of each repository's info in the channel, and
+                    # what was derived from it, as of the last refresh. The
+                    # expiration is ignored since the digest decides if the
+                    # cached info can be reused.
+                    digests_key = channel + '.repository_digests'
+                    previous_digests = get_cache(digests_key, {}, max_stale=float('inf'))
+                    digests = {}
+                    reused = 0
+
                     unavailable_packages = []
                     unavailable_dependencies = []
+                    renamed_packages = {}
 
                     for repo in channel_repositories:
-                        original_packages = provider.get_packages(repo)
-                        filtered_packages = {}
-                        for package in original_packages:
-                            info = original_packages[package]
-                            info['releases'] = filter_releases(package, self.settings, info['releases'])
-                            if info['releases']:
-                                filtered_packages[package] = info
-                            else:
-                                unavailable_packages.append(package)
-                        packages_cache_key = repo + '.packages'
-                        set_cache(packages_cache_key, filtered_packages, cache_ttl)
-
-                        original_dependencies = provider.get_dependencies(repo)
-                        filtered_dependencies = {}
-                        for dependency in original_dependencies:
-                            info = original_dependencies[dependency]
-                            info['releases'] = filter_releases(dependency, self.settings, info['releases'])
-                            if info['releases']:
-                                filtered_dependencies[dependency] = info
-                            else:
-                                unavailable_dependencies.append(dependency)
-                        dependencies_cache_key = repo + '.dependencies'
-                        set_cache(dependencies_cache_key, filtered_dependencies, cache_ttl)
+                        digest = provider.get_repository_digest(repo)
+                        entry = previous_digests.get(repo)
+
+                        if entry and entry['digest'] == digest \
+                                and refresh_cache(repo + '.packages', cache_ttl) \
+                                and refresh_cache(repo + '.dependencies', cache_ttl):
+                            reused += 1
+
+                        else:
+                            entry = {
+                                'digest': digest,
+                                'unavailable_packages': [],
+                                'unavailable_dependencies': [],
+                                'renamed_packages': provider.get_renamed_packages(repo)
+                            }
+
+                            original_packages = provider.get_packages(repo)
+                            filtered_packages = {}
+                            for package in original_packages:
+                                info = original_packages[package]
+                                info['releases'] = selector.filter(package, info['releases'])
+                                if info['releases']:
+                                    filtered_packages[package] = info
+                                else:
+                                    entry['unavailable_packages'].append(package)
+                            packages_cache_key = repo + '.packages'
+                            set_cache(packages_cache_key, compact_catalog(filtered_packages), cache_ttl)
+
+                            original_dependencies = provider.get_dependencies(repo)
+                            filtered_dependencies = {}
+                            for dependency in original_dependencies:
+                                info = original_dependencies[dependency]
+                                info['releases'] = selector.filter(dependency, info['releases'])
+                                if info['releases']:
+                                    filtered_dependencies[dependency] = info
+                                else:
+                                    entry['unavailable_dependencies'].append(dependency)
+                            dependencies_cache_key = repo + '.dependencies'
+                            set_cache(dependencies_cache_key, compact_catalog(filtered_dependencies), cache_ttl)
+
+                        digests[repo] = entry
+                        unavailable_packages.extend(entry['unavailable_packages'])
+                        unavailable_dependencies.extend(entry['unavailable_dependencies'])
+                        renamed_packages.update(entry['renamed_packages'])
+
+                    set_cache(digests_key, digests, cache_ttl)
+
+                    console_write(
+                        u'''
+                        Refreshed channel %s, reused %d repositories and rebuilt %d
+                        ''',
+                        (channel, reused, len(channel_repositories) - reused)
+                    )
 
                     # Have the local name map override the one from the channel
                     name_map = provider.get_name_map()
                     set_cache_under_settings(self, 'package_name_map', channel, name_map, cache_ttl)
 
-                    renamed_packages = provider.get_renamed_packages()
                     set_cache_under_settings(self, 'renamed_packages', channel, renamed_packages, cache_ttl)
 
                     set_cache_under_settings(
@@ -513,6 +657,10 @@ class PackageManager():
                     continue
 
             repositories.extend(channel_repositories)
+
+        save_persistent_cache(self.cache_fingerprint, self.cache_max_stale)
+        if stale:
+            self._revalidate_in_background(stale)
         return [repo.strip() for repo in repositories]
 
     def _list_available(self):
@@ -561,7 +709,9 @@ class PackageManager():
         bg_downloaders = {}
         active = []
         repos_to_download = []
+        stale = []
         name_map = self.settings.get('package_name_map', {})
+        selector = ReleaseSelector(self.settings)
 
         # Repositories are run in reverse order so that the ones first
         # on the list will overwrite those last on the list
@@ -572,15 +722,42 @@ class PackageManager():
 
             cache_key = repo + '.packages'
             repository_packages = get_cache(cache_key)
+            if repository_packages is None and self.max_stale:
+                repository_packages = get_cache(cache_key, max_stale=self.max_stale)
+                if repository_packages is not None:
+                    stale.append(repo)
 
             if repository_packages is not None:
-                packages.update(repository_packages)
+                timing.count('repository_cache_hits')
+
+                # Info loaded from the cache of a previous session is plain
+                # dicts until compacted here
+                packages.update(compact_catalog(repository_packages))
 
                 cache_key = repo + '.dependencies'
-                repository_dependencies = get_cache(cache_key)
-                dependencies.update(repository_dependencies)
+                repository_dependencies = get_cache(cache_key, {}, max_stale=self.max_stale)
+                dependencies.update(compact_catalog(repository_dependencies))
+
+                # The side tables are needed too when the repository info
+                # came from the cache of a previous session
+                merge_cache_under_settings(self, 'renamed_packages', repo, max_stale=self.max_stale)
+                merge_cache_under_settings(
+                    self,
+                    'unavailable_packages',
+                    repo,
+                    list_=True,
+                    max_stale=self.max_stale
+                )
+                merge_cache_under_settings(
+                    self,
+                    'unavailable_dependencies',
+                    repo,
+                    list_=True,
+                    max_stale=self.max_stale
+                )
 
             else:
+                timing.count('repository_cache_misses')
                 domain = urlparse(repo).hostname
                 if domain not in bg_downloaders:
                     bg_downloaders[domain] = BackgroundDownloader(
@@ -588,6 +765,7 @@ class PackageManager():
                 bg_downloaders[domain].add_url(repo)
                 repos_to_download.append(repo)
 
+        span = timing.span('repository_fetch')
         for bg_downloader in list(bg_downloaders.values()):
             bg_downloader.start()
             active.append(bg_downloader)
@@ -596,6 +774,10 @@ class PackageManager():
         while active:
             bg_downloader = active.pop()
             bg_downloader.join()
+        span.end()
+
+        # Write the commit dates found by all of the repositories at once
+        save_commit_dates()
 
         # Grabs the results and stuff it all in the cache
         for repo in repos_to_download:
@@ -613,7 +795,7 @@ class PackageManager():
             for name, info in provider.get_packages():
                 name = name_map.get(name, name)
                 info['name'] = name
-                info['releases'] = filter_releases(name, self.settings, info['releases'])
+                info['releases'] = selector.filter(name, info['releases'])
                 if info['releases']:
                     repository_packages[name] = info
                 else:
@@ -621,7 +803,7 @@ class PackageManager():
 
             repository_dependencies = {}
             for name, info in provider.get_dependencies():
-                info['releases'] = filter_releases(name, self.settings, info['releases'])
+                info['releases'] = selector.filter(name, info['releases'])
                 if info['releases']:
                     repository_dependencies[name] = info
                 else:
@@ -636,11 +818,11 @@ class PackageManager():
                 console_write(exception)
 
             cache_key = repo + '.packages'
-            set_cache(cache_key, repository_packages, cache_ttl)
+            set_cache(cache_key, compact_catalog(repository_packages), cache_ttl)
             packages.update(repository_packages)
 
             cache_key = repo + '.dependencies'
-            set_cache(cache_key, repository_dependencies, cache_ttl)
+            set_cache(cache_key, compact_catalog(repository_dependencies), cache_ttl)
             dependencies.update(repository_dependencies)
 
             renamed_packages = provider.get_renamed_packages()
@@ -663,6 +845,10 @@ class PackageManager():
                 list_=True
             )
 
+        save_persistent_cache(self.cache_fingerprint, self.cache_max_stale)
+        if stale:
+            self._revalidate_in_background(stale)
+
         # filter out packages which should not be renamed
         repositories_names = set()
 
@@ -712,6 +898,74 @@ class PackageManager():
 
         return (packages, dependencies)
 
+    def _revalidate_in_background(self, urls):
+        """
+        Downloads the channels and repositories again in a background thread,
+        after their expired info was served from the cache. The requests are
+        conditional, so unchanged sources are answered from the HTTP cache.
+        Once stored, the new info replaces the expired info and invalidates
+        every AvailableSnapshot built from it.
+
+        :param urls:
+            A list of the channel and repository URLs that were expired
+        """
+
+        global _revalidating
+
+        with _revalidating_lock:
+            if _revalidating:
+                return
+            _revalidating = True
+
+        if self.settings.get('debug'):
+            console_write(
+                u'''
+                Using expired info for %s while revalidating in the background
+                ''',
+                ', '.join(urls)
+            )
+
+        def revalidate():
+            global _revalidating
+
+            try:
+                manager = PackageManager()
+                manager.max_stale = 0
+                with timing.operation('refresh'):
+                    manager._list_available()
+            except (Exception) as e:
+                console_write(
+                    u'''
+                    Error revalidating channel and repository info: %s
+                    ''',
+                    str_cls(e)
+                )
+            finally:
+                with _revalidating_lock:
+                    _revalidating = False
+
+        thread = threading.Thread(target=revalidate)
+        thread.daemon = True
+        thread.start()
+
+    def available_snapshot(self):
+        """
+        Returns the merged index of every available package and dependency,
+        only rebuilding it when the channel and repository cache has changed
+        since it was last built
+
+        :return:
+            An AvailableSnapshot object
+        """
+
+        with self._available_lock:
+            snapshot = self._available_snapshot
+            if snapshot is None or not snapshot.is_valid():
+                packages, dependencies = self._list_available()
+                snapshot = AvailableSnapshot(packages, dependencies, self.settings.get('cache_length'))
+                self._available_snapshot = snapshot
+            return snapshot
+
     def list_available_dependencies(self):
         """
         Returns a master list of every available dependency from all sources
@@ -726,7 +980,7 @@ class PackageManager():
             }
         """
 
-        return self._list_available()[1]
+        return self.available_snapshot().dependencies
 
     def list_available_packages(self):
         """
@@ -742,7 +996,7 @@ class PackageManager():
             }
         """
 
-        return self._list_available()[0]
+        return self.available_snapshot().packages
 
     def list_packages(self, unpacked_only=False, list_everything=False):
         """
@@ -755,10 +1009,11 @@ class PackageManager():
         :return: A list of all installed, non-default, non-dependency, package names
         """
 
-        packages = self._list_visible_dirs(self.settings['packages_path'])
+        inventory = self.inventory()
+        packages = inventory.visible_dirs()
 
         if self.settings['version'] > 3000 and unpacked_only is False:
-            packages |= self._list_sublime_package_files(self.settings['installed_packages_path'])
+            packages |= inventory.sublime_package_files()
 
         if list_everything:
             packages |= set(self.list_default_packages())
@@ -779,8 +1034,9 @@ class PackageManager():
         if sys.version_info >= (3,):
             output.append('0_packagesmanager_loader')
 
-        for name in self._list_visible_dirs(self.settings['packages_path']):
-            if not self._is_dependency(name):
+        inventory = self.inventory()
+        for name in inventory.visible_dirs():
+            if not inventory.is_dependency(name):
                 continue
             output.append(name)
 
@@ -794,9 +1050,9 @@ class PackageManager():
         """
 
         output = []
-        for name in self._list_visible_dirs(self.settings['packages_path']):
-            hidden_file_path = os.path.join(self.settings['packages_path'], name, '.sublime-dependency')
-            if not os.path.exists(hidden_file_path):
+        inventory = self.inventory()
+        for name in inventory.visible_dirs():
+            if not inventory.has(name, '.sublime-dependency'):
                 continue
             if not loader.exists(name):
                 output.append(name)
@@ -834,30 +1090,61 @@ class PackageManager():
         packages -= DEFAULT_IGNORED_PACKAGES
         return sorted(packages, key=lambda s: s.lower())
 
-    def _list_visible_dirs(self, path):
+    def inventory(self):
         """
-        Return a set of directories in the folder specified that are not
-        hidden and are not marked to be removed
+        Returns the classified contents of the Packages/ and Installed Packages/
+        folders, only scanning them again when entries were added or removed
 
-        :param path:
-            The folder to list the directories inside of
+        :return:
+            A PackageInventory object
+        """
+
+        inventory = self._inventory
+        if inventory is None or not inventory.is_current():
+            installed_packages_path = None
+            if self.settings['version'] > 3000:
+                installed_packages_path = self.settings['installed_packages_path']
+            inventory = PackageInventory(self.settings['packages_path'], installed_packages_path)
+            self._inventory = inventory
+        return inventory
+
+    def invalidate_inventory(self):
+        """
+        Makes the next call to inventory() scan the folders again, which is
+        needed after changing files inside of a package dir
+        """
+
+        self._inventory = None
+
+    def archive_store(self):
+        """
+        Returns the store of downloaded package archives, if the
+        "archive_cache" setting is enabled
 
         :return:
-            A set of directory names
+            An ArchiveStore object, or None
         """
 
-        output = set()
-        for filename in os.listdir(path):
-            if filename[0] == '.':
-                continue
-            file_path = os.path.join(path, filename)
-            if not os.path.isdir(file_path):
-                continue
-            # Don't include a dir if it is going to be cleaned up
-            if os.path.exists(os.path.join(file_path, 'package-control.cleanup')):
-                continue
-            output.add(filename)
-        return output
+        if not self.settings.get('archive_cache'):
+            return None
+        max_size = self.settings.get('archive_cache_max_size', 200)
+        return ArchiveStore(int(max_size * 1024 * 1024))
+
+    def backup_store(self):
+        """
+        Returns the store of incremental package backups, if the "backup_mode"
+        setting is "snapshot"
+
+        :return:
+            A BackupStore object, or None
+        """
+
+        if self.settings.get('backup_mode') != 'snapshot':
+            return None
+        backup_path = os.path.join(os.path.dirname(self.settings['packages_path']), 'Backup')
+        max_count = self.settings.get('backup_max_count', 5)
+        max_size = self.settings.get('backup_max_size', 500)
+        return BackupStore(backup_path, max_count, int(max_size * 1024 * 1024))
 
     def _list_sublime_package_files(self, path):
         """
@@ -890,9 +1177,7 @@ class PackageManager():
             Bool, if the package is a dependency
         """
 
-        metadata_path = os.path.join(self.settings['packages_path'], name, 'dependency-metadata.json')
-        hidden_path = os.path.join(self.settings['packages_path'], name, '.sublime-dependency')
-        return os.path.exists(metadata_path) or os.path.exists(hidden_path)
+        return self.inventory().is_dependency(name)
 
     def find_required_dependencies(self, ignore_package=None):
         """
@@ -916,11 +1201,10 @@ class PackageManager():
         # Consider any folder with a .sublime-dependency file that does not
         # have a dependency-metadata.json file to be a dependency that was
         # hand-installed by a developer, and thus "required"
-        for name in self._list_visible_dirs(self.settings['packages_path']):
-            metadata_path = os.path.join(self.settings['packages_path'], name, 'dependency-metadata.json')
-            hidden_path = os.path.join(self.settings['packages_path'], name, '.sublime-dependency')
-            metadata_exists = os.path.exists(metadata_path)
-            hidden_exists = os.path.exists(hidden_path)
+        inventory = self.inventory()
+        for name in inventory.visible_dirs():
+            metadata_exists = inventory.has(name, 'dependency-metadata.json')
+            hidden_exists = inventory.has(name, '.sublime-dependency')
             if metadata_exists or not hidden_exists:
                 continue
             output.append(name)
@@ -1035,12 +1319,13 @@ class PackageManager():
 
         return True
 
-    def install_package(self, package_name, is_dependency=False):
+    def install_package(self, package_name, is_dependency=False, version=None):
         """
         Downloads and installs (or upgrades) a package
 
         Uses the self.list_available_packages() method to determine where to
-        retrieve the package file from.
+        retrieve the package file from. When the archive of the release was
+        stored in the archive store, it is used instead of downloading it.
 
         The install process consists of:
 
@@ -1057,6 +1342,10 @@ class PackageManager():
         :param is_dependency:
             If the package is a dependency
 
+        :param version:
+            The version to install from the archive store, instead of the
+            latest available release
+
         :return: bool if the package was successfully installed or None
                  if the package needs to be cleaned up on the next restart
                  and should not be reenabled
@@ -1092,7 +1381,9 @@ class PackageManager():
                 return True
             return False
 
-        if not is_available:
+        # A stored release of a package may be installed once the package is
+        # no longer listed, however dependencies need their load order
+        if not is_available and (version is None or is_dependency):
             message = u"The %s '%s' is not available"
             params = (package_type, package_name)
             if is_dependency:
@@ -1101,7 +1392,30 @@ class PackageManager():
                 show_error(message, params)
             return False
 
-        release = packages[package_name]['releases'][0]
+        store = self.archive_store()
+
+        package_info = packages.get(package_name)
+        if package_info is None:
+            # The homepage and description of an unlisted package come from
+            # the metadata of the installed version
+            metadata = self.get_metadata(package_name)
+            package_info = {
+                'homepage': metadata.get('url', ''),
+                'description': metadata.get('description', '')
+            }
+
+        if version is None:
+            release = package_info['releases'][0]
+        else:
+            release = store.find_release(package_name, version) if store else None
+            if not release:
+                show_error(
+                    u'''
+                    Version %s of the %s %s is not in the archive cache
+                    ''',
+                    (version, package_type, package_name)
+                )
+                return False
 
         have_installed_dependencies = False
         if not is_dependency:
@@ -1166,11 +1480,39 @@ class PackageManager():
             old_version = self.get_metadata(package_name, is_dependency=is_dependency).get('version')
             is_upgrade = old_version is not None
 
-            # Download the sublime-package or zip file
+            stored_path = None
+            if store:
+                stored_path = store.find(package_name, release, verify=True)
+                timing.count('archive_store_hits' if stored_path else 'archive_store_misses')
+
+            prefetched_path = None
+            if self._prefetcher:
+                prefetched_path = self._prefetcher.take(package_name, url)
+                timing.count('prefetch_hits' if prefetched_path else 'prefetch_misses')
+
+            # Download the sublime-package or zip file straight to disk
+            span = timing.span('download')
             try:
-                with downloader(url, self.settings) as manager:
-                    package_bytes = manager.fetch(url, 'Error downloading package.')
-            except (DownloaderException) as e:
+                if stored_path:
+                    shutil.copyfile(stored_path, tmp_package_path)
+                    if self.settings.get('debug'):
+                        console_write(
+                            u'''
+                            Using the stored archive %s for %s
+                            ''',
+                            (stored_path, package_name)
+                        )
+                elif prefetched_path:
+                    shutil.move(prefetched_path, tmp_package_path)
+                else:
+                    with downloader(url, self.settings) as manager:
+                        manager.fetch_to_file(
+                            url,
+                            tmp_package_path,
+                            'Error downloading package.',
+                            self._download_progress
+                        )
+            except (DownloaderException, IOError, OSError) as e:
                 console_write(e)
                 show_error(
                     u'''
@@ -1180,9 +1522,9 @@ class PackageManager():
                     package_name
                 )
                 return False
-
-            with open_compat(tmp_package_path, "wb") as package_file:
-                package_file.write(package_bytes)
+            finally:
+                span.end()
+                ThreadProgress.set_progress(None)
 
             # Try to open it as a zip file
             try:
@@ -1232,6 +1574,9 @@ class PackageManager():
             if last_path and len(root_level_paths) == 0:
                 root_level_paths.append(last_path[0:last_path.find('/') + 1])
 
+            if store and not stored_path:
+                store.add(package_name, release, tmp_package_path)
+
             # If there is only a single directory at the top leve, the file
             # is most likely a zip from BitBucket or GitHub and we need
             # to skip the top-level dir when extracting
@@ -1344,179 +1689,217 @@ class PackageManager():
                 else:
                     unlink_or_delete_directory(unpacked_package_dir)
 
+            # Look for special loader code for dependencies
+            loader_code = None
+
             # If we determined it should be unpacked, we extract directly
             # into the Packages/{package_name}/ folder
             if unpack:
-                self.backup_package_dir(package_name)
+                with timing.span('backup'):
+                    self.backup_package_dir(package_name)
+                span = timing.span('extract')
                 package_dir = unpacked_package_dir
+                package_metadata_file = os.path.join(package_dir, metadata_filename)
 
-            # Otherwise we go into a temp dir since we will be creating a
-            # new .sublime-package file later
-            else:
-                tmp_working_dir = os.path.join(tmp_dir, 'working')
-                os.mkdir(tmp_working_dir)
-                package_dir = tmp_working_dir
-
-            package_metadata_file = os.path.join(package_dir, metadata_filename)
+                if not os.path.exists(package_dir):
+                    os.mkdir(package_dir)
 
-            if not os.path.exists(package_dir):
-                os.mkdir(package_dir)
+                os.chdir(package_dir)
 
-            os.chdir(package_dir)
+                # Here we don't use .extractall() since it was having issues on OS X
+                overwrite_failed = False
+                extracted_paths = set()
+                for info in package_zip.infolist():
+                    path = info.filename
+                    dest = path
 
-            # Look for special loader code for dependencies
-            loader_code = None
-
-            # Here we don't use .extractall() since it was having issues on OS X
-            overwrite_failed = False
-            extracted_paths = set()
-            for info in package_zip.infolist():
-                path = info.filename
-                dest = path
-
-                try:
-                    if not isinstance(dest, str_cls):
-                        dest = dest.decode('utf-8', 'strict')
-                except (UnicodeDecodeError):
-                    console_write(
-                        u'''
-                        One or more of the zip file entries in %s is not
-                        encoded using UTF-8, aborting
-                        ''',
-                        package_name
-                    )
-                    return False
-
-                if os.name == 'nt':
-                    regex = r':|\*|\?|"|<|>|\|'
-                    if re.search(regex, dest) is not None:
+                    try:
+                        if not isinstance(dest, str_cls):
+                            dest = dest.decode('utf-8', 'strict')
+                    except (UnicodeDecodeError):
                         console_write(
                             u'''
-                            Skipping file from package named %s due to an
-                            invalid filename
+                            One or more of the zip file entries in %s is not
+                            encoded using UTF-8, aborting
                             ''',
                             package_name
                         )
-                        continue
-
-                # If there was only a single directory in the package, we remove
-                # that folder name from the paths as we extract entries
-                if skip_root_dir:
-                    dest = dest[len(root_level_paths[0]):]
-
-                if os.name == 'nt':
-                    dest = dest.replace('/', '\\')
-                else:
-                    dest = dest.replace('\\', '/')
+                        return False
 
-                # loader.py is included for backwards compatibility. New code
-                # should use loader.code with Python inside of it. We no longer
-                # use loader.py since we can't have any files ending in .py in
-                # the root of a package, otherwise Sublime Text loads it as a
-                # plugin and then the dependency path added to sys.path and the
-                # package path loaded by Sublime Text conflict and there will be
-                # errors when Sublime Text tries to initialize plugins. By using
-                # loader.code, developers can git clone a dependency into their
-                # Packages folder without issue.
-                if is_dependency and dest in set(['loader.code', 'loader.py']):
-                    loader_code = package_zip.read(path).decode('utf-8')
-                    if dest == 'loader.py':
-                        continue
+                    if os.name == 'nt':
+                        regex = r':|\*|\?|"|<|>|\|'
+                        if re.search(regex, dest) is not None:
+                            console_write(
+                                u'''
+                                Skipping file from package named %s due to an
+                                invalid filename
+                                ''',
+                                package_name
+                            )
+                            continue
 
-                dest = os.path.join(package_dir, dest)
+                    # If there was only a single directory in the package, we remove
+                    # that folder name from the paths as we extract entries
+                    if skip_root_dir:
+                        dest = dest[len(root_level_paths[0]):]
+
+                    if os.name == 'nt':
+                        dest = dest.replace('/', '\\')
+                    else:
+                        dest = dest.replace('\\', '/')
+
+                    # loader.py is included for backwards compatibility. New code
+                    # should use loader.code with Python inside of it. We no longer
+                    # use loader.py since we can't have any files ending in .py in
+                    # the root of a package, otherwise Sublime Text loads it as a
+                    # plugin and then the dependency path added to sys.path and the
+                    # package path loaded by Sublime Text conflict and there will be
+                    # errors when Sublime Text tries to initialize plugins. By using
+                    # loader.code, developers can git clone a dependency into their
+                    # Packages folder without issue.
+                    if is_dependency and dest in set(['loader.code', 'loader.py']):
+                        loader_code = package_zip.read(path).decode('utf-8')
+                        if dest == 'loader.py':
+                            continue
 
-                def add_extracted_dirs(dir_):
-                    while dir_ not in extracted_paths:
-                        extracted_paths.add(dir_)
-                        dir_ = os.path.dirname(dir_)
-                        if dir_ == package_dir:
-                            break
+                    dest = os.path.join(package_dir, dest)
+
+                    def add_extracted_dirs(dir_):
+                        while dir_ not in extracted_paths:
+                            extracted_paths.add(dir_)
+                            dir_ = os.path.dirname(dir_)
+                            if dir_ == package_dir:
+                                break
+
+                    if path.endswith('/'):
+                        if not os.path.exists(dest):
+                            os.makedirs(dest)
+                        add_extracted_dirs(dest)
+                    else:
+                        dest_dir = os.path.dirname(dest)
+                        if not os.path.exists(dest_dir):
+                            os.makedirs(dest_dir)
+                        add_extracted_dirs(dest_dir)
+                        extracted_paths.add(dest)
+                        try:
+                            with open_compat(dest, 'wb') as f:
+                                f.write(package_zip.read(path))
+                        except (IOError) as e:
+                            message = unicode_from_os(e)
+                            if re.search('[Ee]rrno 13', message):
+                                overwrite_failed = True
+                                break
+                            console_write(
+                                u'''
+                                Skipping file from package named %s due to an
+                                invalid filename
+                                ''',
+                                package_name
+                            )
+
+                        except (UnicodeDecodeError):
+                            console_write(
+                                u'''
+                                Skipping file from package named %s due to an
+                                invalid filename
+                                ''',
+                                package_name
+                            )
 
-                if path.endswith('/'):
-                    if not os.path.exists(dest):
-                        os.makedirs(dest)
-                    add_extracted_dirs(dest)
-                else:
-                    dest_dir = os.path.dirname(dest)
-                    if not os.path.exists(dest_dir):
-                        os.makedirs(dest_dir)
-                    add_extracted_dirs(dest_dir)
-                    extracted_paths.add(dest)
-                    try:
-                        with open_compat(dest, 'wb') as f:
-                            f.write(package_zip.read(path))
-                    except (IOError) as e:
-                        message = unicode_from_os(e)
-                        if re.search('[Ee]rrno 13', message):
-                            overwrite_failed = True
-                            break
-                        console_write(
-                            u'''
-                            Skipping file from package named %s due to an
-                            invalid filename
-                            ''',
-                            package_name
-                        )
+                package_zip.close()
+                package_zip = None
 
-                    except (UnicodeDecodeError):
-                        console_write(
-                            u'''
-                            Skipping file from package named %s due to an
-                            invalid filename
-                            ''',
-                            package_name
-                        )
+                # If upgrading failed, queue the package to upgrade upon next start
+                if overwrite_failed:
+                    reinstall_file = os.path.join(package_dir, 'package-control.reinstall')
+                    open_compat(reinstall_file, 'w').close()
 
-            package_zip.close()
-            package_zip = None
+                    # Don't delete the metadata file, that way we have it
+                    # when the reinstall happens, and the appropriate
+                    # usage info can be sent back to the server.
+                    # No need to handle symlink at this stage it was already removed
+                    # and we are not working with symlink here anymore.
+                    clear_directory(package_dir, [reinstall_file, package_metadata_file])
 
-            # If upgrading failed, queue the package to upgrade upon next start
-            if overwrite_failed:
-                reinstall_file = os.path.join(package_dir, 'package-control.reinstall')
-                open_compat(reinstall_file, 'w').close()
+                    show_error(
+                        u'''
+                        An error occurred while trying to upgrade %s. Please restart
+                        Sublime Text to finish the upgrade.
+                        ''',
+                        package_name
+                    )
+                    return None
 
-                # Don't delete the metadata file, that way we have it
-                # when the reinstall happens, and the appropriate
-                # usage info can be sent back to the server.
+                # Here we clean out any files that were not just overwritten. It is ok
+                # if there is an error removing a file. The next time there is an
+                # upgrade, it should be cleaned out successfully then.
                 # No need to handle symlink at this stage it was already removed
                 # and we are not working with symlink here anymore.
-                clear_directory(package_dir, [reinstall_file, package_metadata_file])
+                clear_directory(package_dir, extracted_paths)
+                span.end()
+            # Otherwise the compressed entries are copied straight into a new
+            # .sublime-package file later, so nothing is extracted
+            else:
+                package_dir = None
+                packed_entries = []
+                for info in package_zip.infolist():
+                    path = info.filename
+                    if path.endswith('/'):
+                        continue
 
-                show_error(
-                    u'''
-                    An error occurred while trying to upgrade %s. Please restart
-                    Sublime Text to finish the upgrade.
-                    ''',
-                    package_name
-                )
-                return None
+                    dest = path
+                    if not isinstance(dest, str_cls):
+                        dest = dest.decode('utf-8', 'strict')
 
-            # Here we clean out any files that were not just overwritten. It is ok
-            # if there is an error removing a file. The next time there is an
-            # upgrade, it should be cleaned out successfully then.
-            # No need to handle symlink at this stage it was already removed
-            # and we are not working with symlink here anymore.
-            clear_directory(package_dir, extracted_paths)
+                    if os.name == 'nt':
+                        regex = r':|\*|\?|"|<|>|\|'
+                        if re.search(regex, dest) is not None:
+                            console_write(
+                                u'''
+                                Skipping file from package named %s due to an
+                                invalid filename
+                                ''',
+                                package_name
+                            )
+                            continue
+
+                    if skip_root_dir:
+                        dest = dest[len(root_level_paths[0]):]
+
+                    dest = dest.replace('\\', '/')
+
+                    # The metadata file is always written from the release info
+                    if not dest or dest == metadata_filename:
+                        continue
+
+                    packed_entries.append((info, dest))
 
             new_version = release['version']
 
-            self.print_messages(package_name, package_dir, is_upgrade, old_version, new_version)
+            if is_dependency:
+                url = package_info['issues']
+            else:
+                url = package_info['homepage']
+            metadata = {
+                "version": new_version,
+                "sublime_text": release['sublime_text'],
+                "platforms": release['platforms'],
+                "url": url,
+                "description": package_info['description']
+            }
+            if not is_dependency:
+                metadata['dependencies'] = list( sorted( release.get( 'dependencies', [] ) ) )
+            metadata = OrderedDict( sorted( metadata.items() ) )
 
-            with open_compat(package_metadata_file, 'w') as f:
-                if is_dependency:
-                    url = packages[package_name]['issues']
-                else:
-                    url = packages[package_name]['homepage']
-                metadata = {
-                    "version": new_version,
-                    "sublime_text": release['sublime_text'],
-                    "platforms": release['platforms'],
-                    "url": url,
-                    "description": packages[package_name]['description']
-                }
-                if not is_dependency:
-                    metadata['dependencies'] = list( sorted( release.get( 'dependencies', [] ) ) )
-                json.dump( OrderedDict( sorted( metadata.items() ) ), f )
+            if unpack:
+                self.print_messages(package_name, package_dir, is_upgrade, old_version, new_version)
+
+                with open_compat(package_metadata_file, 'w') as f:
+                    json.dump( metadata, f )
+
+            else:
+                zip_root = root_level_paths[0] if skip_root_dir else ''
+                self.print_messages(package_name, None, is_upgrade, old_version, new_version, package_zip, zip_root)
 
             # Submit install and upgrade info
             if is_upgrade:
@@ -1547,17 +1930,22 @@ class PackageManager():
                 sublime.set_timeout(save_names, 1)
 
             else:
-                load_order = packages[package_name]['load_order']
+                load_order = package_info['load_order']
                 loader.add_or_update(load_order, package_name, loader_code)
 
             # If we didn't extract directly into the Packages/{package_name}/
             # folder, we need to create a .sublime-package file and install it
             if not unpack:
+                new_package_path = os.path.join(tmp_dir, 'new-' + package_filename)
                 try:
-                    # Remove the downloaded file since we are going to overwrite it
-                    os.remove(tmp_package_path)
-                    package_zip = zipfile.ZipFile(tmp_package_path, "w", compression=zipfile.ZIP_DEFLATED)
-                except (OSError, IOError) as e:
+                    with timing.span('rezip'):
+                        transcode_zip(
+                            tmp_package_path,
+                            packed_entries,
+                            new_package_path,
+                            {metadata_filename: json.dumps(metadata).encode('utf-8')}
+                        )
+                except (OSError, IOError, zipfile.BadZipfile) as e:
                     show_error(
                         u'''
                         An error occurred creating the package file %s in %s.
@@ -1568,27 +1956,16 @@ class PackageManager():
                     )
                     return False
 
-                package_dir_regex = re.compile('^' + re.escape(package_dir))
-                for root, dirs, files in os.walk(package_dir):
-                    paths = dirs
-                    paths.extend(files)
-                    for path in paths:
-                        full_path = os.path.join(root, path)
-                        relative_path = re.sub(package_dir_regex, '', full_path)
-                        if os.path.isdir(full_path):
-                            continue
-                        package_zip.write(full_path, relative_path)
-
                 package_zip.close()
                 package_zip = None
 
                 try:
+                    close_package_archive(package_name)
                     if os.path.exists(package_path):
                         os.remove(package_path)
-                    shutil.move(tmp_package_path, package_path)
+                    shutil.move(new_package_path, package_path)
                 except (OSError):
-                    new_package_path = package_path.replace('.sublime-package', '.sublime-package-new')
-                    shutil.move(tmp_package_path, new_package_path)
+                    shutil.move(new_package_path, package_path.replace('.sublime-package', '.sublime-package-new'))
                     show_error(
                         u'''
                         An error occurred while trying to upgrade %s. Please restart
@@ -1624,11 +2001,71 @@ class PackageManager():
             if package_zip:
                 package_zip.close()
 
+            self.invalidate_inventory()
+
             # Try to remove the tmp dir after a second to make sure
             # a virus scanner is holding a reference to the zipfile
             # after we close it.
             sublime.set_timeout(lambda: unlink_or_delete_directory(tmp_dir), 1000)
 
+    def _download_progress(self, received, total):
+        """
+        Displays the progress of a package download in the status bar
+
+        :param received:
+            The number of bytes downloaded so far
+
+        :param total:
+            The total number of bytes, or None if not known
+        """
+
+        if total:
+            ThreadProgress.set_progress(u'%d%%' % (received * 100 // total))
+        else:
+            ThreadProgress.set_progress(u'%d KB' % (received // 1024))
+
+    def prefetch_packages(self, package_names):
+        """
+        Starts downloading the archives for a batch of packages in the
+        background, several at a time, so that install_package() can use them
+        as soon as it gets to each package. finish_prefetch() must be called
+        once the batch is complete.
+
+        :param package_names:
+            A list of the names of the packages about to be installed or upgraded
+        """
+
+        self.finish_prefetch()
+
+        packages = self.list_available_packages()
+        store = self.archive_store()
+        releases = []
+        for package_name in package_names:
+            if package_name not in packages:
+                continue
+            # VCS packages are upgraded through git or hg
+            if self.is_vcs_package(package_name):
+                continue
+            release = packages[package_name]['releases'][0]
+            if store and store.find(package_name, release):
+                continue
+            releases.append((package_name, release['url']))
+
+        if not releases:
+            return
+
+        self._prefetcher = PackagePrefetcher(self.settings, releases)
+        self._prefetcher.start()
+
+    def finish_prefetch(self):
+        """
+        Discards any prefetched archives that were not used
+        """
+
+        if self._prefetcher:
+            self._prefetcher.cleanup()
+            self._prefetcher = None
+
     def install_dependencies(self, dependencies, fail_early=True):
         """
         Ensures a list of dependencies are installed and up-to-date
@@ -1645,79 +2082,82 @@ class PackageManager():
         packages = self.list_available_dependencies()
 
         error = False
-        for dependency in dependencies:
-            # This is a per-machine dynamically created dependency, so we skip
-            if dependency == '0_packagesmanager_loader':
-                continue
-
-            # Collect dependency information
-            dependency_dir = os.path.join(self.settings['packages_path'], dependency)
-            dependency_git_dir = os.path.join(dependency_dir, '.git')
-            dependency_hg_dir = os.path.join(dependency_dir, '.hg')
-            dependency_metadata = self.get_metadata(dependency, is_dependency=True)
-
-            dependency_releases = packages.get(dependency, {}).get('releases', [])
-            dependency_release = dependency_releases[0] if dependency_releases else {}
-
-            installed_version = dependency_metadata.get('version')
-            installed_version = version_comparable(installed_version) if installed_version else None
-            available_version = dependency_release.get('version')
-            available_version = version_comparable(available_version) if available_version else None
-
-            def dependency_write(msg):
-                msg = u"The dependency '{dependency}' " + msg
-                msg = msg.format(
-                    dependency=dependency,
-                    installed_version=installed_version,
-                    available_version=available_version
-                )
-                console_write(msg)
-
-            def dependency_write_debug(msg):
-                if debug:
-                    dependency_write(msg)
-
-            install_dependency = False
-            if not os.path.exists(dependency_dir):
-                install_dependency = True
-                dependency_write(u'is not currently installed; installing...')
-            elif os.path.exists(dependency_git_dir):
-                dependency_write_debug(u'is installed via git; leaving alone')
-            elif os.path.exists(dependency_hg_dir):
-                dependency_write_debug(u'is installed via hg; leaving alone')
-            elif not dependency_metadata:
-                dependency_write_debug(u'appears to be installed, but is missing metadata; leaving alone')
-            elif not dependency_releases:
-                dependency_write(u'is installed, but there are no available releases; leaving alone')
-            elif not available_version:
-                dependency_write(
-                    u'is installed, but the latest available release '
-                    u'could not be determined; leaving alone'
-                )
-            elif not installed_version:
-                install_dependency = True
-                dependency_write(
-                    u'is installed, but its version is not known; '
-                    u'upgrading to latest release {available_version}...'
-                )
-            elif installed_version < available_version:
-                install_dependency = True
-                dependency_write(
-                    u'is installed, but out of date; upgrading to latest '
-                    u'release {available_version} from {installed_version}...'
-                )
-            else:
-                dependency_write_debug(u'is installed and up to date ({installed_version}); leaving alone')
+        # The loaders of all the dependencies are written with a single
+        # rewrite of the loader package
+        with loader.transaction():
+            for dependency in dependencies:
+                # This is a per-machine dynamically created dependency, so we skip
+                if dependency == '0_packagesmanager_loader':
+                    continue
 
-            if install_dependency:
-                dependency_result = self.install_package(dependency, True)
-                if not dependency_result:
-                    dependency_write(u'could not be installed or updated')
-                    if fail_early:
-                        return False
-                    error = True
+                # Collect dependency information
+                dependency_dir = os.path.join(self.settings['packages_path'], dependency)
+                dependency_git_dir = os.path.join(dependency_dir, '.git')
+                dependency_hg_dir = os.path.join(dependency_dir, '.hg')
+                dependency_metadata = self.get_metadata(dependency, is_dependency=True)
+
+                dependency_releases = packages.get(dependency, {}).get('releases', [])
+                dependency_release = dependency_releases[0] if dependency_releases else {}
+
+                installed_version = dependency_metadata.get('version')
+                installed_version = version_comparable(installed_version) if installed_version else None
+                available_version = dependency_release.get('version')
+                available_version = version_comparable(available_version) if available_version else None
+
+                def dependency_write(msg):
+                    msg = u"The dependency '{dependency}' " + msg
+                    msg = msg.format(
+                        dependency=dependency,
+                        installed_version=installed_version,
+                        available_version=available_version
+                    )
+                    console_write(msg)
+
+                def dependency_write_debug(msg):
+                    if debug:
+                        dependency_write(msg)
+
+                install_dependency = False
+                if not os.path.exists(dependency_dir):
+                    install_dependency = True
+                    dependency_write(u'is not currently installed; installing...')
+                elif os.path.exists(dependency_git_dir):
+                    dependency_write_debug(u'is installed via git; leaving alone')
+                elif os.path.exists(dependency_hg_dir):
+                    dependency_write_debug(u'is installed via hg; leaving alone')
+                elif not dependency_metadata:
+                    dependency_write_debug(u'appears to be installed, but is missing metadata; leaving alone')
+                elif not dependency_releases:
+                    dependency_write(u'is installed, but there are no available releases; leaving alone')
+                elif not available_version:
+                    dependency_write(
+                        u'is installed, but the latest available release '
+                        u'could not be determined; leaving alone'
+                    )
+                elif not installed_version:
+                    install_dependency = True
+                    dependency_write(
+                        u'is installed, but its version is not known; '
+                        u'upgrading to latest release {available_version}...'
+                    )
+                elif installed_version < available_version:
+                    install_dependency = True
+                    dependency_write(
+                        u'is installed, but out of date; upgrading to latest '
+                        u'release {available_version} from {installed_version}...'
+                    )
                 else:
-                    dependency_write(u'has successfully been installed or updated')
+                    dependency_write_debug(u'is installed and up to date ({installed_version}); leaving alone')
+
+                if install_dependency:
+                    dependency_result = self.install_package(dependency, True)
+                    if not dependency_result:
+                        dependency_write(u'could not be installed or updated')
+                        if fail_early:
+                            return False
+                        error = True
+                    else:
+                        dependency_write(u'has successfully been installed or updated')
 
         return not error
 
@@ -1745,22 +2185,24 @@ class PackageManager():
         orphaned_dependencies = sorted(orphaned_dependencies, key=lambda s: s.lower())
 
         error = False
-        for dependency in orphaned_dependencies:
-            if self.remove_package(dependency, is_dependency=True):
-                console_write(
-                    u'''
-                    The orphaned dependency %s has been removed
-                    ''',
-                    dependency
-                )
-            else:
-                error = True
+        with loader.transaction():
+            for dependency in orphaned_dependencies:
+                if self.remove_package(dependency, is_dependency=True):
+                    console_write(
+                        u'''
+                        The orphaned dependency %s has been removed
+                        ''',
+                        dependency
+                    )
+                else:
+                    error = True
 
         return not error
 
     def backup_package_dir(self, package_name):
         """
-        Does a full backup of the Packages/{package}/ dir to Backup/
+        Does a full backup of the Packages/{package}/ dir to Backup/, or an
+        incremental snapshot if the "backup_mode" setting is "snapshot"
 
         :param package_name:
             The name of the package to back up
@@ -1773,6 +2215,23 @@ class PackageManager():
         if not os.path.exists(package_dir):
             return True
 
+        store = self.backup_store()
+        if store:
+            try:
+                store.add(package_name, package_dir)
+                return True
+            except (OSError, IOError) as e:
+                show_error(
+                    u'''
+                    An error occurred while trying to backup the package directory
+                    for %s.
+
+                    %s
+                    ''',
+                    (package_name, unicode_from_os(e))
+                )
+                return False
+
         try:
             backup_dir = os.path.join(os.path.dirname(
                 self.settings['packages_path']), 'Backup',
@@ -1807,7 +2266,7 @@ class PackageManager():
                 pass  # Exeption occurred before package_backup_dir defined
             return False
 
-    def print_messages(self, package, package_dir, is_upgrade, old_version, new_version):
+    def print_messages(self, package, package_dir, is_upgrade, old_version, new_version, package_zip=None, zip_root=''):
         """
         Prints out package install and upgrade messages
 
@@ -1829,12 +2288,25 @@ class PackageManager():
 
         :param new_version:
             The new (string) version of the package
+
+        :param package_zip:
+            A zipfile.ZipFile to read the messages from instead of package_dir
+
+        :param zip_root:
+            The unicode string path of the package root inside of package_zip
         """
 
+        def read_file(relative_path):
+            if package_zip is not None:
+                try:
+                    return package_zip.read(zip_root + relative_path.replace('\\', '/')).decode('utf-8', 'replace')
+                except (KeyError):
+                    raise FileNotFoundError(u'The file "%s" could not be found' % relative_path)
+            with open_compat(os.path.join(package_dir, relative_path), 'r') as f:
+                return read_compat(f)
+
         try:
-            messages_file = os.path.join(package_dir, 'messages.json')
-            with open_compat(messages_file, 'r') as f:
-                message_info = json.loads(read_compat(f))
+            message_info = json.loads(read_file('messages.json'))
         except (FileNotFoundError):
             return
         except (ValueError):
@@ -1847,16 +2319,14 @@ class PackageManager():
             return
 
         def read_message(message_path):
-            with open_compat(message_path, 'r') as f:
-                lines = read_compat(f).rstrip().split('\n')
-                return '\n' + '\n'.join('  ' + s if s else '' for s in lines)
+            lines = read_file(message_path).rstrip().split('\n')
+            return '\n' + '\n'.join('  ' + s if s else '' for s in lines)
 
         output = ''
         if not is_upgrade and message_info.get('install'):
             try:
                 install_file = message_info.get('install')
-                install_path = os.path.join(package_dir, install_file)
-                output += read_message(install_path)
+                output += read_message(install_file)
             except (FileNotFoundError):
                 console_write(
                     u'''
@@ -1868,11 +2338,11 @@ class PackageManager():
         elif is_upgrade and old_version:
             upgrade_messages = list(set(message_info.keys()) - set(['install']))
             upgrade_messages = version_sort(upgrade_messages, reverse=True)
-            old_version_cmp = version_comparable(old_version)
-            new_version_cmp = version_comparable(new_version)
+            old_version_cmp = version_key(old_version)
+            new_version_cmp = version_key(new_version)
 
             for version in upgrade_messages:
-                version_cmp = version_comparable(version)
+                version_cmp = version_key(version)
                 if version_cmp <= old_version_cmp:
                     break
                 # If the package developer sets up release notes for future
@@ -1882,8 +2352,7 @@ class PackageManager():
 
                 try:
                     upgrade_file = message_info.get(version)
-                    upgrade_path = os.path.join(package_dir, upgrade_file)
-                    output += read_message(upgrade_path)
+                    output += read_message(upgrade_file)
                 except (FileNotFoundError):
                     console_write(
                         u'''
@@ -2006,6 +2475,7 @@ class PackageManager():
         cleanup_complete = True
 
         try:
+            close_package_archive(package_name)
             if os.path.exists(installed_package_path):
                 os.remove(installed_package_path)
         except (OSError, IOError):
@@ -2061,6 +2531,8 @@ class PackageManager():
         if os.path.exists(package_dir) and can_delete_dir:
             unlink_or_delete_directory(package_dir)
 
+        self.invalidate_inventory()
+
         if is_dependency:
             loader.remove(package_name)
 
@@ -2077,7 +2549,8 @@ class PackageManager():
 
     def record_usage(self, params):
         """
-        Submits install, upgrade and delete actions to a usage server
+        Queues install, upgrade and delete actions to be submitted to a usage
+        server by a background worker, so the operation does not wait on it
 
         The usage information is currently displayed on the PackagesManager
         website at https://packagecontrol.io
@@ -2088,33 +2561,11 @@ class PackageManager():
 
         if not self.settings.get('submit_usage'):
             return
-        params['packages_manager_version'] = \
-            self.get_metadata('PackagesManager').get('version')
+
+        if self._packages_manager_version is None:
+            self._packages_manager_version = self.get_metadata('PackagesManager').get('version')
+        params['packages_manager_version'] = self._packages_manager_version
         params['sublime_platform'] = self.settings.get('platform')
         params['sublime_version'] = self.settings.get('version')
 
-        # For Python 2, we need to explicitly encoding the params
-        for param in params:
-            if isinstance(params[param], str_cls):
-                params[param] = params[param].encode('utf-8')
-
-        url = self.settings.get('submit_url') + '?' + urlencode(params)
-
-        try:
-            with downloader(url, self.settings) as manager:
-                result = manager.fetch(url, 'Error submitting usage information.')
-        except (DownloaderException) as e:
-            console_write(e)
-            return
-
-        try:
-            result = json.loads(result.decode('utf-8'))
-            if result['result'] != 'success':
-                raise ValueError()
-        except (ValueError):
-            console_write(
-                u'''
-                Error submitting usage information for %s
-                ''',
-                params['package']
-            )
+        usage_queue.enqueue(params, self.settings)
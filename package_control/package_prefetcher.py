@@ -0,0 +1,156 @@
+import os
+import threading
+import tempfile
+import zipfile
+from functools import partial
+
+try:
+    # Python 3
+    from urllib.parse import urlparse
+except (ImportError):
+    # Python 2
+    from urlparse import urlparse
+
+from .console_write import console_write
+from .clear_directory import unlink_or_delete_directory
+from .download_manager import downloader
+from .downloaders.downloader_exception import DownloaderException
+from .worker_pool import WorkerPool
+from . import timing
+
+
+class PackagePrefetcher(threading.Thread):
+
+    """
+    Downloads and verifies the archives for a batch of package installs or
+    upgrades in the background, several at a time. PackageManager.install_package()
+    then only needs to wait for the archive of the package it is working on,
+    while the archives of the following packages keep downloading.
+
+    :param settings:
+        A dict of the PackagesManager settings
+
+    :param releases:
+        A list of 2-element tuples (package name, download URL)
+    """
+
+    def __init__(self, settings, releases):
+        self.settings = settings
+        self.releases = releases
+        self.tmp_dir = tempfile.mkdtemp(u'')
+        self.paths = {}
+        self.events = {}
+        self.lock = threading.Lock()
+        for package_name, url in releases:
+            self.events[package_name] = threading.Event()
+        self.operation = timing.current()
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        workers = self.settings.get('parallel_package_downloads', 4)
+        per_host = self.settings.get('max_concurrent_requests_per_host', 4)
+
+        tasks = []
+        for package_name, url in self.releases:
+            hostname = urlparse(url).hostname
+            tasks.append((hostname, partial(self._fetch, package_name, url)))
+
+        with timing.bind(self.operation):
+            WorkerPool(workers, per_host).run(tasks)
+
+    def _fetch(self, package_name, url):
+        """
+        Downloads and verifies a single archive. Failures are only logged in
+        debug mode since install_package() will retry the download and report
+        the error itself.
+        """
+
+        path = os.path.join(self.tmp_dir, package_name + '.sublime-package')
+        try:
+            with downloader(url, self.settings) as manager:
+                manager.fetch_to_file(url, path, 'Error downloading package.')
+
+            if not self._verify(path):
+                raise DownloaderException(u'The file downloaded from %s is not a valid zip file' % url)
+
+            with self.lock:
+                self.paths[package_name] = (url, path)
+
+        except (DownloaderException, IOError, OSError) as e:
+            if self.settings.get('debug'):
+                console_write(
+                    u'''
+                    Unable to prefetch %s: %s
+                    ''',
+                    (package_name, e)
+                )
+
+        finally:
+            self.events[package_name].set()
+
+    def _verify(self, path):
+        """
+        Checks that a file is a zip file without any entries that would
+        be extracted outside of the package dir
+
+        :param path:
+            The filesystem path to the archive
+
+        :return:
+            A bool if the archive is safe to install from
+        """
+
+        try:
+            package_zip = zipfile.ZipFile(path, 'r')
+        except (zipfile.BadZipfile, IOError, OSError):
+            return False
+        try:
+            names = package_zip.namelist()
+        finally:
+            package_zip.close()
+
+        if not names:
+            return False
+
+        for name in names:
+            if name[0] == '/' or name.find('../') != -1 or name.find('..\\') != -1:
+                return False
+        return True
+
+    def take(self, package_name, url):
+        """
+        Waits for the archive of a package to be ready and hands it over to
+        the caller, who becomes responsible for the file
+
+        :param package_name:
+            The name of the package
+
+        :param url:
+            The URL the caller expects the archive to come from
+
+        :return:
+            The filesystem path to the verified archive, or None if the
+            package was not prefetched or the download failed
+        """
+
+        event = self.events.get(package_name)
+        if event is None:
+            return None
+        event.wait()
+
+        with self.lock:
+            info = self.paths.pop(package_name, None)
+
+        if info is None or info[0] != url:
+            return None
+        return info[1]
+
+    def cleanup(self):
+        """
+        Removes any archives that were not used. The downloads still in
+        progress are waited for so no files are written after the cleanup.
+        """
+
+        self.join()
+        unlink_or_delete_directory(self.tmp_dir)
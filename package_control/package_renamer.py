@@ -6,6 +6,7 @@ import sublime
 
 from .console_write import console_write
 from .package_disabler import PackageDisabler
+from .package_io import close_package_archive
 from .settings import pc_settings_filename, load_list_setting, save_list_setting
 
 
@@ -95,9 +96,11 @@ class PackageRenamer(PackageDisabler):
                     temp_package_path = os.path.join(
                         os.path.dirname(sublime.packages_path()), temp_package_name
                     )
+                    close_package_archive(package_name)
                     os.rename(package_path, temp_package_path)
                     package_path = temp_package_path
 
+                close_package_archive(package_name)
                 os.rename(package_path, new_package_path)
                 installed_packages.append(new_package_name)
 
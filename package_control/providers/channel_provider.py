@@ -1,6 +1,7 @@
 import json
 import os
 import re
+import hashlib
 
 try:
     # Python 3
@@ -12,6 +13,7 @@ except (ImportError):
     str_cls = unicode  # noqa
 
 from .. import text
+from ..catalog import PackageRecord
 from ..console_write import console_write
 from .provider_exception import ProviderException, do_old_new_names_mapping
 from .schema_compat import platforms_to_releases
@@ -162,8 +164,13 @@ class ChannelProvider():
 
         return self.channel_info.get('package_name_map', {})
 
-    def get_renamed_packages(self):
+    def get_renamed_packages(self, repo=None):
         """
+        :param repo:
+            The URL of a repository to only get the renamed packages of. Only
+            used with schema 2.0 and newer, older channels list renames for
+            the whole channel.
+
         :raises:
             ProviderException: when an error occurs with the channel contents
             DownloaderException: when an error occurs trying to open a URL
@@ -179,7 +186,12 @@ class ChannelProvider():
 
             if 'packages_cache' in self.channel_info:
 
-                for repo in self.channel_info['packages_cache']:
+                repos = self.channel_info['packages_cache']
+                if repo is not None:
+                    repo = update_url(repo, self.settings.get('debug'))
+                    repos = [repo] if repo in repos else []
+
+                for repo in repos:
                     repositories = self.channel_info['packages_cache'][repo]
 
                     for package in repositories:
@@ -252,6 +264,34 @@ class ChannelProvider():
 
         return self.get_repositories()
 
+    def get_repository_digest(self, repo):
+        """
+        Creates a digest of the package and dependency info cached in the
+        channel for a repository, so a refresh can tell which repositories
+        changed since the info was last processed
+
+        :param repo:
+            The URL of the repository to get the digest of
+
+        :raises:
+            ProviderException: when an error occurs with the channel contents
+            DownloaderException: when an error occurs trying to open a URL
+
+        :return:
+            A unicode string hex digest
+        """
+
+        self.fetch()
+
+        repo = update_url(repo, self.settings.get('debug'))
+
+        packages_key = 'packages_cache' if self.schema_major_version >= 2 else 'packages'
+        packages = self.channel_info.get(packages_key) or {}
+        dependencies = self.channel_info.get('dependencies_cache') or {}
+
+        block = [self.schema_version, packages.get(repo), dependencies.get(repo)]
+        return hashlib.sha1(json.dumps(block, sort_keys=True).encode('utf-8')).hexdigest()
+
     def get_packages(self, repo):
         """
         Provides access to the repository info that is cached in a channel
@@ -308,7 +348,7 @@ class ChannelProvider():
 
         output = {}
         for package in self.channel_info[packages_key][repo]:
-            copy = package.copy()
+            copy = PackageRecord(package)
 
             # In schema version 2.0, we store a list of dicts containing info
             # about all available releases. These include "version" and
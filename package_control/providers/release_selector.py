@@ -1,78 +1,70 @@
 import re
 import sublime
 
-from ..versions import version_exclude_prerelease
+from .. import timing
+from ..versions import version_is_prerelease
 
 
-def filter_releases(package, settings, releases):
-    """
-    Returns all releases in the list of releases that are compatible with
-    the current platform and version of Sublime Text
+_gt_regex = re.compile(r'>(\d+)$')
+_ge_regex = re.compile(r'>=(\d+)$')
+_lt_regex = re.compile(r'<(\d+)$')
+_le_regex = re.compile(r'<=(\d+)$')
+_range_regex = re.compile(r'(\d+) - (\d+)$')
 
-    :param package:
-        The name of the package
+# Selector string -> VersionRange, or None if the selector is invalid
+_version_ranges = {}
 
-    :param settings:
-        A dict optionally containing the `install_prereleases` key
 
-    :param releases:
-        A list of release dicts
+class VersionRange(object):
 
-    :return:
-        A list of release dicts
+    """
+    A compiled Sublime Text version selector, such as ">3000", "<=3999" or
+    "3000 - 3999"
     """
 
-    platform_selectors = [
-        sublime.platform() + '-' + sublime.arch(),
-        sublime.platform(),
-        '*'
-    ]
+    def __init__(self, min_version, max_version):
+        self.min_version = min_version
+        self.max_version = max_version
 
-    install_prereleases = settings.get('install_prereleases')
-    allow_prereleases = install_prereleases is True
-    if not allow_prereleases and isinstance(install_prereleases, list) and package in install_prereleases:
-        allow_prereleases = True
+    def matches(self, version):
+        """
+        :param version:
+            An integer Sublime Text build number
 
-    if not allow_prereleases:
-        releases = version_exclude_prerelease(releases)
+        :return:
+            If the build is within the range
+        """
 
-    output = []
-    for release in releases:
-        platforms = release.get('platforms', '*')
-        if not isinstance(platforms, list):
-            platforms = [platforms]
+        return self.min_version <= version <= self.max_version
 
-        matched = False
-        for selector in platform_selectors:
-            if selector in platforms:
-                matched = True
-                break
-        if not matched:
-            continue
 
-        # Default to '*' (for legacy reasons), see #604
-        if not is_compatible_version(release.get('sublime_text', '*')):
-            continue
+def compile_version_range(version_range):
+    """
+    Parses a Sublime Text version selector, caching the result so each
+    distinct selector string is only parsed once
 
-        output.append(release)
+    :param version_range:
+        A selector string, such as "*", ">3000" or "3000 - 3999"
 
-    return output
+    :return:
+        A VersionRange object, or None if the selector is invalid
+    """
 
+    if version_range in _version_ranges:
+        return _version_ranges[version_range]
 
-def is_compatible_version(version_range):
     min_version = float("-inf")
     max_version = float("inf")
 
-    if version_range == '*':
-        return True
-
-    gt_match = re.match(r'>(\d+)$', version_range)
-    ge_match = re.match(r'>=(\d+)$', version_range)
-    lt_match = re.match(r'<(\d+)$', version_range)
-    le_match = re.match(r'<=(\d+)$', version_range)
-    range_match = re.match(r'(\d+) - (\d+)$', version_range)
+    gt_match = _gt_regex.match(version_range)
+    ge_match = _ge_regex.match(version_range)
+    lt_match = _lt_regex.match(version_range)
+    le_match = _le_regex.match(version_range)
+    range_match = _range_regex.match(version_range)
 
-    if gt_match:
+    if version_range == '*':
+        pass
+    elif gt_match:
         min_version = int(gt_match.group(1)) + 1
     elif ge_match:
         min_version = int(ge_match.group(1))
@@ -84,11 +76,122 @@ def is_compatible_version(version_range):
         min_version = int(range_match.group(1))
         max_version = int(range_match.group(2))
     else:
+        _version_ranges[version_range] = None
         return None
 
-    if min_version > int(sublime.version()):
-        return False
-    if max_version < int(sublime.version()):
-        return False
+    compiled = VersionRange(min_version, max_version)
+    _version_ranges[version_range] = compiled
+    return compiled
+
+
+class ReleaseSelector(object):
+
+    """
+    Filters releases down to the ones compatible with the current platform
+    and version of Sublime Text. The platform and version are read a single
+    time, so a whole channel can be filtered without calling into Sublime
+    Text for each release.
+
+    :param settings:
+        A dict optionally containing the `install_prereleases` key, and the
+        `platform`, `arch` and `version` keys set by PackageManager
+    """
+
+    def __init__(self, settings):
+        self.install_prereleases = settings.get('install_prereleases')
+
+        platform = settings.get('platform') or sublime.platform()
+        arch = settings.get('arch') or sublime.arch()
+        self.platform_selectors = set([platform + '-' + arch, platform, '*'])
+        self.st_version = int(settings.get('version') or sublime.version())
+
+    def allows_prereleases(self, package):
+        if self.install_prereleases is True:
+            return True
+        return isinstance(self.install_prereleases, list) and package in self.install_prereleases
+
+    def filter(self, package, releases):
+        """
+        :param package:
+            The name of the package
+
+        :param releases:
+            A list of release dicts
+
+        :return:
+            A list of release dicts
+        """
+
+        span = timing.span('filter_releases')
+        allow_prereleases = self.allows_prereleases(package)
+        platform_selectors = self.platform_selectors
+        st_version = self.st_version
+
+        output = []
+        for release in releases:
+            platforms = release.get('platforms', '*')
+            if isinstance(platforms, (list, tuple)):
+                if platform_selectors.isdisjoint(platforms):
+                    continue
+            elif platforms not in platform_selectors:
+                continue
 
-    return True
+            # Default to '*' (for legacy reasons), see #604
+            version_range = compile_version_range(release.get('sublime_text', '*'))
+            if version_range is None or not version_range.matches(st_version):
+                continue
+
+            if not allow_prereleases and version_is_prerelease(release):
+                continue
+
+            output.append(release)
+
+        span.end()
+        return output
+
+
+def filter_releases(package, settings, releases, selector=None):
+    """
+    Returns all releases in the list of releases that are compatible with
+    the current platform and version of Sublime Text
+
+    :param package:
+        The name of the package
+
+    :param settings:
+        A dict optionally containing the `install_prereleases` key
+
+    :param releases:
+        A list of release dicts
+
+    :param selector:
+        A ReleaseSelector to reuse across calls, one is created from the
+        settings if not provided
+
+    :return:
+        A list of release dicts
+    """
+
+    if selector is None:
+        selector = ReleaseSelector(settings)
+    return selector.filter(package, releases)
+
+
+def is_compatible_version(version_range, st_version=None):
+    """
+    :param version_range:
+        A Sublime Text version selector, such as "*", ">3000" or "3000 - 3999"
+
+    :param st_version:
+        The integer Sublime Text build to check, defaults to the running one
+
+    :return:
+        True if compatible, False if not, or None if the selector is invalid
+    """
+
+    compiled = compile_version_range(version_range)
+    if compiled is None:
+        return None
+    if st_version is None:
+        st_version = int(sublime.version())
+    return compiled.matches(st_version)
@@ -2,6 +2,7 @@ import json
 import re
 import os
 from itertools import chain
+from functools import partial
 
 try:
     # Python 3
@@ -22,6 +23,11 @@ from ..clients.github_client import GitHubClient
 from ..clients.bitbucket_client import BitBucketClient
 from ..download_manager import downloader, update_url
 from ..versions import version_sort
+from ..worker_pool import WorkerPool
+
+
+# The most threads used to resolve "details" URLs for a single repository
+MAX_DETAILS_WORKERS = 16
 
 
 class RepositoryProvider():
@@ -553,8 +559,6 @@ class RepositoryProvider():
         if not self.fetch_and_validate():
             return
 
-        debug = self.settings.get('debug')
-
         github_client = GitHubClient(self.settings)
         bitbucket_client = BitBucketClient(self.settings)
 
@@ -568,311 +572,403 @@ class RepositoryProvider():
                     previous_names[new_name] = []
                 previous_names[new_name].append(old_name)
 
-        output = {}
+        per_host = self.settings.get('max_concurrent_requests_per_host', 4)
+        tasks = []
+        hosts = set()
         for package in self.repo_info['packages']:
-            info = {
-                'sources': [self.repo]
-            }
+            host = self._package_host(package)
+            hosts.add(host)
+            tasks.append((host, partial(
+                self._package_info,
+                package,
+                github_client,
+                bitbucket_client,
+                previous_names,
+                invalid_sources
+            )))
+
+        # Most "details" lookups go to the same API host, so the number of
+        # threads is bounded by the per-host limit rather than the package count
+        pool = WorkerPool(min(MAX_DETAILS_WORKERS, per_host * len(hosts)), per_host)
+        results = pool.run(tasks)
 
-            copy_fields = [
-                'name',
-                'description',
-                'author',
-                'last_modified',
-                'previous_names',
-                'labels',
-                'homepage',
-                'readme',
-                'issues',
-                'donate',
-                'buy'
-            ]
-            for field in copy_fields:
-                if package.get(field):
-                    info[field] = package.get(field)
-
-            # Schema version 2.0 allows for grabbing details about a package, or its
-            # download from "details" urls. See the GitHubClient and BitBucketClient
-            # classes for valid URLs.
-            if self.schema_major_version >= 2:
-                details = package.get('details')
-                releases = package.get('releases')
+        output = {}
+        for info, broken_packages, failed_sources in results:
+            # Merging in the original order keeps the same "last error wins"
+            # behavior as processing the packages one at a time
+            self.broken_packages.update(broken_packages)
+            self.failed_sources.update(failed_sources)
 
-                # Try to grab package-level details from GitHub or BitBucket
-                if details:
-                    if invalid_sources is not None and details in invalid_sources:
-                        continue
+            if info is None or info['name'] in self.broken_packages:
+                continue
 
-                    info['sources'].append(details)
+            output[info['name']] = info
+            yield (info['name'], info)
 
-                    try:
-                        github_repo_info = github_client.repo_info(details)
-                        bitbucket_repo_info = bitbucket_client.repo_info(details)
-
-                        # When grabbing details, prefer explicit field values over the values
-                        # from the GitHub or BitBucket API
-                        if github_repo_info:
-                            info = dict(chain(github_repo_info.items(), info.items()))
-                        elif bitbucket_repo_info:
-                            info = dict(chain(bitbucket_repo_info.items(), info.items()))
-                        else:
-                            raise ProviderException(text.format(
-                                u'''
-                                Invalid "details" value "%s" for one of the packages in the repository %s.
-                                ''',
-                                (details, self.repo)
-                            ))
+        self.cache['get_packages'] = output
 
-                    except (DownloaderException, ClientException, ProviderException) as e:
-                        if 'name' in info:
-                            self.broken_packages[info['name']] = e
-                        self.failed_sources[details] = e
-                        continue
+    def _package_info(self, package, github_client, bitbucket_client, previous_names, invalid_sources):
+        """
+        Builds the info for a single package entry from the repository,
+        resolving any "details" URLs through the GitHub or BitBucket APIs.
+        Errors are collected in dicts local to the call, rather than on the
+        provider, so that multiple packages may be processed concurrently.
 
-            if 'name' not in info:
-                self.failed_sources[self.repo] = ProviderException(text.format(
-                    u'''
-                    No "name" value for one of the packages in the repository %s.
-                    ''',
-                    self.repo
-                ))
-                continue
+        :param package:
+            A dict of the package entry from the repository JSON
 
-            info['releases'] = []
-            if self.schema_major_version == 2:
-                # If no releases info was specified, also grab the download info from GH or BB
-                if not releases and details:
-                    releases = [{'details': details}]
-
-            if self.schema_major_version >= 2:
-                if not releases:
-                    e = ProviderException(text.format(
-                        u'''
-                        No "releases" value for the package "%s" in the repository %s.
-                        ''',
-                        (info['name'], self.repo)
-                    ))
-                    self.broken_packages[info['name']] = e
-                    continue
-
-                if not isinstance(releases, list):
-                    e = ProviderException(text.format(
-                        u'''
-                        The "releases" value is not an array or the package "%s" in the repository %s.
-                        ''',
-                        (info['name'], self.repo)
-                    ))
-                    self.broken_packages[info['name']] = e
-                    continue
-
-                # This allows developers to specify a GH or BB location to get releases from,
-                # especially tags URLs (https://github.com/user/repo/tags or
-                # https://bitbucket.org/user/repo#tags)
-                for release in releases:
-                    download_details = None
-                    download_info = {}
-
-                    # Make sure that explicit fields are copied over
-                    for field in ['platforms', 'sublime_text', 'version', 'url', 'date', 'dependencies']:
-                        if field in release:
-                            value = release[field]
-                            if field == 'url':
-                                value = update_url(value, debug)
-                            if field == 'platforms' and not isinstance(release['platforms'], list):
-                                value = [value]
-                            download_info[field] = value
-
-                    if 'platforms' not in download_info:
-                        download_info['platforms'] = ['*']
-
-                    if self.schema_major_version == 2:
-                        if 'sublime_text' not in download_info:
-                            download_info['sublime_text'] = '<3000'
-
-                        if 'details' in release:
-                            download_details = release['details']
-
-                            try:
-                                github_downloads = github_client.download_info(download_details)
-                                bitbucket_downloads = bitbucket_client.download_info(download_details)
-
-                                if github_downloads is False or bitbucket_downloads is False:
-                                    raise ProviderException(text.format(
-                                        u'''
-                                        No valid semver tags found at %s for the package "%s" in the repository %s.
-                                        ''',
-                                        (download_details, info['name'], self.repo)
-                                    ))
-
-                                if github_downloads:
-                                    downloads = github_downloads
-                                elif bitbucket_downloads:
-                                    downloads = bitbucket_downloads
-                                else:
-                                    raise ProviderException(text.format(
-                                        u'''
-                                        Invalid "details" value "%s" under the "releases" key
-                                        for the package "%s" in the repository %s.
-                                        ''',
-                                        (download_details, info['name'], self.repo)
-                                    ))
-
-                                for download in downloads:
-                                    new_download = download_info.copy()
-                                    new_download.update(download)
-                                    info['releases'].append(new_download)
-
-                            except (DownloaderException, ClientException, ProviderException) as e:
-                                self.broken_packages[info['name']] = e
-
-                        elif download_info:
-                            info['releases'].append(download_info)
-
-                    elif self.schema_major_version == 3:
-                        tags = release.get('tags')
-                        branch = release.get('branch')
-
-                        if tags or branch:
-                            try:
-                                base = None
-                                if 'base' in release:
-                                    base = release['base']
-                                elif details:
-                                    base = details
-
-                                if not base:
-                                    raise ProviderException(text.format(
-                                        u'''
-                                        Missing root-level "details" key, or release-level "base" key
-                                        for one of the releases of the package "%s" in the repository %s.
-                                        ''',
-                                        (info['name'], self.repo)
-                                    ))
-
-                                github_url = False
-                                bitbucket_url = False
-                                extra = None
-
-                                if tags:
-                                    github_url = github_client.make_tags_url(base)
-                                    bitbucket_url = bitbucket_client.make_tags_url(base)
-                                    if tags is not True:
-                                        extra = tags
-
-                                if branch:
-                                    github_url = github_client.make_branch_url(base, branch)
-                                    bitbucket_url = bitbucket_client.make_branch_url(base, branch)
-
-                                if github_url:
-                                    downloads = github_client.download_info(github_url, extra)
-                                    url = github_url
-                                elif bitbucket_url:
-                                    downloads = bitbucket_client.download_info(bitbucket_url, extra)
-                                    url = bitbucket_url
-                                else:
-                                    raise ProviderException(text.format(
-                                        u'''
-                                        Invalid "base" value "%s" for one of the releases of the
-                                        package "%s" in the repository %s.
-                                        ''',
-                                        (base, info['name'], self.repo)
-                                    ))
-
-                                if downloads is False:
-                                    raise ProviderException(text.format(
-                                        u'''
-                                        No valid semver tags found at %s for the
-                                        package "%s" in the repository %s.
-                                        ''',
-                                        (url, info['name'], self.repo)
-                                    ))
-
-                                for download in downloads:
-                                    new_download = download_info.copy()
-                                    new_download.update(download)
-                                    info['releases'].append(new_download)
-
-                            except (DownloaderException, ClientException, ProviderException) as e:
-                                self.broken_packages[info['name']] = e
-                                continue
-                        elif download_info:
-                            info['releases'].append(download_info)
-
-            # Schema version 1.0, 1.1 and 1.2 just require that all values be
-            # explicitly specified in the package JSON
-            else:
-                info['releases'] = platforms_to_releases(package, debug)
+        :param github_client:
+            A GitHubClient object
 
-            info['releases'] = version_sort(info['releases'], 'platforms', reverse=True)
+        :param bitbucket_client:
+            A BitBucketClient object
 
-            if info['name'] in self.broken_packages:
-                continue
+        :param previous_names:
+            A dict of new package name to a list of old names, for old schemas
+
+        :param invalid_sources:
+            A list of URLs that are not permissible to fetch data from
+
+        :return:
+            A 3-element tuple of (info dict or None, broken packages dict,
+            failed sources dict)
+        """
+
+        debug = self.settings.get('debug')
+        broken_packages = {}
+        failed_sources = {}
+
+        info = {
+            'sources': [self.repo]
+        }
+
+        copy_fields = [
+            'name',
+            'description',
+            'author',
+            'last_modified',
+            'previous_names',
+            'labels',
+            'homepage',
+            'readme',
+            'issues',
+            'donate',
+            'buy'
+        ]
+        for field in copy_fields:
+            if package.get(field):
+                info[field] = package.get(field)
+
+        # Schema version 2.0 allows for grabbing details about a package, or its
+        # download from "details" urls. See the GitHubClient and BitBucketClient
+        # classes for valid URLs.
+        if self.schema_major_version >= 2:
+            details = package.get('details')
+            releases = package.get('releases')
+
+            # Try to grab package-level details from GitHub or BitBucket
+            if details:
+                if invalid_sources is not None and details in invalid_sources:
+                    return (None, broken_packages, failed_sources)
+
+                info['sources'].append(details)
+
+                try:
+                    github_repo_info = github_client.repo_info(details)
+                    bitbucket_repo_info = bitbucket_client.repo_info(details)
+
+                    # When grabbing details, prefer explicit field values over the values
+                    # from the GitHub or BitBucket API
+                    if github_repo_info:
+                        info = dict(chain(github_repo_info.items(), info.items()))
+                    elif bitbucket_repo_info:
+                        info = dict(chain(bitbucket_repo_info.items(), info.items()))
+                    else:
+                        raise ProviderException(text.format(
+                            u'''
+                            Invalid "details" value "%s" for one of the packages in the repository %s.
+                            ''',
+                            (details, self.repo)
+                        ))
+
+                except (DownloaderException, ClientException, ProviderException) as e:
+                    if 'name' in info:
+                        broken_packages[info['name']] = e
+                    failed_sources[details] = e
+                    return (None, broken_packages, failed_sources)
+
+        if 'name' not in info:
+            failed_sources[self.repo] = ProviderException(text.format(
+                u'''
+                No "name" value for one of the packages in the repository %s.
+                ''',
+                self.repo
+            ))
+            return (None, broken_packages, failed_sources)
+
+        info['releases'] = []
+        if self.schema_major_version == 2:
+            # If no releases info was specified, also grab the download info from GH or BB
+            if not releases and details:
+                releases = [{'details': details}]
 
-            if 'author' not in info:
-                self.broken_packages[info['name']] = ProviderException(text.format(
+        if self.schema_major_version >= 2:
+            if not releases:
+                e = ProviderException(text.format(
                     u'''
-                    No "author" key for the package "%s" in the repository %s.
+                    No "releases" value for the package "%s" in the repository %s.
                     ''',
                     (info['name'], self.repo)
                 ))
-                continue
+                broken_packages[info['name']] = e
+                return (None, broken_packages, failed_sources)
 
-            if 'releases' not in info:
-                self.broken_packages[info['name']] = ProviderException(text.format(
+            if not isinstance(releases, list):
+                e = ProviderException(text.format(
                     u'''
-                    No "releases" key for the package "%s" in the repository %s.
+                    The "releases" value is not an array or the package "%s" in the repository %s.
                     ''',
                     (info['name'], self.repo)
                 ))
-                continue
+                broken_packages[info['name']] = e
+                return (None, broken_packages, failed_sources)
 
-            # Make sure all releases have the appropriate keys. We use a
-            # function here so that we can break out of multiple loops.
-            def has_broken_release():
-                for release in info.get('releases', []):
-                    for key in ['version', 'date', 'url', 'sublime_text', 'platforms']:
-                        if key not in release:
-                            self.broken_packages[info['name']] = ProviderException(text.format(
-                                u'''
-                                Missing "%s" key for one of the releases of the package "%s" in the repository %s.
-                                ''',
-                                (key, info['name'], self.repo)
-                            ))
-                            return True
-                return False
+            # This allows developers to specify a GH or BB location to get releases from,
+            # especially tags URLs (https://github.com/user/repo/tags or
+            # https://bitbucket.org/user/repo#tags)
+            for release in releases:
+                download_details = None
+                download_info = {}
 
-            if has_broken_release():
-                continue
+                # Make sure that explicit fields are copied over
+                for field in ['platforms', 'sublime_text', 'version', 'url', 'date', 'dependencies']:
+                    if field in release:
+                        value = release[field]
+                        if field == 'url':
+                            value = update_url(value, debug)
+                        if field == 'platforms' and not isinstance(release['platforms'], list):
+                            value = [value]
+                        download_info[field] = value
 
-            for field in ['previous_names', 'labels']:
-                if field not in info:
-                    info[field] = []
+                if 'platforms' not in download_info:
+                    download_info['platforms'] = ['*']
 
-            if 'readme' in info:
-                info['readme'] = update_url(info['readme'], debug)
+                if self.schema_major_version == 2:
+                    if 'sublime_text' not in download_info:
+                        download_info['sublime_text'] = '<3000'
+
+                    if 'details' in release:
+                        download_details = release['details']
+
+                        try:
+                            github_downloads = github_client.download_info(download_details)
+                            bitbucket_downloads = bitbucket_client.download_info(download_details)
+
+                            if github_downloads is False or bitbucket_downloads is False:
+                                raise ProviderException(text.format(
+                                    u'''
+                                    No valid semver tags found at %s for the package "%s" in the repository %s.
+                                    ''',
+                                    (download_details, info['name'], self.repo)
+                                ))
+
+                            if github_downloads:
+                                downloads = github_downloads
+                            elif bitbucket_downloads:
+                                downloads = bitbucket_downloads
+                            else:
+                                raise ProviderException(text.format(
+                                    u'''
+                                    Invalid "details" value "%s" under the "releases" key
+                                    for the package "%s" in the repository %s.
+                                    ''',
+                                    (download_details, info['name'], self.repo)
+                                ))
+
+                            for download in downloads:
+                                new_download = download_info.copy()
+                                new_download.update(download)
+                                info['releases'].append(new_download)
+
+                        except (DownloaderException, ClientException, ProviderException) as e:
+                            broken_packages[info['name']] = e
+
+                    elif download_info:
+                        info['releases'].append(download_info)
+
+                elif self.schema_major_version == 3:
+                    tags = release.get('tags')
+                    branch = release.get('branch')
+
+                    if tags or branch:
+                        try:
+                            base = None
+                            if 'base' in release:
+                                base = release['base']
+                            elif details:
+                                base = details
+
+                            if not base:
+                                raise ProviderException(text.format(
+                                    u'''
+                                    Missing root-level "details" key, or release-level "base" key
+                                    for one of the releases of the package "%s" in the repository %s.
+                                    ''',
+                                    (info['name'], self.repo)
+                                ))
+
+                            github_url = False
+                            bitbucket_url = False
+                            extra = None
+
+                            if tags:
+                                github_url = github_client.make_tags_url(base)
+                                bitbucket_url = bitbucket_client.make_tags_url(base)
+                                if tags is not True:
+                                    extra = tags
+
+                            if branch:
+                                github_url = github_client.make_branch_url(base, branch)
+                                bitbucket_url = bitbucket_client.make_branch_url(base, branch)
+
+                            if github_url:
+                                downloads = github_client.download_info(github_url, extra)
+                                url = github_url
+                            elif bitbucket_url:
+                                downloads = bitbucket_client.download_info(bitbucket_url, extra)
+                                url = bitbucket_url
+                            else:
+                                raise ProviderException(text.format(
+                                    u'''
+                                    Invalid "base" value "%s" for one of the releases of the
+                                    package "%s" in the repository %s.
+                                    ''',
+                                    (base, info['name'], self.repo)
+                                ))
+
+                            if downloads is False:
+                                raise ProviderException(text.format(
+                                    u'''
+                                    No valid semver tags found at %s for the
+                                    package "%s" in the repository %s.
+                                    ''',
+                                    (url, info['name'], self.repo)
+                                ))
+
+                            for download in downloads:
+                                new_download = download_info.copy()
+                                new_download.update(download)
+                                info['releases'].append(new_download)
+
+                        except (DownloaderException, ClientException, ProviderException) as e:
+                            broken_packages[info['name']] = e
+                            continue
+                    elif download_info:
+                        info['releases'].append(download_info)
 
-            for field in ['description', 'readme', 'issues', 'donate', 'buy']:
-                if field not in info:
-                    info[field] = None
+        # Schema version 1.0, 1.1 and 1.2 just require that all values be
+        # explicitly specified in the package JSON
+        else:
+            info['releases'] = platforms_to_releases(package, debug)
 
-            if 'homepage' not in info:
-                info['homepage'] = self.repo
+        info['releases'] = version_sort(info['releases'], 'platforms', reverse=True)
 
-            if 'releases' in info and 'last_modified' not in info:
-                # Extract a date from the newest release
-                date = '1970-01-01 00:00:00'
-                for release in info['releases']:
-                    if 'date' in release and release['date'] > date:
-                        date = release['date']
-                info['last_modified'] = date
+        if info['name'] in broken_packages:
+            return (None, broken_packages, failed_sources)
 
-            if info['name'] in previous_names:
-                info['previous_names'].extend(previous_names[info['name']])
+        if 'author' not in info:
+            broken_packages[info['name']] = ProviderException(text.format(
+                u'''
+                No "author" key for the package "%s" in the repository %s.
+                ''',
+                (info['name'], self.repo)
+            ))
+            return (None, broken_packages, failed_sources)
 
-            output[info['name']] = info
-            yield (info['name'], info)
+        if 'releases' not in info:
+            broken_packages[info['name']] = ProviderException(text.format(
+                u'''
+                No "releases" key for the package "%s" in the repository %s.
+                ''',
+                (info['name'], self.repo)
+            ))
+            return (None, broken_packages, failed_sources)
+
+        # Make sure all releases have the appropriate keys. We use a
+        # function here so that we can break out of multiple loops.
+        def has_broken_release():
+            for release in info.get('releases', []):
+                for key in ['version', 'date', 'url', 'sublime_text', 'platforms']:
+                    if key not in release:
+                        broken_packages[info['name']] = ProviderException(text.format(
+                            u'''
+                            Missing "%s" key for one of the releases of the package "%s" in the repository %s.
+                            ''',
+                            (key, info['name'], self.repo)
+                        ))
+                        return True
+            return False
 
-        self.cache['get_packages'] = output
+        if has_broken_release():
+            return (None, broken_packages, failed_sources)
+
+        for field in ['previous_names', 'labels']:
+            if field not in info:
+                info[field] = []
+
+        if 'readme' in info:
+            info['readme'] = update_url(info['readme'], debug)
+
+        for field in ['description', 'readme', 'issues', 'donate', 'buy']:
+            if field not in info:
+                info[field] = None
+
+        if 'homepage' not in info:
+            info['homepage'] = self.repo
+
+        if 'releases' in info and 'last_modified' not in info:
+            # Extract a date from the newest release
+            date = '1970-01-01 00:00:00'
+            for release in info['releases']:
+                if 'date' in release and release['date'] > date:
+                    date = release['date']
+            info['last_modified'] = date
+
+        if info['name'] in previous_names:
+            info['previous_names'].extend(previous_names[info['name']])
+
+        return (info, broken_packages, failed_sources)
+
+    def _package_host(self, package):
+        """
+        Determines the hostname the "details" lookups for a package entry go to
+
+        :param package:
+            A dict of the package entry from the repository JSON
+
+        :return:
+            A lowercase hostname, or None if the package needs no lookups
+        """
+
+        if self.schema_major_version < 2:
+            return None
+
+        url = package.get('details')
+        if not url:
+            releases = package.get('releases')
+            if isinstance(releases, list):
+                for release in releases:
+                    if not isinstance(release, dict):
+                        continue
+                    url = release.get('details') or release.get('base')
+                    if url:
+                        break
+
+        if not url:
+            return None
+
+        hostname = urlparse(url).hostname
+        return hostname.lower() if hostname else None
 
     def get_sources(self):
         """
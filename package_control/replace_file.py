@@ -0,0 +1,47 @@
+import os
+import sys
+
+try:
+    str_cls = unicode
+except (NameError):
+    str_cls = str
+
+
+# Flags for MoveFileEx() on Windows
+MOVEFILE_REPLACE_EXISTING = 0x1
+MOVEFILE_WRITE_THROUGH = 0x8
+
+
+def replace_file(src, dest):
+    """
+    Renames a file, atomically overwriting the destination, so readers see
+    either the old or the new file, never no file at all
+
+    :param src:
+        The filesystem path of the file to rename, such as a temporary file
+        that was just written
+
+    :param dest:
+        The filesystem path to rename it to
+
+    :raises:
+        OSError: when the file could not be renamed
+    """
+
+    # Python 3.3+
+    if hasattr(os, 'replace'):
+        os.replace(src, dest)
+        return
+
+    # os.rename() will not overwrite an existing file on Windows, so Python 2
+    # calls MoveFileEx() directly
+    if sys.platform == 'win32':
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        move = kernel32.MoveFileExW if isinstance(src, str_cls) else kernel32.MoveFileExA
+        if not move(src, dest, MOVEFILE_REPLACE_EXISTING | MOVEFILE_WRITE_THROUGH):
+            raise OSError(ctypes.GetLastError(), 'Unable to rename %s to %s' % (src, dest))
+        return
+
+    os.rename(src, dest)
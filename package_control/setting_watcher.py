@@ -0,0 +1,124 @@
+import time
+import threading
+
+from .settings import run_on_main_thread
+
+
+class SettingWatcher(object):
+
+    """
+    Confirms that a setting holds an expected value, waking up on the
+    add_on_change() notifications of a sublime.Settings object instead of
+    sleeping for a fixed amount of time.
+
+    A value is confirmed once it matches and no change notification arrives
+    during a quiet period. Every time the settings change during that period
+    the quiet period is doubled, up to max_wait, so a busy settings object is
+    watched for longer than an idle one.
+
+    The times spent waiting are kept in the `waits` list, the number of writes
+    in `writes` and the total time in `elapsed`, so the timing can be checked.
+
+    :param settings:
+        A sublime.Settings object, or any object with get(), add_on_change()
+        and clear_on_change() methods
+
+    :param setting_name:
+        The name of the setting to watch
+
+    :param initial_wait:
+        The first quiet period, in seconds
+
+    :param max_wait:
+        The longest quiet period, in seconds
+
+    :param write_interval:
+        The minimum number of seconds between two writes of the setting
+
+    :param run_on_main:
+        A callable to run a callback on the main thread and wait for it
+    """
+
+    def __init__(self, settings, setting_name, initial_wait=0.1, max_wait=3.7, write_interval=3.7,
+            run_on_main=run_on_main_thread):
+        self.settings = settings
+        self.setting_name = setting_name
+        self.initial_wait = initial_wait
+        self.max_wait = max_wait
+        self.write_interval = write_interval
+        self.run_on_main = run_on_main
+
+        self.key = 'setting_watcher_%s' % id(self)
+        self.changed = threading.Event()
+
+        self.waits = []
+        self.writes = 0
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self.run_on_main(lambda: self.settings.add_on_change(self.key, self.changed.set))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.run_on_main(lambda: self.settings.clear_on_change(self.key))
+
+    def confirm(self, matches, write=None, max_writes=27, timeout=None):
+        """
+        Waits until the setting matches, and keeps matching for a quiet period
+
+        :param matches:
+            A callable that receives the setting value and returns a bool
+
+        :param write:
+            An optional callable to set the setting, which is run on the main
+            thread when the value does not match. It is not called if the
+            value already matches.
+
+        :param max_writes:
+            The maximum number of times to call write
+
+        :param timeout:
+            The maximum number of seconds to wait for when there is no write
+            callable, defaults to max_wait
+
+        :return:
+            A bool if the setting was confirmed
+        """
+
+        if timeout is None:
+            timeout = self.max_wait
+
+        start = time.time()
+        last_write = None
+        wait = self.initial_wait
+
+        try:
+            while True:
+                self.changed.clear()
+
+                if not matches(self.settings.get(self.setting_name)):
+                    if write is None:
+                        if time.time() - start >= timeout:
+                            return False
+
+                    elif last_write is None or time.time() - last_write >= self.write_interval:
+                        if self.writes >= max_writes:
+                            return False
+                        self.run_on_main(write)
+                        self.writes += 1
+                        last_write = time.time()
+                        continue
+
+                wait_start = time.time()
+                notified = self.changed.wait(wait)
+                self.waits.append(time.time() - wait_start)
+
+                if notified:
+                    wait = min(wait * 2, self.max_wait)
+
+                # No change was reported during the quiet period
+                elif matches(self.settings.get(self.setting_name)):
+                    return True
+
+        finally:
+            self.elapsed += time.time() - start
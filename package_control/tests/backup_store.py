@@ -0,0 +1,57 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from ..backup_store import BackupStore
+
+
+class BackupStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.package_dir = os.path.join(self.tmp_dir, 'Packages', 'Example')
+        os.makedirs(self.package_dir)
+        self.store = BackupStore(os.path.join(self.tmp_dir, 'Backup'), 2, 1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, contents):
+        with open(os.path.join(self.package_dir, 'plugin.py'), 'w') as f:
+            f.write(contents)
+        # Make sure the modification time differs from the previous snapshot
+        mtime = time.time() + len(self.store.snapshots())
+        os.utime(os.path.join(self.package_dir, 'plugin.py'), (mtime, mtime))
+
+    def read(self):
+        with open(os.path.join(self.package_dir, 'plugin.py'), 'r') as f:
+            return f.read()
+
+    def test_unchanged_package_is_not_snapshotted_again(self):
+        self.write('one')
+        self.assertNotEqual(None, self.store.add('Example', self.package_dir))
+        self.assertEqual(None, self.store.add('Example', self.package_dir))
+        self.assertEqual(1, len(self.store.snapshots('Example')))
+
+    def test_prune_keeps_max_count(self):
+        for contents in ['one', 'two', 'three']:
+            self.write(contents)
+            self.store.add('Example', self.package_dir)
+        self.assertEqual(2, len(self.store.snapshots('Example')))
+
+    def test_restore_oldest_snapshot_at_max_count(self):
+        self.write('one')
+        oldest = self.store.add('Example', self.package_dir)
+        self.write('two')
+        self.store.add('Example', self.package_dir)
+        self.write('three')
+
+        # The current files are backed up before restoring, as the restore
+        # command does, which must not prune the snapshot being restored
+        self.store.add('Example', self.package_dir, keep=[oldest])
+        self.store.restore(oldest, self.package_dir)
+
+        self.assertEqual('one', self.read())
+        self.assertTrue(os.path.isdir(self.store.snapshot_path(oldest)))
@@ -0,0 +1,91 @@
+import time
+import threading
+import unittest
+
+from ..setting_watcher import SettingWatcher
+
+
+def run_inline(callback):
+    callback()
+
+
+class FakeSettings():
+    def __init__(self, values=None):
+        self.values = values or {}
+        self.callbacks = {}
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def set(self, name, value):
+        self.values[name] = value
+        for callback in list(self.callbacks.values()):
+            callback()
+
+    def add_on_change(self, key, callback):
+        self.callbacks[key] = callback
+
+    def clear_on_change(self, key):
+        self.callbacks.pop(key, None)
+
+
+class SettingWatcherTests(unittest.TestCase):
+
+    def watcher(self, settings):
+        return SettingWatcher(settings, 'ignored_packages', initial_wait=0.05, max_wait=0.4,
+            write_interval=0.2, run_on_main=run_inline)
+
+    def test_confirms_after_one_quiet_period(self):
+        settings = FakeSettings({'ignored_packages': ['A']})
+        with self.watcher(settings) as watcher:
+            self.assertTrue(watcher.confirm(lambda value: value == ['A']))
+        self.assertEqual([], list(settings.callbacks.keys()))
+        self.assertEqual(0, watcher.writes)
+        self.assertEqual(1, len(watcher.waits))
+        self.assertLess(watcher.elapsed, 0.2)
+
+    def test_writes_once_when_the_value_sticks(self):
+        settings = FakeSettings({'ignored_packages': ['A']})
+        with self.watcher(settings) as watcher:
+            confirmed = watcher.confirm(
+                lambda value: value == ['A', 'B'],
+                lambda: settings.set('ignored_packages', ['A', 'B'])
+            )
+        self.assertTrue(confirmed)
+        self.assertEqual(1, watcher.writes)
+        self.assertLess(watcher.elapsed, 0.2)
+
+    def test_rewrites_a_reverted_value_with_backoff(self):
+        settings = FakeSettings({'ignored_packages': ['A']})
+
+        def revert():
+            time.sleep(0.03)
+            settings.set('ignored_packages', ['A'])
+
+        def write():
+            settings.set('ignored_packages', ['A', 'B'])
+            if watcher.writes == 0:
+                threading.Thread(target=revert).start()
+
+        with self.watcher(settings) as watcher:
+            confirmed = watcher.confirm(lambda value: value == ['A', 'B'], write)
+        self.assertTrue(confirmed)
+        self.assertEqual(2, watcher.writes)
+        self.assertGreaterEqual(watcher.elapsed, 0.2)
+        self.assertLess(watcher.elapsed, 1.0)
+
+    def test_gives_up_without_a_write(self):
+        settings = FakeSettings({'ignored_packages': ['A']})
+        with self.watcher(settings) as watcher:
+            confirmed = watcher.confirm(lambda value: value == ['B'], timeout=0.2)
+        self.assertFalse(confirmed)
+        self.assertEqual(0, watcher.writes)
+        self.assertGreaterEqual(watcher.elapsed, 0.2)
+
+    def test_stops_after_max_writes(self):
+        settings = FakeSettings({'ignored_packages': ['A']})
+        with self.watcher(settings) as watcher:
+            watcher.write_interval = 0.0
+            confirmed = watcher.confirm(lambda value: value == ['B'], lambda: None, max_writes=3)
+        self.assertFalse(confirmed)
+        self.assertEqual(3, watcher.writes)
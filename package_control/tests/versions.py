@@ -0,0 +1,66 @@
+import unittest
+
+from ..versions import version_comparable, version_key, version_sort
+
+
+VERSIONS = [
+    '0.1.0',
+    '1.0.0',
+    '1.0.0-',
+    '1.0.0--x',
+    '1.0.0-0',
+    '1.0.0-00',
+    '1.0.0-0.3.7',
+    '1.0.0-1',
+    '1.0.0-1-2',
+    '1.0.0-Alpha',
+    '1.0.0-alpha',
+    '1.0.0-alpha.-1',
+    '1.0.0-alpha.0a',
+    '1.0.0-alpha.00a',
+    '1.0.0-alpha.1',
+    '1.0.0-alpha.beta',
+    '1.0.0-beta',
+    '1.0.0-beta.2',
+    '1.0.0-beta.11',
+    '1.0.0-rc.1',
+    '1.0.0-x.7.z.92',
+    '1.0.0+',
+    '1.0.0+1',
+    '1.0.0+1.2',
+    '1.0.0+build',
+    '1.0.0-rc.1+build.1',
+    '1.6.9.0',
+    '2',
+    '2.1',
+    'v2.1.1',
+    '2012.11.10.23.59.59',
+]
+
+
+def _sign(value):
+    return (value > 0) - (value < 0)
+
+
+class VersionKeyTests(unittest.TestCase):
+
+    def test_keys_order_like_semver(self):
+        for a in VERSIONS:
+            for b in VERSIONS:
+                key_a = version_key(a)
+                key_b = version_key(b)
+                expected = version_comparable(a)._compare(version_comparable(b))
+                actual = (key_a > key_b) - (key_a < key_b)
+                self.assertEqual(_sign(expected), actual, '%s vs %s' % (a, b))
+
+    def test_sort_matches_semver(self):
+        expected = sorted(VERSIONS, key=version_comparable)
+        self.assertEqual(
+            [str(version_comparable(v)) for v in expected],
+            [str(version_comparable(v)) for v in version_sort(VERSIONS)]
+        )
+
+    def test_dicts_and_semver_objects(self):
+        self.assertEqual(version_key('1.2.3'), version_key({'version': '1.2.3'}))
+        self.assertEqual(version_key('1.2.3-rc.1'), version_key(version_comparable('1.2.3-rc.1')))
+        self.assertEqual(version_key('0'), version_key({}))
@@ -16,6 +16,7 @@ class ThreadProgress():
         The message to display once the thread is complete
     """
     running = False
+    progress = None
 
     def __init__(self, thread, message, success_message):
         ThreadProgress.setup(thread, message, success_message)
@@ -25,6 +26,7 @@ class ThreadProgress():
         cls.thread = thread
         cls.message = message
         cls.success_message = success_message
+        cls.progress = None
         cls.addend = 1
         cls.size = 8
         cls.last_view = None
@@ -34,6 +36,18 @@ class ThreadProgress():
             cls.running = True
             sublime.set_timeout(lambda: cls.run(), 100)
 
+    @classmethod
+    def set_progress(cls, progress):
+        """
+        Sets extra text, such as a download percentage, to display after the
+        message of the running thread
+
+        :param progress:
+            A unicode string, or None to remove the text
+        """
+
+        cls.progress = progress
+
     @classmethod
     def run(cls):
         if cls.window is None:
@@ -58,7 +72,10 @@ class ThreadProgress():
         before = cls.index % cls.size
         after = (cls.size - 1) - before
 
-        active_view.set_status('_packages_manager', '%s [%s=%s]' % (cls.message, ' ' * before, ' ' * after))
+        message = cls.message
+        if cls.progress:
+            message += ' ' + cls.progress
+        active_view.set_status('_packages_manager', '%s [%s=%s]' % (message, ' ' * before, ' ' * after))
         if cls.last_view is None:
             cls.last_view = active_view
 
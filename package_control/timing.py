@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import threading
+
+from .console_write import console_write
+from .open_compat import open_compat, read_compat
+from .file_not_found_error import FileNotFoundError
+from .sys_path import pc_cache_dir
+
+
+# When the log grows past this many bytes, the older half is removed
+MAX_LOG_SIZE = 1024 * 1024
+
+# Set from the "timing_log" setting by configure()
+_enabled = False
+
+# Guards the phases and counters of operations, and the log file
+_lock = threading.Lock()
+
+# The "operation" attribute is the Operation open on the thread. Concurrent
+# operations, such as a background refresh during an install, are recorded
+# separately. Worker threads are attached to an operation using bind().
+_local = threading.local()
+
+
+class _NullSpan(object):
+
+    """
+    Returned instead of a span or operation when timing is disabled, so the
+    instrumented code only pays for a function call
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def end(self):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class _Span(object):
+
+    """
+    Times one phase of an operation, either as a context manager, or from
+    creation until end() is called
+    """
+
+    __slots__ = ('operation', 'name', 'started')
+
+    def __init__(self, operation, name):
+        self.operation = operation
+        self.name = name
+        self.started = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end()
+        return False
+
+    def end(self):
+        if self.started is not None:
+            self.operation.add_phase(self.name, time.time() - self.started)
+            self.started = None
+
+
+class _Binding(object):
+
+    """
+    Attaches a thread to an operation that was started on another thread
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(_local, 'operation', None)
+        _local.operation = self.operation
+        return self.operation
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.operation = self.previous
+        return False
+
+
+class Operation(object):
+
+    """
+    The phases and counters recorded for an install, upgrade or refresh,
+    written to the timing log as a single JSON line when it ends. Obtained
+    from operation(), and used as a context manager.
+    """
+
+    def __init__(self, name, info):
+        self.name = name
+        self.info = info
+        self.started = time.time()
+        self.phases = {}
+        self.counters = {}
+        self.depth = 0
+
+    def add_phase(self, name, seconds):
+        with _lock:
+            phase = self.phases.setdefault(name, {'count': 0, 'seconds': 0.0})
+            phase['count'] += 1
+            phase['seconds'] += seconds
+
+    def add_count(self, name, value):
+        with _lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def __enter__(self):
+        with _lock:
+            self.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with _lock:
+            self.depth -= 1
+            if self.depth > 0:
+                return False
+        if getattr(_local, 'operation', None) is self:
+            _local.operation = None
+
+        _write({
+            'operation': self.name,
+            'info': self.info,
+            'started': self.started,
+            'seconds': time.time() - self.started,
+            'failed': exc_type is not None,
+            'phases': self.phases,
+            'counters': self.counters
+        })
+        return False
+
+
+def configure(settings):
+    """
+    Turns timing on or off
+
+    :param settings:
+        A dict optionally containing the "timing_log" key
+    """
+
+    global _enabled
+    _enabled = bool(settings.get('timing_log'))
+
+
+def operation(name, **info):
+    """
+    Starts recording an operation, or joins the one already open on the
+    current thread
+
+    :param name:
+        A unicode string of the type of operation, such as "upgrade_all"
+
+    :param info:
+        Any extra JSON-serializable values to include in the log
+
+    :return:
+        An Operation object to use as a context manager
+    """
+
+    if not _enabled:
+        return _null_span
+    current = getattr(_local, 'operation', None)
+    if current is None:
+        current = Operation(name, info)
+        _local.operation = current
+    return current
+
+
+def current():
+    """
+    :return:
+        The Operation open on the current thread, or None
+    """
+
+    return getattr(_local, 'operation', None)
+
+
+def bind(operation):
+    """
+    Records the spans and counts of the current thread in an operation that
+    was started on another thread, such as by the threads of a WorkerPool
+
+    :param operation:
+        An Operation from current(), or None
+
+    :return:
+        An object to use as a context manager
+    """
+
+    if operation is None:
+        return _null_span
+    return _Binding(operation)
+
+
+def span(name):
+    """
+    Times a phase of the open operation
+
+    :param name:
+        A unicode string of the phase, such as "download"
+
+    :return:
+        An object to use as a context manager, or to call end() on
+    """
+
+    operation = getattr(_local, 'operation', None)
+    if operation is None:
+        return _null_span
+    return _Span(operation, name)
+
+
+def count(name, value=1):
+    """
+    Adds to a counter of the open operation, such as the bytes downloaded.
+    Counters named "X_hits" and "X_misses" are shown as a hit ratio by
+    summarize().
+
+    :param name:
+        A unicode string of the counter
+
+    :param value:
+        The number to add
+    """
+
+    operation = getattr(_local, 'operation', None)
+    if operation is not None:
+        operation.add_count(name, value)
+
+
+def _log_path():
+    return os.path.join(pc_cache_dir(), 'timing.jsonl')
+
+
+def _write(record):
+    """
+    Appends an operation to the timing log
+
+    :param record:
+        A JSON-serializable dict
+    """
+
+    log_path = _log_path()
+    with _lock:
+        try:
+            log_dir = os.path.dirname(log_path)
+            if not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+            with open_compat(log_path, 'a') as f:
+                f.write(json.dumps(record) + u'\n')
+
+            if os.path.getsize(log_path) > MAX_LOG_SIZE:
+                with open_compat(log_path, 'r') as f:
+                    lines = read_compat(f).splitlines(True)
+                with open_compat(log_path, 'w') as f:
+                    f.write(u''.join(lines[len(lines) // 2:]))
+        except (IOError, OSError, TypeError, ValueError) as e:
+            console_write(
+                u'''
+                Unable to write the timing log to %s: %s
+                ''',
+                (log_path, e)
+            )
+
+
+def read_operations(limit=10):
+    """
+    :param limit:
+        The number of operations to return
+
+    :return:
+        A list of the most recent operation dicts from the timing log, oldest
+        first
+    """
+
+    try:
+        with open_compat(_log_path(), 'r') as f:
+            lines = read_compat(f).splitlines()
+    except (FileNotFoundError, IOError, OSError):
+        return []
+
+    output = []
+    for line in reversed(lines):
+        if len(output) >= limit:
+            break
+        try:
+            output.append(json.loads(line))
+        except (ValueError):
+            continue
+    output.reverse()
+    return output
+
+
+def summarize(records):
+    """
+    :param records:
+        A list of operation dicts from read_operations()
+
+    :return:
+        A unicode string of the phases, counters and hit ratios of each
+        operation, and the totals of each phase
+    """
+
+    lines = []
+    totals = {}
+
+    for record in records:
+        started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.get('started', 0)))
+        info = u', '.join(u'%s=%s' % (key, record['info'][key]) for key in sorted(record.get('info', {})))
+        lines.append(u'%s %s%s%s: %.2fs' % (
+            started,
+            record.get('operation'),
+            u' (%s)' % info if info else u'',
+            u' FAILED' if record.get('failed') else u'',
+            record.get('seconds', 0)
+        ))
+
+        phases = record.get('phases', {})
+        for name in sorted(phases, key=lambda name: phases[name]['seconds'], reverse=True):
+            phase = phases[name]
+            lines.append(u'  %-24s %8.2fs  %5d calls' % (name, phase['seconds'], phase['count']))
+            total = totals.setdefault(name, {'count': 0, 'seconds': 0.0})
+            total['count'] += phase['count']
+            total['seconds'] += phase['seconds']
+
+        counters = record.get('counters', {})
+        for name in sorted(counters):
+            lines.append(u'  %-24s %10s' % (name, counters[name]))
+            if name.endswith('_hits'):
+                prefix = name[:-5]
+                hits = counters[name]
+                misses = counters.get(prefix + '_misses', 0)
+                if hits + misses:
+                    lines.append(u'  %-24s %9.0f%%' % (prefix + '_hit_ratio', 100.0 * hits / (hits + misses)))
+        lines.append(u'')
+
+    if totals:
+        lines.append(u'Totals over %d operations' % len(records))
+        for name in sorted(totals, key=lambda name: totals[name]['seconds'], reverse=True):
+            total = totals[name]
+            lines.append(u'  %-24s %8.2fs  %5d calls' % (name, total['seconds'], total['count']))
+
+    return u'\n'.join(lines)
@@ -3,9 +3,22 @@ import os
 from ..cache import set_cache, get_cache
 from ..show_error import show_error
 from ..processes import list_process_names
+from . import vcs_status
 from .vcs_upgrader import VcsUpgrader
 
 
+# The current branch, its upstream and the commits they point to, with one
+# line per local and remote-tracking branch
+_REFS_FORMAT = '%09'.join([
+    '%(HEAD)',
+    '%(objectname)',
+    '%(refname)',
+    '%(upstream)',
+    '%(upstream:remotename)',
+    '%(upstream:remoteref)',
+])
+
+
 class GitUpgrader(VcsUpgrader):
 
     """
@@ -50,10 +63,71 @@ class GitUpgrader(VcsUpgrader):
         return binary
 
     def get_working_copy_info(self):
+        """
+        Reads the current branch, its remote and the commits they point to,
+        with a single git invocation
+
+        :return:
+            False on error, or a dict with the keys:
+             - branch
+             - remote
+             - remote_branch
+             - head: the commit hash of HEAD
+             - remote_head: the commit hash of the remote-tracking branch, or None
+        """
+
         binary = self.retrieve_binary()
         if not binary:
             return False
 
+        # Versions of git before 2.16 do not know the upstream:remotename
+        # field, so those fall back to reading the config one key at a time
+        output = self.execute(
+            [binary, 'for-each-ref', '--format=' + _REFS_FORMAT, 'refs/heads', 'refs/remotes'],
+            self.working_copy,
+            ignore_errors='unknown field name'
+        )
+        if output is False:
+            return False
+
+        refs = {}
+        current = None
+        for line in output.splitlines():
+            fields = line.split('\t')
+            if len(fields) != 6:
+                return self._get_working_copy_info_legacy(binary)
+            refs[fields[2]] = fields[1]
+            if fields[0] == '*':
+                current = fields
+
+        # Handle the detached head state
+        if current is None:
+            return False
+
+        head, refname, upstream, remote, remote_ref = current[1:]
+        if not remote or not remote_ref:
+            return False
+
+        return {
+            'branch': refname.replace('refs/heads/', ''),
+            'remote': remote,
+            'remote_branch': remote_ref.replace('refs/heads/', ''),
+            'head': head,
+            'remote_head': refs.get(upstream)
+        }
+
+    def _get_working_copy_info_legacy(self, binary):
+        """
+        Reads the current branch and its remote for versions of git that do
+        not support the fields used by get_working_copy_info()
+
+        :param binary:
+            The path to the git executable
+
+        :return:
+            False on error, or a dict, see get_working_copy_info()
+        """
+
         # Get the current branch name
         res = self.execute([binary, 'symbolic-ref', '-q', 'HEAD'], self.working_copy)
         # Handle the detached head state
@@ -71,7 +145,9 @@ class GitUpgrader(VcsUpgrader):
         return {
             'branch': branch,
             'remote': remote,
-            'remote_branch': remote_branch
+            'remote_branch': remote_branch,
+            'head': None,
+            'remote_head': None
         }
 
     def run(self):
@@ -111,6 +187,17 @@ class GitUpgrader(VcsUpgrader):
         if info is False:
             return False
 
+        # A previous session may have fetched the same commits already
+        if info['remote_head']:
+            incoming = vcs_status.get_incoming(
+                self.working_copy,
+                self._state(info),
+                self.cache_length
+            )
+            if incoming is not None:
+                set_cache(cache_key, incoming, self.cache_length)
+                return incoming
+
         res = self.execute([binary, 'fetch', info['remote']], self.working_copy)
         if res is False:
             return False
@@ -118,11 +205,29 @@ class GitUpgrader(VcsUpgrader):
         args = [binary, 'log']
         args.append('..%s/%s' % (info['remote'], info['remote_branch']))
         output = self.execute(args, self.working_copy, meaningful_output=True)
+        if output is False:
+            return False
         incoming = len(output) > 0
 
+        # The fetch moved the remote-tracking branch
+        info = self.get_working_copy_info()
+        if info and info['remote_head']:
+            vcs_status.set_incoming(self.working_copy, self._state(info), incoming)
+
         set_cache(cache_key, incoming, self.cache_length)
         return incoming
 
+    def _state(self, info):
+        """
+        :param info:
+            The dict from get_working_copy_info()
+
+        :return:
+            A unicode string of the local commits an incoming check is valid for
+        """
+
+        return u'%s %s' % (info['head'], info['remote_head'])
+
     def latest_commit(self):
         """
         :return:
@@ -2,6 +2,7 @@ import os
 
 from ..cache import set_cache, get_cache
 from ..show_error import show_error
+from . import vcs_status
 from .vcs_upgrader import VcsUpgrader
 
 
@@ -73,6 +74,14 @@ class HgUpgrader(VcsUpgrader):
         if not binary:
             return False
 
+        # A previous session may have checked the same commit already
+        state = self.latest_commit()
+        if state:
+            incoming = vcs_status.get_incoming(self.working_copy, state, self.cache_length)
+            if incoming is not None:
+                set_cache(cache_key, incoming, self.cache_length)
+                return incoming
+
         args = [binary, 'in', '-q', 'default']
         output = self.execute(args, self.working_copy, meaningful_output=True)
         if output is False:
@@ -80,6 +89,9 @@ class HgUpgrader(VcsUpgrader):
 
         incoming = len(output) > 0
 
+        if state:
+            vcs_status.set_incoming(self.working_copy, state, incoming)
+
         set_cache(cache_key, incoming, self.cache_length)
         return incoming
 
@@ -0,0 +1,180 @@
+import os
+import time
+import json
+from threading import Lock
+
+from ..console_write import console_write
+from ..open_compat import open_compat, read_compat
+from ..file_not_found_error import FileNotFoundError
+from ..sys_path import pc_cache_dir
+from ..worker_pool import WorkerPool
+from ..replace_file import replace_file
+
+
+# Bump this whenever the structure of the persisted data changes
+VCS_STATUS_VERSION = 1
+
+# Working copy path -> {"state": ..., "incoming": ..., "checked": ...}, read
+# from disk the first time it is needed
+_entries = None
+
+# If an entry was set since the file was last written
+_dirty = False
+
+_lock = Lock()
+
+
+def _status_path():
+    return os.path.join(pc_cache_dir(), 'vcs_incoming.json')
+
+
+def _load():
+    """
+    Reads the incoming results of a previous session. The _lock MUST be held
+    when calling this function.
+    """
+
+    global _entries
+
+    if _entries is not None:
+        return
+
+    _entries = {}
+    status_path = _status_path()
+    try:
+        with open_compat(status_path, 'r') as f:
+            struct = json.loads(read_compat(f))
+    except (FileNotFoundError):
+        return
+    except (ValueError, IOError, OSError):
+        console_write(
+            u'''
+            Discarding the unreadable VCS status file at %s
+            ''',
+            status_path
+        )
+        return
+
+    if isinstance(struct, dict) and struct.get('version') == VCS_STATUS_VERSION:
+        entries = struct.get('entries')
+        if isinstance(entries, dict):
+            _entries = entries
+
+
+def get_incoming(working_copy, state, ttl):
+    """
+    Looks up the result of the last incoming check of a working copy
+
+    :param working_copy:
+        The path to the working copy
+
+    :param state:
+        A unicode string identifying the local state of the working copy,
+        such as the HEAD commit and the commit of the remote branch
+
+    :param ttl:
+        The number of seconds a result is used for
+
+    :return:
+        A bool if remote revisions are available, or None if the working copy
+        was not checked recently in the same state
+    """
+
+    with _lock:
+        _load()
+        entry = _entries.get(working_copy)
+
+    if not entry or entry.get('state') != state:
+        return None
+    if entry.get('checked', 0) + ttl <= time.time():
+        return None
+    return entry.get('incoming')
+
+
+def set_incoming(working_copy, state, incoming):
+    """
+    Records the result of an incoming check of a working copy
+
+    :param working_copy:
+        The path to the working copy
+
+    :param state:
+        A unicode string identifying the local state of the working copy,
+        after any fetch done by the check
+
+    :param incoming:
+        A bool if remote revisions are available
+    """
+
+    global _dirty
+
+    with _lock:
+        _load()
+        _entries[working_copy] = {
+            'state': state,
+            'incoming': incoming,
+            'checked': time.time()
+        }
+        _dirty = True
+
+
+def save():
+    """
+    Writes the incoming results to disk so the next session does not need to
+    fetch working copies that have not changed
+    """
+
+    global _dirty
+
+    with _lock:
+        if not _dirty:
+            return
+        _dirty = False
+
+        struct = {
+            'version': VCS_STATUS_VERSION,
+            'entries': _entries
+        }
+
+        status_path = _status_path()
+        tmp_path = status_path + '-new'
+        try:
+            status_dir = os.path.dirname(status_path)
+            if not os.path.exists(status_dir):
+                os.makedirs(status_dir)
+            with open_compat(tmp_path, 'w') as f:
+                f.write(json.dumps(struct))
+            replace_file(tmp_path, status_path)
+        except (IOError, OSError) as e:
+            console_write(
+                u'''
+                Unable to write the VCS status file to %s: %s
+                ''',
+                (status_path, e)
+            )
+
+
+def check_incoming(upgraders, max_workers=4):
+    """
+    Checks a number of working copies for remote revisions, running the
+    fetches of several of them at the same time
+
+    :param upgraders:
+        A list of GitUpgrader and HgUpgrader objects
+
+    :param max_workers:
+        The maximum number of checks to run at once
+
+    :return:
+        A list of bools if remote revisions are available, in the same order
+        as the upgraders
+    """
+
+    if not upgraders:
+        return []
+
+    pool = WorkerPool(max_workers)
+    try:
+        return pool.run([(None, upgrader.incoming) for upgrader in upgraders])
+    finally:
+        save()
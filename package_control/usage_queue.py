@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import threading
+
+try:
+    # Python 3
+    from urllib.parse import urlencode
+    str_cls = str
+except (ImportError):
+    # Python 2
+    from urllib import urlencode
+    str_cls = unicode  # noqa
+
+from .console_write import console_write
+from .open_compat import open_compat, read_compat
+from .file_not_found_error import FileNotFoundError
+from .sys_path import pc_cache_dir
+from .download_manager import downloader
+from .downloaders.downloader_exception import DownloaderException
+from .replace_file import replace_file
+
+
+# The number of events submitted by a worker before the queue is saved
+BATCH_SIZE = 20
+
+# An event that could not be submitted is retried after 60 seconds, then
+# with the delay doubling each time, up to 6 hours
+RETRY_DELAY = 60
+MAX_RETRY_DELAY = 21600
+
+# Events that still could not be submitted after this many tries are dropped
+MAX_ATTEMPTS = 10
+
+# Events older than this many seconds are dropped instead of submitted
+MAX_AGE = 604800
+
+# Guards the queue file, _flushing and _timer
+_lock = threading.Lock()
+
+# If a worker thread is submitting events
+_flushing = False
+
+# The threading.Timer that runs the worker once the next retry is due
+_timer = None
+
+
+def _queue_path():
+    return os.path.join(pc_cache_dir(), 'usage_queue.json')
+
+
+def _load():
+    """
+    The _lock MUST be held when calling this function
+
+    :return:
+        A list of event dicts with the keys "params", "queued", "attempts"
+        and "next_try"
+    """
+
+    try:
+        with open_compat(_queue_path(), 'r') as f:
+            events = json.loads(read_compat(f))
+        if isinstance(events, list):
+            return events
+    except (FileNotFoundError, ValueError, IOError, OSError):
+        pass
+    return []
+
+
+def _save(events):
+    """
+    The _lock MUST be held when calling this function
+
+    :param events:
+        A list of event dicts
+    """
+
+    queue_path = _queue_path()
+    tmp_path = queue_path + '-new'
+    try:
+        queue_dir = os.path.dirname(queue_path)
+        if not os.path.exists(queue_dir):
+            os.makedirs(queue_dir)
+        with open_compat(tmp_path, 'w') as f:
+            f.write(json.dumps(events))
+        replace_file(tmp_path, queue_path)
+    except (IOError, OSError) as e:
+        console_write(
+            u'''
+            Unable to write the usage queue to %s: %s
+            ''',
+            (queue_path, e)
+        )
+
+
+def enqueue(params, settings):
+    """
+    Adds a usage event to the on-disk queue and starts a worker to submit it
+    in the background
+
+    :param params:
+        A dict of the unicode strings to submit
+
+    :param settings:
+        A dict of the PackageManager settings, used for the downloader and
+        the "submit_url" setting
+    """
+
+    now = time.time()
+    with _lock:
+        events = _load()
+        events.append({
+            'params': params,
+            'queued': now,
+            'attempts': 0,
+            'next_try': now
+        })
+        _save(events)
+
+    flush(settings)
+
+
+def flush(settings):
+    """
+    Starts a worker thread to submit the queued usage events that are due,
+    unless one is already running
+
+    :param settings:
+        A dict of the PackageManager settings
+    """
+
+    global _flushing, _timer
+
+    with _lock:
+        if _flushing:
+            return
+        _flushing = True
+        if _timer:
+            _timer.cancel()
+            _timer = None
+
+    thread = threading.Thread(target=_work, args=(dict(settings),))
+    thread.daemon = True
+    thread.start()
+
+
+def _work(settings):
+    """
+    Submits the due events in batches, until none are left or the server
+    can not be reached
+
+    :param settings:
+        A dict of the PackageManager settings
+    """
+
+    global _flushing, _timer
+
+    try:
+        while True:
+            with _lock:
+                now = time.time()
+                loaded = _load()
+                events = [
+                    event for event in loaded
+                    if event.get('queued', 0) + MAX_AGE > now
+                ]
+                if len(events) != len(loaded):
+                    _save(events)
+                due = [event for event in events if event['next_try'] <= now][0:BATCH_SIZE]
+
+            if not due:
+                break
+
+            results = _submit(due, settings)
+
+            with _lock:
+                now = time.time()
+                # Other events may have been added while submitting
+                events = [
+                    event for event in _load()
+                    if event.get('queued', 0) + MAX_AGE > now
+                ]
+                finished = []
+                for event, result in zip(due, results):
+                    if result is None:
+                        event['attempts'] += 1
+                        delay = min(RETRY_DELAY * 2 ** (event['attempts'] - 1), MAX_RETRY_DELAY)
+                        event['next_try'] = now + delay
+                        if event['attempts'] >= MAX_ATTEMPTS:
+                            finished.append(event)
+                        else:
+                            _replace(events, event)
+                    else:
+                        finished.append(event)
+                events = [event for event in events if not _contains(finished, event)]
+                _save(events)
+
+            # Stop and wait for the retry when the server could not be reached
+            if None in results:
+                break
+
+    finally:
+        with _lock:
+            _flushing = False
+            events = _load()
+            if events:
+                delay = max(1, min(event['next_try'] for event in events) - time.time())
+                _timer = threading.Timer(delay, flush, args=(settings,))
+                _timer.daemon = True
+                _timer.start()
+
+
+def _same(a, b):
+    return a['queued'] == b['queued'] and a['params'] == b['params']
+
+
+def _contains(events, event):
+    for other in events:
+        if _same(other, event):
+            return True
+    return False
+
+
+def _replace(events, event):
+    for i, other in enumerate(events):
+        if _same(other, event):
+            events[i] = event
+            return
+
+
+def _submit(events, settings):
+    """
+    Submits events to the usage server, reusing one pooled connection
+
+    :param events:
+        A list of event dicts
+
+    :param settings:
+        A dict of the PackageManager settings
+
+    :return:
+        A list with one entry per event: True if submitted, False if the
+        server rejected it, or None if it should be tried again later
+    """
+
+    submit_url = settings.get('submit_url')
+    if not submit_url:
+        return [False] * len(events)
+
+    results = []
+    try:
+        with downloader(submit_url, settings) as manager:
+            for event in events:
+                params = dict(event['params'])
+                # For Python 2, we need to explicitly encoding the params
+                for param in params:
+                    if isinstance(params[param], str_cls):
+                        params[param] = params[param].encode('utf-8')
+
+                url = submit_url + '?' + urlencode(params)
+                result = manager.fetch(url, 'Error submitting usage information.')
+
+                try:
+                    result = json.loads(result.decode('utf-8'))
+                    if result['result'] != 'success':
+                        raise ValueError()
+                    results.append(True)
+                except (ValueError, KeyError, TypeError):
+                    console_write(
+                        u'''
+                        Error submitting usage information for %s
+                        ''',
+                        event['params'].get('package')
+                    )
+                    results.append(False)
+
+    except (DownloaderException) as e:
+        console_write(e)
+
+    # The events after a connection error are tried again later too
+    results.extend([None] * (len(events) - len(results)))
+    return results
@@ -2,6 +2,21 @@ import re
 
 from .semver import SemVer
 from .console_write import console_write
+from .catalog import Record
+
+
+# Raw version string -> comparable tuple, see version_key()
+_version_keys = {}
+
+# The cache is emptied once it holds this many versions, which is enough for
+# every release of every package in the default channel
+MAX_VERSION_KEYS = 50000
+
+_date_regex = re.compile(r'(\d{4})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})$')
+_four_plus_regex = re.compile(r'(\d+\.\d+\.\d+)[T\.](\d+(\.\d+)*)$')
+_major_regex = re.compile(r'^\d+$')
+_major_minor_regex = re.compile(r'^\d+\.\d+$')
+_leading_digits_regex = re.compile(r'(\d+)(.*)$')
 
 
 def semver_compat(v):
@@ -21,13 +36,14 @@ def semver_compat(v):
         return str(v)
 
     # Allowing passing in a dict containing info about a package
-    if isinstance(v, dict):
+    if isinstance(v, (dict, Record)):
         if 'version' not in v:
             return '0'
         v = v['version']
 
     # Trim v off of the front
-    v = re.sub('^v', '', v)
+    if v[0:1] == 'v':
+        v = v[1:]
 
     # We prepend 0 to all date-based version numbers so that developers
     # may switch to explicit versioning from GitHub/BitBucket
@@ -38,20 +54,20 @@ def semver_compat(v):
     # minor and patch, and then the rest as a numeric build version
     # with four different parts. The result looks like:
     # 0.2012.11+10.31.23.59
-    date_match = re.match(r'(\d{4})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})\.(\d{2})$', v)
+    date_match = _date_regex.match(v)
     if date_match:
         v = '0.0.1+%s.%s.%s.%s.%s.%s' % date_match.groups()
 
     # This handles version that were valid pre-semver with 4+ dotted
     # groups, such as 1.6.9.0
-    four_plus_match = re.match(r'(\d+\.\d+\.\d+)[T\.](\d+(\.\d+)*)$', v)
+    four_plus_match = _four_plus_regex.match(v)
     if four_plus_match:
         v = '%s+%s' % (four_plus_match.group(1), four_plus_match.group(2))
 
     # Semver must have major, minor, patch
-    elif re.match(r'^\d+$', v):
+    elif _major_regex.match(v):
         v += '.0.0'
-    elif re.match(r'^\d+\.\d+$', v):
+    elif _major_minor_regex.match(v):
         v += '.0'
     return v
 
@@ -60,6 +76,105 @@ def version_comparable(string):
     return SemVer(semver_compat(string))
 
 
+def version_key(v):
+    """
+    Converts a version number into a tuple that sorts in SemVer precedence
+    order. The tuples are cached by the raw version string, so each version
+    is only parsed once, no matter how often it is compared.
+
+    :param v:
+        A string, dict with 'version' key, or a SemVer object
+
+    :raises:
+        ValueError: when the version is not a valid version number
+
+    :return:
+        A tuple of (major, minor, patch, prerelease key, build key)
+    """
+
+    if isinstance(v, (dict, Record)):
+        v = v.get('version', '0')
+    elif isinstance(v, SemVer):
+        v = str(v)
+
+    key = _version_keys.get(v)
+    if key is None:
+        semver = SemVer(semver_compat(v))
+        key = (
+            semver.major,
+            semver.minor,
+            semver.patch,
+            _prerelease_key(semver.prerelease),
+            _build_key(semver.build)
+        )
+        if len(_version_keys) >= MAX_VERSION_KEYS:
+            _version_keys.clear()
+        _version_keys[v] = key
+    return key
+
+
+def _identifiers_key(value):
+    """
+    Mirrors SemVer._compare(), which splits on "." and compares two numeric
+    identifiers as integers, and any other two identifiers as strings.
+
+    Identifiers are grouped by their first character, since "" and "-" sort
+    before digits, which sort before letters. Within the digit group, the
+    leading digits compare as an integer, then the rest as a string. That
+    agrees with SemVer except for identifiers such as "10a" and "9", which
+    SemVer itself orders inconsistently (10a < 9 < 10 < 10a).
+
+    :param value:
+        A dot-separated prerelease or build string
+
+    :return:
+        A tuple with an element per identifier
+    """
+
+    output = []
+    for identifier in value.split('.'):
+        if identifier.isdigit():
+            output.append((2, int(identifier), ''))
+        elif not identifier:
+            output.append((0,))
+        elif identifier[0] == '-':
+            output.append((1, identifier))
+        elif identifier[0].isdigit():
+            match = _leading_digits_regex.match(identifier)
+            output.append((2, int(match.group(1)), match.group(2), identifier))
+        else:
+            output.append((3, identifier))
+    return tuple(output)
+
+
+def _prerelease_key(prerelease):
+    # A version without a prerelease is greater than one with a prerelease
+    if prerelease is None:
+        return (1, ())
+    return (0, _identifiers_key(prerelease))
+
+
+def _build_key(build):
+    # SemVer orders no build first, then non-empty builds, then an empty build
+    if build is None:
+        return (0, ())
+    if not build:
+        return (2, ())
+    return (1, _identifiers_key(build))
+
+
+def version_is_prerelease(v):
+    """
+    :param v:
+        A string, dict with 'version' key, or a SemVer object
+
+    :return:
+        If the version has a prerelease part
+    """
+
+    return version_key(v)[3][0] == 0
+
+
 def version_exclude_prerelease(versions):
     """
     Remove prerelease versions for a list of SemVer versions
@@ -73,7 +188,7 @@ def version_exclude_prerelease(versions):
 
     output = []
     for version in versions:
-        if SemVer(semver_compat(version)).prerelease is not None:
+        if version_is_prerelease(version):
             continue
         output.append(version)
     return output
@@ -137,7 +252,7 @@ def version_sort(sortable, *fields, **kwargs):
     """
 
     def _version_sort_key(item):
-        result = SemVer(semver_compat(item))
+        result = version_key(item)
         if fields:
             values = [result]
             for field in fields:
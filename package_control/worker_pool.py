@@ -0,0 +1,108 @@
+import sys
+import threading
+
+try:
+    # Python 3
+    from queue import Queue, Empty
+except (ImportError):
+    # Python 2
+    from Queue import Queue, Empty
+
+from . import timing
+
+
+class WorkerPool(object):
+
+    """
+    Runs a list of callables on a bounded number of threads, returning the
+    results in the order the callables were passed in. Tasks may be grouped
+    by a key, such as a hostname, to limit how many of them run at once.
+
+    :param max_workers:
+        The maximum number of threads to use
+
+    :param max_per_key:
+        The maximum number of tasks with the same key that may run at once.
+        None means there is no limit other than max_workers.
+    """
+
+    def __init__(self, max_workers, max_per_key=None):
+        self.max_workers = max(1, int(max_workers))
+        self.max_per_key = max_per_key
+        self._semaphores = {}
+        self._semaphores_lock = threading.Lock()
+
+    def _semaphore(self, key):
+        if key is None or not self.max_per_key:
+            return None
+        with self._semaphores_lock:
+            if key not in self._semaphores:
+                self._semaphores[key] = threading.Semaphore(max(1, int(self.max_per_key)))
+            return self._semaphores[key]
+
+    def run(self, tasks):
+        """
+        Runs the tasks and waits for all of them to complete
+
+        :param tasks:
+            A list of 2-element tuples (key, callable). The callable is
+            invoked without arguments.
+
+        :raises:
+            The first exception raised by a task, in task order, once all of
+            the tasks have finished
+
+        :return:
+            A list of the values returned by the callables, in task order
+        """
+
+        tasks = list(tasks)
+        results = [None] * len(tasks)
+        errors = [None] * len(tasks)
+
+        queue = Queue()
+        for index, task in enumerate(tasks):
+            queue.put((index, task[0], task[1]))
+
+        # The tasks are timed as part of the caller's operation
+        operation = timing.current()
+
+        def work():
+            with timing.bind(operation):
+                while True:
+                    try:
+                        index, key, func = queue.get_nowait()
+                    except (Empty):
+                        return
+
+                    semaphore = self._semaphore(key)
+                    if semaphore:
+                        semaphore.acquire()
+                    try:
+                        results[index] = func()
+                    except (Exception):
+                        errors[index] = sys.exc_info()[1]
+                    finally:
+                        if semaphore:
+                            semaphore.release()
+
+        num_threads = min(self.max_workers, len(tasks))
+        # Spawning a thread is pointless overhead when there is nothing to
+        # run concurrently
+        if num_threads <= 1:
+            work()
+        else:
+            threads = []
+            for _ in range(num_threads):
+                thread = threading.Thread(target=work)
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            for thread in threads:
+                thread.join()
+
+        for error in errors:
+            if error is not None:
+                raise error
+
+        return results
@@ -0,0 +1,178 @@
+import time
+import zlib
+import struct
+import zipfile
+
+
+_LOCAL_HEADER = '<4s5H3L2H'
+_CENTRAL_HEADER = '<4s6H3L5H2L'
+_END_RECORD = '<4s4H2LH'
+
+_LOCAL_HEADER_SIZE = struct.calcsize(_LOCAL_HEADER)
+
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+# Larger values require the zip64 extensions, which are not written here
+_MAX_VALUE = 0xFFFFFFFF
+_MAX_ENTRIES = 0xFFFF
+
+
+def transcode_zip(source_path, entries, dest_path, extra_files=None):
+    """
+    Creates a zip file from entries of another zip file by copying their
+    compressed data byte-for-byte, so nothing is decompressed, recompressed
+    or written to the filesystem per entry
+
+    :param source_path:
+        The filesystem path to the source zip file
+
+    :param entries:
+        A list of 2-element tuples (zipfile.ZipInfo from the source zip file,
+        unicode string name of the entry in the new zip file)
+
+    :param dest_path:
+        The filesystem path to write the new zip file to
+
+    :param extra_files:
+        A dict of unicode string names to byte strings of contents to deflate
+        and append after the copied entries
+
+    :raises:
+        zipfile.BadZipfile: when an entry is encrypted, too large, or its local
+        header can not be read
+    """
+
+    central_directory = []
+
+    with open(source_path, 'rb') as source, open(dest_path, 'wb') as dest:
+        for info, name in entries:
+            if info.flag_bits & _FLAG_ENCRYPTED:
+                raise zipfile.BadZipfile('The zip entry %s is encrypted' % info.filename)
+
+            source.seek(info.header_offset)
+            header = source.read(_LOCAL_HEADER_SIZE)
+            if len(header) != _LOCAL_HEADER_SIZE or header[0:4] != b'PK\x03\x04':
+                raise zipfile.BadZipfile('Bad local header for the zip entry %s' % info.filename)
+            fields = struct.unpack(_LOCAL_HEADER, header)
+            source.seek(fields[9] + fields[10], 1)
+
+            data = source.read(info.compress_size)
+            if len(data) != info.compress_size:
+                raise zipfile.BadZipfile('Truncated data for the zip entry %s' % info.filename)
+
+            central_directory.append(_write_entry(dest, info, name, data))
+
+        if extra_files:
+            date_time = time.localtime(time.time())[0:6]
+            for name in sorted(extra_files.keys()):
+                contents = extra_files[name]
+                compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+                data = compressor.compress(contents) + compressor.flush()
+
+                info = zipfile.ZipInfo(name, date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                info.CRC = zlib.crc32(contents) & 0xFFFFFFFF
+                info.file_size = len(contents)
+                info.compress_size = len(data)
+
+                central_directory.append(_write_entry(dest, info, name, data))
+
+        if len(central_directory) > _MAX_ENTRIES:
+            raise zipfile.BadZipfile('Too many zip entries to write without zip64 extensions')
+
+        directory_offset = dest.tell()
+        for record in central_directory:
+            dest.write(record)
+        directory_size = dest.tell() - directory_offset
+
+        if directory_offset + directory_size > _MAX_VALUE:
+            raise zipfile.BadZipfile('The zip file is too large to write without zip64 extensions')
+
+        dest.write(struct.pack(
+            _END_RECORD,
+            b'PK\x05\x06',
+            0,
+            0,
+            len(central_directory),
+            len(central_directory),
+            directory_size,
+            directory_offset,
+            0
+        ))
+
+
+def _write_entry(dest, info, name, data):
+    """
+    Writes the local header and compressed data of an entry
+
+    :param dest:
+        The file object of the zip file being written
+
+    :param info:
+        The zipfile.ZipInfo with the compression details of the entry
+
+    :param name:
+        The unicode string name of the entry
+
+    :param data:
+        A byte string of the compressed data
+
+    :return:
+        A byte string of the central directory record for the entry
+    """
+
+    offset = dest.tell()
+    if info.file_size > _MAX_VALUE or info.compress_size > _MAX_VALUE or offset > _MAX_VALUE:
+        raise zipfile.BadZipfile('The zip entry %s is too large to write without zip64 extensions' % name)
+
+    try:
+        encoded_name = name.encode('ascii')
+        flags = info.flag_bits & ~(_FLAG_DATA_DESCRIPTOR | _FLAG_UTF8)
+    except (UnicodeEncodeError):
+        encoded_name = name.encode('utf-8')
+        flags = (info.flag_bits & ~_FLAG_DATA_DESCRIPTOR) | _FLAG_UTF8
+
+    year, month, day, hour, minute, second = info.date_time
+    dos_time = hour << 11 | minute << 5 | second // 2
+    dos_date = (year - 1980) << 9 | month << 5 | day
+
+    dest.write(struct.pack(
+        _LOCAL_HEADER,
+        b'PK\x03\x04',
+        info.extract_version,
+        flags,
+        info.compress_type,
+        dos_time,
+        dos_date,
+        info.CRC,
+        info.compress_size,
+        info.file_size,
+        len(encoded_name),
+        0
+    ))
+    dest.write(encoded_name)
+    dest.write(data)
+
+    return struct.pack(
+        _CENTRAL_HEADER,
+        b'PK\x01\x02',
+        info.create_system << 8 | info.create_version,
+        info.extract_version,
+        flags,
+        info.compress_type,
+        dos_time,
+        dos_date,
+        info.CRC,
+        info.compress_size,
+        info.file_size,
+        len(encoded_name),
+        0,
+        0,
+        0,
+        info.internal_attr,
+        info.external_attr,
+        offset
+    ) + encoded_name